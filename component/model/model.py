@@ -4,9 +4,10 @@ from typing import List
 from sepal_ui.model import Model
 import sepal_ui.scripts.decorator as sd
 import component.scripts as cs
-from traitlets import Bool, CBool, Dict, List, Unicode
+from traitlets import Bool, CBool, Dict, List, Unicode, observe
 
 import component.parameter.module_parameter as param
+from component.scripts.results_cache import ResultsCache
 from component.scripts.sepal_ui_scripts import get_geoarea
 
 
@@ -76,6 +77,9 @@ class MgciModel(Model):
 
     # Results
 
+    results = Dict({}, allow_none=True)
+    "dict: results of the calculation, either computed or read from a task file"
+
     biobelt_image = None
     "ee.Image: clipped bioclimatic belt image with aoi_model.feature_collection"
 
@@ -111,7 +115,7 @@ class MgciModel(Model):
             results_file (str): file containing a task .csv file with name and task_id
 
         """
-        self.results: Dict = None
+        self.results_cache = ResultsCache()
         self.biobelt_imaga = None
         self.vegetation_image = None
         self.aoi_model = aoi_model
@@ -128,6 +132,13 @@ class MgciModel(Model):
         # currently, we are not allowing user to change the dem
         self.dem = param.DEM_DEFAULT
 
+    @observe("results")
+    def reset_results_cache(self, change):
+        """Drop the parsed results every time new results are set. The in-place
+        updates of the results are detected by the cache itself"""
+
+        self.results_cache.reset(change["new"])
+
     def get_data(self):
         """Return the current state of the model"""
 
@@ -0,0 +1,508 @@
+"""Headless batch runner for multi-AOI (i.e. global) calculations.
+
+Every feature group of an admin FeatureCollection (one per value of a property,
+i.e. a country code) is reduced with reduce_regions and exported to Drive as a
+CSV task. The runner keeps a bounded number of tasks in flight, retries the failed
+AOIs with an exponential backoff and stores its progress in a json state file, so an
+interrupted run can be resumed by running the same command again.
+
+Usage:
+
+    python -m component.scripts.batch \\
+        --admin projects/my-project/assets/countries \\
+        --property ISO3 \\
+        --years years.json \\
+        --state global_run.json \\
+        --folder mgci_tasks
+
+Where years.json contains the list of land cover years to compute (as returned by
+get_a_years or get_b_years), i.e.:
+
+    [[{"asset": "users/.../2000", "year": 2000}], [{"asset": ..., "year": 2018}]]
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import ee
+
+import component.parameter.module_parameter as param
+from component.scripts.colab_combining_files import sanitize_description
+from component.scripts.gee import reduce_regions
+from component.scripts.scripts import map_matrix_to_dict, years_from_dict
+from component.scripts.task_csv import SUB_B_CATEGORIES
+from component.types import Pathlike
+
+__all__ = [
+    "TASK_SELECTORS",
+    "BatchState",
+    "BatchRunner",
+    "get_process",
+    "get_regions_process",
+    "main",
+]
+
+TASK_SELECTORS = ["process_id", "sub_a", *SUB_B_CATEGORIES]
+"list: columns exported by every task, the same as the calculation background tasks"
+
+FAILED_STATES = ["FAILED", "CANCELLED"]
+"list: ee task states of the tasks that have to be retried"
+
+
+def get_process(
+    aoi: ee.FeatureCollection,
+    years: List[List[Dict]],
+    remap_matrix_a: dict,
+    remap_matrix_b: dict,
+    transition_matrix: str,
+    rsa: bool = False,
+    dem: str = param.DEM_DEFAULT,
+    scale: Optional[int] = None,
+    flat: bool = False,
+) -> ee.FeatureCollection:
+    """Return the reduce_regions process of all the years of an AOI, with one
+    feature per year as in deferred_calculation.perform_calculation"""
+
+    matrix = remap_matrix_a if len(years) == 1 else remap_matrix_b
+
+    return ee.FeatureCollection(
+        [
+            ee.Feature(
+                None,
+                reduce_regions(
+                    aoi, matrix, rsa, dem, year, transition_matrix, scale, flat=flat
+                ),
+            ).set("process_id", years_from_dict(year))
+            for year in years
+        ]
+    )
+
+
+def get_regions_process(
+    regions: ee.FeatureCollection,
+    id_property: str,
+    years: List[List[Dict]],
+    remap_matrix_a: dict,
+    remap_matrix_b: dict,
+    transition_matrix: str,
+    rsa: bool = False,
+    dem: str = param.DEM_DEFAULT,
+    scale: Optional[int] = None,
+) -> ee.FeatureCollection:
+    """Return the reduce_regions process of all the years of a group of AOIs, every
+    year is reduced over all the features in a single reduceRegions call. The output
+    has one feature per AOI feature and year, it can be read with
+    read_task_results_by_id"""
+
+    matrix = remap_matrix_a if len(years) == 1 else remap_matrix_b
+
+    collections = []
+    for year in years:
+        process_id = years_from_dict(year)
+        collection = reduce_regions(
+            regions,
+            matrix,
+            rsa,
+            dem,
+            year,
+            transition_matrix,
+            scale,
+            id_property=id_property,
+        )
+        collections.append(
+            collection.map(lambda feature: feature.set("process_id", process_id))
+        )
+
+    return ee.FeatureCollection(collections).flatten()
+
+
+class BatchState:
+    """Progress of a batch run, stored in a json file.
+
+    Every AOI has a status (pending, running, completed or failed), the id of its
+    last task, the number of attempts, the time when it can be retried and the
+    last error.
+
+    Args:
+        path: json file, it's created if it doesn't exist
+    """
+
+    def __init__(self, path: Pathlike):
+        self.path = Path(path)
+        self.aois: Dict[str, Dict[str, Any]] = {}
+
+        if self.path.exists():
+            self.aois = json.loads(self.path.read_text())["aois"]
+
+    def add(self, names: List[str]) -> None:
+        """Add the AOIs that are not in the state yet"""
+
+        for name in names:
+            self.aois.setdefault(
+                name,
+                {
+                    "status": "pending",
+                    "task_id": None,
+                    "attempts": 0,
+                    "retry_at": 0,
+                    "error": None,
+                },
+            )
+
+    def with_status(self, status: str) -> List[str]:
+        """Return the AOIs with the given status"""
+
+        return [name for name, aoi in self.aois.items() if aoi["status"] == status]
+
+    def save(self) -> None:
+        """Write the state, the file is replaced at once so it's never left
+        half-written if the run is interrupted"""
+
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"aois": self.aois}, indent=4))
+        os.replace(tmp_path, self.path)
+
+
+class BatchRunner:
+    """Export the process of every AOI keeping a bounded number of tasks in flight.
+
+    Args:
+        names: names of the AOIs to process, they are the keys of the state file
+        get_aoi_process: returns the ee.FeatureCollection to export of an AOI name
+        state_file: json file where the progress is stored
+        folder: Drive folder of the exported files
+        max_in_flight: maximum number of tasks running at the same time
+        max_retries: number of times a failed AOI is submitted again
+        backoff: seconds to wait before the first retry, doubled on each attempt
+        poll_interval: seconds between two polls of the task list
+        batch: the ee.batch module, or a stand-in with the same interface
+        sleep: function used to wait between polls
+        clock: function returning the current time in seconds
+        logger: function receiving the progress messages
+        retry_failed: submit again the AOIs that failed in a previous run
+        selectors: columns of the exported files
+    """
+
+    def __init__(
+        self,
+        names: List[str],
+        get_aoi_process: Callable[[str], ee.FeatureCollection],
+        state_file: Pathlike,
+        folder: Optional[str] = None,
+        max_in_flight: int = 10,
+        max_retries: int = 3,
+        backoff: float = 60,
+        poll_interval: float = 30,
+        batch=None,
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.time,
+        logger: Callable[[str], None] = print,
+        retry_failed: bool = False,
+        selectors: List[str] = TASK_SELECTORS,
+    ):
+        self.names = [str(name) for name in dict.fromkeys(names)]
+        self.get_aoi_process = get_aoi_process
+        self.folder = folder
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.batch = batch or ee.batch
+        self.sleep = sleep
+        self.clock = clock
+        self.logger = logger
+        self.selectors = selectors
+
+        self.state = BatchState(state_file)
+        self.state.add(self.names)
+
+        if retry_failed:
+            for name in self.state.with_status("failed"):
+                self.state.aois[name].update(status="pending", attempts=0, retry_at=0)
+
+    @classmethod
+    def from_admin(
+        cls,
+        admin: ee.FeatureCollection,
+        property: str,
+        years: List[List[Dict]],
+        remap_matrix_a: dict,
+        remap_matrix_b: dict,
+        transition_matrix: str,
+        rsa: bool = False,
+        dem: str = param.DEM_DEFAULT,
+        scale: Optional[int] = None,
+        flat: bool = False,
+        **kwargs,
+    ) -> "BatchRunner":
+        """Create a runner for every distinct value of property in admin.
+
+        Args:
+            admin: admin boundaries, one or more features per AOI
+            property: property of the features identifying each AOI
+            flat: export the flat groups, without nesting them on the server
+            kwargs: the BatchRunner arguments
+        """
+
+        # The state file keys are strings, keep the original values to filter
+        values = admin.aggregate_array(property).distinct().getInfo()
+        values = {str(value): value for value in values}
+
+        def get_aoi_process(name):
+            aoi = admin.filter(ee.Filter.eq(property, values[name]))
+            return get_process(
+                aoi,
+                years,
+                remap_matrix_a,
+                remap_matrix_b,
+                transition_matrix,
+                rsa,
+                dem,
+                scale,
+                flat,
+            )
+
+        return cls(list(values), get_aoi_process, **kwargs)
+
+    @classmethod
+    def from_regions(
+        cls,
+        admin: ee.FeatureCollection,
+        property: str,
+        years: List[List[Dict]],
+        remap_matrix_a: dict,
+        remap_matrix_b: dict,
+        transition_matrix: str,
+        group_size: int = 100,
+        rsa: bool = False,
+        dem: str = param.DEM_DEFAULT,
+        scale: Optional[int] = None,
+        **kwargs,
+    ) -> "BatchRunner":
+        """Create a runner exporting the AOIs in groups of group_size values of
+        property, each group is reduced in a single reduceRegions call per year
+        instead of one task per AOI.
+
+        Args:
+            admin: admin boundaries, one or more features per AOI
+            property: property of the features identifying each AOI
+            group_size: number of AOIs exported by each task
+            kwargs: the BatchRunner arguments
+        """
+
+        # Sorted values so the groups are the same when the run is resumed
+        values = sorted(admin.aggregate_array(property).distinct().getInfo())
+        groups = {
+            f"{property}_{i // group_size:03d}": values[i : i + group_size]
+            for i in range(0, len(values), group_size)
+        }
+
+        def get_aoi_process(name):
+            regions = admin.filter(ee.Filter.inList(property, groups[name]))
+            return get_regions_process(
+                regions,
+                property,
+                years,
+                remap_matrix_a,
+                remap_matrix_b,
+                transition_matrix,
+                rsa,
+                dem,
+                scale,
+            )
+
+        kwargs.setdefault("selectors", [property, *TASK_SELECTORS])
+
+        return cls(list(groups), get_aoi_process, **kwargs)
+
+    def submit(self, name: str) -> None:
+        """Start the export task of an AOI"""
+
+        aoi = self.state.aois[name]
+        aoi["attempts"] += 1
+
+        try:
+            task = self.batch.Export.table.toDrive(
+                collection=self.get_aoi_process(name),
+                description=sanitize_description(str(name)),
+                fileFormat="CSV",
+                folder=self.folder,
+                selectors=self.selectors,
+            )
+            task.start()
+
+        except Exception as e:
+            self.fail(name, f"The task could not be started: {e}")
+            return
+
+        aoi.update(status="running", task_id=task.id, error=None)
+        self.logger(f"{name}: task {task.id} started (attempt {aoi['attempts']})")
+
+    def fail(self, name: str, error: str) -> None:
+        """Schedule the retry of an AOI, or mark it as failed if there are no
+        retries left"""
+
+        aoi = self.state.aois[name]
+        aoi.update(task_id=None, error=error)
+
+        if aoi["attempts"] > self.max_retries:
+            aoi["status"] = "failed"
+            self.logger(f"{name}: failed after {aoi['attempts']} attempts, {error}")
+            return
+
+        delay = self.backoff * 2 ** (aoi["attempts"] - 1)
+        aoi.update(status="pending", retry_at=self.clock() + delay)
+        self.logger(f"{name}: {error}, retrying in {delay:.0f}s")
+
+    def poll(self) -> None:
+        """Update the running AOIs from a single listing of the ee tasks"""
+
+        running = self.state.with_status("running")
+        if not running:
+            return
+
+        tasks = {task.id: task for task in self.batch.Task.list()}
+
+        for name in running:
+            task = tasks.get(self.state.aois[name]["task_id"])
+
+            if task is None:
+                self.fail(name, "The task is not listed anymore")
+
+            elif task.state == "COMPLETED":
+                self.state.aois[name]["status"] = "completed"
+                self.logger(f"{name}: completed")
+
+            elif task.state in FAILED_STATES:
+                error = task.status().get("error_message", task.state)
+                self.fail(name, error)
+
+    def step(self) -> bool:
+        """Poll the tasks and fill the free slots with the pending AOIs.
+
+        Returns:
+            True while there are AOIs pending or running
+        """
+
+        self.poll()
+
+        in_flight = len(self.state.with_status("running"))
+        now = self.clock()
+        ready = [
+            name
+            for name in self.state.with_status("pending")
+            if self.state.aois[name]["retry_at"] <= now
+        ]
+
+        for name in ready[: max(self.max_in_flight - in_flight, 0)]:
+            self.submit(name)
+
+        self.state.save()
+
+        return bool(
+            self.state.with_status("pending") or self.state.with_status("running")
+        )
+
+    def run(self) -> Dict[str, List[str]]:
+        """Process all the AOIs, it returns when every AOI is completed or failed.
+
+        Returns:
+            the names of the completed and failed AOIs
+        """
+
+        while self.step():
+            self.sleep(self.poll_interval)
+
+        summary = {
+            "completed": self.state.with_status("completed"),
+            "failed": self.state.with_status("failed"),
+        }
+        self.logger(
+            f"{len(summary['completed'])} AOI(s) completed, "
+            f"{len(summary['failed'])} failed"
+        )
+
+        return summary
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """Command line entry point, see the module docstring"""
+
+    parser = argparse.ArgumentParser(
+        prog="python -m component.scripts.batch", description=__doc__.split("\n")[0]
+    )
+    parser.add_argument("--admin", required=True, help="admin FeatureCollection id")
+    parser.add_argument("--property", required=True, help="property naming each AOI")
+    parser.add_argument("--years", required=True, help="json file with the years")
+    parser.add_argument("--state", required=True, help="json file of the run progress")
+    parser.add_argument("--folder", default=None, help="Drive folder of the outputs")
+    parser.add_argument("--remap-matrix-a", default=str(param.LC_MAP_MATRIX))
+    parser.add_argument("--remap-matrix-b", default=str(param.LC_MAP_MATRIX))
+    parser.add_argument(
+        "--transition-matrix", default=str(param.TRANSITION_MATRIX_FILE)
+    )
+    parser.add_argument("--rsa", action="store_true", help="use real surface area")
+    parser.add_argument("--dem", default=param.DEM_DEFAULT)
+    parser.add_argument("--scale", type=int, default=None)
+    parser.add_argument("--max-in-flight", type=int, default=10)
+    parser.add_argument("--max-retries", type=int, default=3)
+    parser.add_argument("--backoff", type=float, default=60)
+    parser.add_argument("--poll-interval", type=float, default=30)
+    parser.add_argument("--retry-failed", action="store_true")
+    parser.add_argument(
+        "--flat",
+        action="store_true",
+        help="don't nest the groups on the server, the files are read the same way",
+    )
+    parser.add_argument(
+        "--group-size",
+        type=int,
+        default=None,
+        help="export the AOIs in groups of this size, one reduceRegions per year",
+    )
+    parser.add_argument("--project", default=None, help="ee cloud project")
+    args = parser.parse_args(argv)
+
+    # The features of the groups are reduced with reduce_by_features, which only
+    # nests the groups on the server
+    if args.group_size and args.flat:
+        parser.error("--flat can't be used with --group-size")
+
+    ee.Initialize(project=args.project)
+
+    kwargs = {}
+    if args.group_size:
+        kwargs["group_size"] = args.group_size
+    elif args.flat:
+        kwargs["flat"] = True
+
+    create = BatchRunner.from_regions if args.group_size else BatchRunner.from_admin
+    runner = create(
+        ee.FeatureCollection(args.admin),
+        args.property,
+        json.loads(Path(args.years).read_text()),
+        map_matrix_to_dict(args.remap_matrix_a),
+        map_matrix_to_dict(args.remap_matrix_b),
+        args.transition_matrix,
+        **kwargs,
+        rsa=args.rsa,
+        dem=args.dem,
+        scale=args.scale,
+        state_file=args.state,
+        folder=args.folder,
+        max_in_flight=args.max_in_flight,
+        max_retries=args.max_retries,
+        backoff=args.backoff,
+        poll_interval=args.poll_interval,
+        retry_failed=args.retry_failed,
+    )
+
+    return runner.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Plan the reduce_regions processes of a calculation.
+
+When both indicators are requested, the subindicator A years are usually part of the
+subindicator B periods too (i.e. the baseline start year). Instead of reducing the
+same land cover asset again in its own process, those years are reduced in the same
+pass over the pixels as the subindicator B period containing them (see the
+shared_years argument of reduce_regions).
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+from component.scripts.gee import get_nominal_scale
+
+__all__ = ["plan_processes"]
+
+
+def plan_processes(
+    years: List[List[Dict]],
+    scale: Optional[int] = None,
+    get_scale: Callable[[str], float] = get_nominal_scale,
+) -> List[Tuple[List[Dict], List[Dict]]]:
+    """Group the years of a calculation into reduce_regions processes.
+
+    A subindicator A year is shared with the first subindicator B period using the
+    same asset, as long as both are computed at the same scale: either the given
+    scale or the nominal scale of their first asset.
+
+    Args:
+        years: subindicator A ([year]) and B ([base, end, report]) years, as
+            returned by get_a_years and get_b_years
+        scale: scale of the calculation, None to use the nominal scale of the assets
+        get_scale: returns the nominal scale of an asset, it's only called when the
+            scale is not given and the assets are different
+
+    Returns:
+        (lc_years, shared_years) of each process, in the years order. The shared
+        years are not computed in their own process.
+    """
+
+    scales: Dict[str, float] = {}
+
+    def same_scale(asset: str, other: str) -> bool:
+        if scale or asset == other:
+            return True
+        for asset_ in [asset, other]:
+            if asset_ not in scales:
+                scales[asset_] = get_scale(asset_)
+        return scales[asset] == scales[other]
+
+    processes = [(list(lc_years), []) for lc_years in years]
+    periods = [process for process in processes if len(process[0]) == 3]
+
+    planned = []
+    for lc_years, shared_years in processes:
+        if len(lc_years) == 1:
+            year = lc_years[0]
+            period = next(
+                (
+                    period
+                    for period in periods
+                    if year["asset"] in [y["asset"] for y in period[0]]
+                    and same_scale(year["asset"], period[0][0]["asset"])
+                ),
+                None,
+            )
+            if period is not None:
+                period[1].append(year)
+                continue
+
+        planned.append((lc_years, shared_years))
+
+    return planned
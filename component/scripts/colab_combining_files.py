@@ -1,50 +1,111 @@
 
 import re # for manipulating strings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
 import pandas as pd
 
+from component.scripts.excel_export import write_excel_sheets
+from component.scripts.report_tables import from_schema, read_report_tables
+
+
 def sanitize_description(description):
     allowed_characters_pattern = r"[^a-zA-Z0-9.,:;_ \-]"  # Define a regex pattern for characters not in the allowed set
     sanitized_description = re.sub(allowed_characters_pattern, "", description)  # Remove characters not in the allowed set
     return sanitized_description
 
 
-def append_excel_files(file_paths, num_sheets, output_file_path):
-    # Initialize a dictionary to store combined DataFrames from different files
-    combined_dfs = {}
+def read_report_file(file_path, num_sheets=None):
+    """Read the sheets of a report workbook, or the table of a columnar report file.
+
+    Args:
+        file_path (str): path of a .xlsx workbook or of a file written by
+            report_tables.write_report_tables
+        num_sheets (int, optional): read only the first num_sheets of a workbook
+
+    Returns:
+        dict: sheet name: DataFrame
+    """
+
+    # Columnar report files contain a single table, named after the file
+    if not str(file_path).endswith(".xlsx"):
+        tables = read_report_tables([file_path])
+        return {table: from_schema(df, table) for table, df in tables.items()}
+
+    with pd.ExcelFile(file_path, engine="openpyxl") as xls:
+        sheet_names = xls.sheet_names[:num_sheets]
+        return {sheet_name: xls.parse(sheet_name) for sheet_name in sheet_names}
 
-    # Initialize a counter to track the progress of file processing
-    counter = 0
 
-    # Iterate over each file path in the list
-    for file_path in file_paths:
-        # Load the Excel file
-        # xls = pd.ExcelFile(file_path)  # Reads file and stores as an ExcelFile object (using the Pandas library)
-        xls = pd.ExcelFile(file_path, engine='openpyxl')  # Reads file and stores as an ExcelFile object (using the Pandas library)
+def append_excel_files(
+    file_paths, num_sheets, output_file_path, max_workers=None, verbose=True
+):
+    """Combine the sheets of several report files into a single workbook.
 
-        # xls = pd.ExcelFile(file_path, engine='xlrd')  # Reads file and stores as an ExcelFile object (using the Pandas library)
+    The files are read in a process pool, the frames of each sheet are collected
+    and concatenated once in the order of file_paths, and the output workbook is
+    written in a single streaming pass.
 
-        # Increment the counter for each iteration
-        counter += 1
+    Args:
+        file_paths (list): report workbooks (.xlsx) or columnar report files
+        num_sheets (int): number of sheets to read from each workbook
+        output_file_path (str): path of the combined workbook
+        max_workers (int, optional): number of processes, all the cpus by default.
+            Use 1 to read the files in the current process.
+        verbose (bool): print the progress of the processing
 
-        # Read each sheet from the Excel file into a DataFrame
-        # Only read up to num_sheets specified
-        dfs = {sheet_name: xls.parse(sheet_name) for sheet_name in xls.sheet_names[:num_sheets]}
+    Returns:
+        list: (file path, error message) of the files that could not be read, they
+            are not included in the combined workbook
+    """
 
-        # Append the DataFrames to the combined_dfs dictionary
-        for sheet_name, df in dfs.items():
-            if sheet_name in combined_dfs:
-                # If the sheet already exists in combined_dfs, concatenate the current DataFrame with the existing one
-                combined_dfs[sheet_name] = pd.concat([combined_dfs[sheet_name], df], ignore_index=True)
-            else:
-                # If the sheet does not exist in combined_dfs, add the DataFrame directly
-                combined_dfs[sheet_name] = df
+    file_paths = list(file_paths)
+    file_dfs = {}
+    errors = {}
+
+    def collect(i, read_file):
+        try:
+            file_dfs[i] = read_file()
+        except Exception as e:
+            errors[i] = f"{type(e).__name__}: {e}"
 
         # Print the progress of processing, overwriting the previous progress
-        print(f"\rProcessing {counter}/{len(file_paths)}: {file_path}", end="")
+        if verbose:
+            done = len(file_dfs) + len(errors)
+            print(f"\rProcessing {done}/{len(file_paths)}: {file_paths[i]}", end="")
+
+    if max_workers == 1:
+        for i, file_path in enumerate(file_paths):
+            collect(i, partial(read_report_file, file_path, num_sheets))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(read_report_file, file_path, num_sheets): i
+                for i, file_path in enumerate(file_paths)
+            }
+            for future in as_completed(futures):
+                collect(futures[future], future.result)
+
+    # Collect the frames of each sheet, in the order of file_paths, and
+    # concatenate them once
+    sheet_frames = {}
+    for i in sorted(file_dfs):
+        for sheet_name, df in file_dfs[i].items():
+            sheet_frames.setdefault(sheet_name, []).append(df)
+
+    combined_dfs = {
+        sheet_name: pd.concat(frames, ignore_index=True)
+        for sheet_name, frames in sheet_frames.items()
+    }
 
     # Write the combined DataFrames to the specified output file path
-    with pd.ExcelWriter(output_file_path) as writer:
-        for sheet_name, df in combined_dfs.items():
-            # Write each DataFrame to a separate sheet in the output Excel file
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
+    write_excel_sheets(output_file_path, combined_dfs)
+
+    skipped_files = [(file_paths[i], errors[i]) for i in sorted(errors)]
+
+    if verbose and skipped_files:
+        print(f"\n{len(skipped_files)} file(s) could not be read:")
+        for file_path, error in skipped_files:
+            print(f"    {file_path}: {error}")
 
+    return skipped_files
@@ -0,0 +1,90 @@
+"""Bounded concurrent execution of blocking calls, i.e. the getInfo of the GEE
+processes of each year.
+
+The calls run in a thread pool and their outcomes are yielded as soon as they
+finish, so the caller can report the progress of each one. The calls taking longer
+than the timeout are reported as timed out and the remaining ones are cancelled when
+the stop event is set (i.e. from a stop button).
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+__all__ = ["CALL_STATUSES", "run_concurrently"]
+
+CALL_STATUSES = ["success", "error", "timeout", "cancelled"]
+"list: status of the outcomes yielded by run_concurrently"
+
+
+def run_concurrently(
+    calls: Dict[str, Callable[[], Any]],
+    max_workers: int = 4,
+    timeout: Optional[float] = None,
+    stop_event: Optional[threading.Event] = None,
+    poll_interval: float = 0.5,
+    clock: Callable[[], float] = time.monotonic,
+) -> Iterator[Tuple[str, str, Any]]:
+    """Run the calls in a thread pool and yield their outcomes as they finish.
+
+    Each outcome is a (key, status, value) tuple, where the value is the result of
+    the call when the status is "success" and the raised exception when it's
+    "error". The outcomes finishing at the same time are yielded in the calls order.
+
+    The calls that are not started yet are cancelled when the generator is closed,
+    i.e. when the caller stops iterating after a failure. The running ones can't be
+    interrupted, their outcome is ignored.
+
+    Args:
+        calls: key: function without arguments
+        max_workers: maximum number of calls running at the same time
+        timeout: seconds after which a running call is reported as "timeout"
+        stop_event: when set, the calls not finished yet are reported as "cancelled"
+        poll_interval: seconds between two checks of the timeouts and the stop event
+        clock: function returning the current time in seconds
+    """
+
+    order = {key: i for i, key in enumerate(calls)}
+    started: Dict[str, float] = {}
+
+    def run(key):
+        started[key] = clock()
+        return calls[key]()
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures: Dict[Future, str] = {executor.submit(run, key): key for key in calls}
+    pending = set(futures)
+
+    def sort(futures_):
+        return sorted(futures_, key=lambda future: order[futures[future]])
+
+    try:
+        while pending:
+            done, pending = wait(
+                pending, timeout=poll_interval, return_when=FIRST_COMPLETED
+            )
+
+            for future in sort(done):
+                error = future.exception()
+                if error is not None:
+                    yield futures[future], "error", error
+                else:
+                    yield futures[future], "success", future.result()
+
+            if stop_event is not None and stop_event.is_set():
+                for future in sort(pending):
+                    future.cancel()
+                    yield futures[future], "cancelled", None
+                return
+
+            if timeout is not None:
+                now = clock()
+                for future in sort(pending):
+                    key = futures[future]
+                    if key in started and now - started[key] > timeout:
+                        pending.discard(future)
+                        yield key, "timeout", None
+
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -1,4 +1,18 @@
-from typing import Tuple, Union
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 from component.types import ResultsDict, SubAYearDict, SubBYearDict
 
 import ee
@@ -7,7 +21,23 @@ import component.parameter.directory as DIR
 
 
 import component.scripts as cs
-from component.scripts.gee import reduce_regions
+from component.scripts.calculation_plan import plan_processes
+from component.scripts.concurrent_calls import run_concurrently
+from component.scripts.gee import (
+    TILE_SCALE,
+    get_nominal_scale,
+    get_shared_key,
+    reduce_regions,
+)
+from component.scripts.reduce_cache import ReduceCache, get_cache_key
+from component.scripts.retry import RetryPolicy, is_timeout_error, run_with_retries
+from component.scripts.task_csv import flat_to_results
+from component.scripts.tiling import (
+    get_bounds,
+    get_cell_filter,
+    get_tile,
+    reduce_tiled,
+)
 import component.widget as cw
 from component.message import cm
 import json
@@ -24,13 +54,17 @@ class Logger:
 
 
 def task_process(
-    process: ee.FeatureCollection, task_filepath: str, model_state: dict
+    process: ee.FeatureCollection,
+    task_filepath: str,
+    model_state: dict,
+    local_results: Optional[ResultsDict] = None,
 ) -> None:
     """Send the task to the GEE servers and process it in background. This will be
     neccessary when the process is timed out.
 
     It will return a file with the task name and the task id to track when the process is done.
-    Also, it will return the current state of the model to a json file.
+    Also, it will return the current state of the model to a json file, along with
+    the results of the years that were already computed on the fly (local_results).
     """
 
     task_name = Path(f"{task_filepath.stem}")
@@ -58,11 +92,333 @@ def task_process(
         data = {
             "model_state": model_state,
             "task": {"id": task.id, "name": str(task_name)},
+            "local_years": list(local_results or {}),
+            "local_results": local_results or {},
         }
-        print(data)
         json.dump(data, f, indent=4)
 
 
+class ReduceSettings(NamedTuple):
+    """Inputs shared by the reduce_regions processes of a calculation"""
+
+    aoi: ee.FeatureCollection
+    "area of interest"
+
+    matrix: dict
+    "remap matrix of the land cover classes"
+
+    rsa: bool
+    "whether the real surface area is used"
+
+    dem: str
+    "DEM asset id"
+
+    transition_matrix: str
+    "path of the transition matrix file"
+
+    scale: Optional[int]
+    "scale of the reduction, None for the nominal scale of the assets"
+
+    flat: bool
+    "whether the groups are nested here instead of on the server"
+
+    def get_process(
+        self,
+        year: list,
+        shared_years: List[dict],
+        region: Optional[ee.FeatureCollection] = None,
+        scale: Optional[float] = None,
+        tile_scale: int = TILE_SCALE,
+    ):
+        """Return the reduce_regions process of a year over the AOI or a region of
+        it"""
+
+        return reduce_regions(
+            self.aoi if region is None else region,
+            self.matrix,
+            self.rsa,
+            self.dem,
+            year,
+            self.transition_matrix,
+            scale or self.scale,
+            flat=self.flat,
+            shared_years=shared_years,
+            shared_matrix=self.matrix,
+            tile_scale=tile_scale,
+        )
+
+
+class PlannedProcess(NamedTuple):
+    """reduce_regions process of a year, with the subindicator A years reduced
+    within it"""
+
+    process_id: str
+    "key of the year in the results, i.e. 2000 or 2000_2015_2018"
+
+    year: list
+    "land cover assets and years of the process"
+
+    shared: List[Tuple[str, dict]]
+    "process_id and year of each shared subindicator A year"
+
+    process: Union[ee.Dictionary, ee.FeatureCollection]
+    "process built with the default settings"
+
+    @property
+    def shared_years(self) -> List[dict]:
+        """Subindicator A years reduced within the process"""
+        return [shared_year for _, shared_year in self.shared]
+
+    @property
+    def label(self) -> str:
+        """Name of the process in the messages"""
+        return ", ".join(
+            [self.process_id, *[shared_id for shared_id, _ in self.shared]]
+        )
+
+
+class CalculationOutcome(NamedTuple):
+    """Outcome of the processes computed on the fly"""
+
+    results: ResultsDict
+    "results of the processes and of their shared years computed on the fly"
+
+    failed: List[str]
+    "process ids of the processes that timed out"
+
+    stopped: bool
+    "whether the calculation was cancelled"
+
+
+def plan_calculation(
+    settings: ReduceSettings,
+    years: list,
+    share_years: bool = True,
+    max_workers: int = 4,
+) -> List[PlannedProcess]:
+    """Group the years into processes and build them.
+
+    The processes are built concurrently, they retrieve the scale of the assets.
+    When share_years is True, the subindicator A years that are also part of a
+    subindicator B period are reduced within the process of the period, see
+    calculation_plan.plan_processes.
+    """
+
+    if share_years:
+        plan = plan_processes(years, settings.scale)
+    else:
+        plan = [(year, []) for year in years]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        processes = list(executor.map(lambda args: settings.get_process(*args), plan))
+
+    return [
+        PlannedProcess(
+            cs.years_from_dict(year),
+            year,
+            [
+                (cs.years_from_dict([shared_year]), shared_year)
+                for shared_year in shared
+            ],
+            process,
+        )
+        for (year, shared), process in zip(plan, processes)
+    ]
+
+
+def get_tasks(planned: List[PlannedProcess], order: List[str]) -> Dict[str, ee.Feature]:
+    """Return the feature to export of every process and shared year, in order"""
+
+    tasks = {}
+    for item in planned:
+        tasks[item.process_id] = ee.Feature(None, item.process).set(
+            "process_id", item.process_id
+        )
+
+        # The shared years are exported with their own process_id
+        for shared_id, shared_year in item.shared:
+            tasks[shared_id] = ee.Feature(
+                None, {"sub_a": item.process.get(get_shared_key(shared_year))}
+            ).set("process_id", shared_id)
+
+    return {process_id: tasks[process_id] for process_id in order}
+
+
+def lookup_cache(
+    cache: ReduceCache, settings: ReduceSettings, planned: List[PlannedProcess]
+) -> Tuple[Dict[str, str], Dict[str, Union[SubAYearDict, SubBYearDict]]]:
+    """Return the cache key of every process and the results already cached"""
+
+    aoi_key = settings.aoi.serialize()
+
+    keys, cached = {}, {}
+    for item in planned:
+        keys[item.process_id] = get_cache_key(
+            aoi_key,
+            item.year,
+            settings.matrix,
+            settings.transition_matrix,
+            settings.dem,
+            settings.rsa,
+            settings.scale,
+            shared_years=item.shared_years,
+        )
+        result = cache.get(keys[item.process_id])
+
+        if result is not None:
+            cached[item.process_id] = result
+
+    return keys, cached
+
+
+def compute_process(
+    settings: ReduceSettings,
+    item: PlannedProcess,
+    tiles: int,
+    tile_depth: int,
+    tile_workers: int,
+    log: Callable[[str], None],
+    attempt: Dict[str, Any],
+) -> Tuple[Union[SubAYearDict, SubBYearDict], bool]:
+    """Compute a process with the settings of an attempt (see RetryPolicy.attempts).
+
+    When the AOI is split in more than one partition, the tiles are reduced
+    concurrently with tile_workers threads and their areas are added up, the tiles
+    that time out are split into their quadrants up to tile_depth times.
+
+    Returns:
+        the result, and whether it can be cached: the results of a coarser scale
+        are not
+    """
+
+    partitions = max(attempt["partitions"], tiles)
+    default = attempt["tile_scale"] == TILE_SCALE and attempt["scale_factor"] == 1
+
+    def get_result(process):
+        result = process.getInfo()
+        if settings.flat:
+            result = flat_to_results({item.process_id: result})[item.process_id]
+        return result
+
+    # The process with the default settings is already built
+    if default and partitions == 1:
+        return get_result(item.process), True
+
+    # The coarser scale is relative to the scale of the process
+    scale = settings.scale or get_nominal_scale(item.year[0]["asset"])
+    scale *= attempt["scale_factor"]
+
+    def compute_region(region=None):
+        process = settings.get_process(
+            item.year, item.shared_years, region, scale, attempt["tile_scale"]
+        )
+        return get_result(process)
+
+    if partitions == 1:
+        result = compute_region()
+    else:
+        geometry = settings.aoi.geometry()
+        result = reduce_tiled(
+            lambda cell: {item.process_id: compute_region(get_tile(geometry, cell))},
+            get_bounds(geometry),
+            partitions,
+            max_depth=tile_depth,
+            max_workers=tile_workers,
+            keep_cells=get_cell_filter(geometry),
+            log=log,
+        )[item.process_id]
+
+    return result, attempt["scale_factor"] == 1
+
+
+def _from_cache(result: Union[SubAYearDict, SubBYearDict]) -> Tuple[Any, bool]:
+    """Return a cached result as compute_process does, it's not stored again"""
+
+    return result, False
+
+
+def _timed_out(attempt: Dict[str, Any]) -> None:
+    """Fail as a process timing out on the server, to test the fallbacks"""
+
+    raise Exception("Computation timed out.")
+
+
+def collect_results(
+    outcomes: Iterator[Tuple[str, str, Any]],
+    planned: Dict[str, PlannedProcess],
+    logger,
+    logs: Dict[str, List[str]],
+    fail_fast: bool = True,
+    cache: Optional[ReduceCache] = None,
+    keys: Optional[Dict[str, str]] = None,
+) -> CalculationOutcome:
+    """Gather the outcomes of run_concurrently and report the state of every
+    process to the logger.
+
+    Args:
+        outcomes: (process_id, status, value) of every process, where the value of
+            a success is the (result, cacheable) tuple of compute_process
+        planned: process id: planned process
+        logger: Logger or cw.Alert receiving the state of every process
+        logs: process id: messages of its attempts, the last one is reported
+        fail_fast: stop at the first process that times out
+        cache: stores the cacheable results with their keys
+
+    Raises:
+        Exception: if a process fails with an error that is not a time out
+    """
+
+    results: ResultsDict = {}
+    failed, stopped = [], False
+
+    with closing(outcomes):
+        for process_id, status, value in outcomes:
+            label = planned[process_id].label
+
+            if status == "success":
+                result, cacheable = value
+
+                if cache is not None and cacheable:
+                    cache.set(keys[process_id], result, process_id)
+
+                for shared_id, shared_year in planned[process_id].shared:
+                    results[shared_id] = {
+                        "sub_a": result.pop(get_shared_key(shared_year))
+                    }
+                results[process_id] = result
+
+                done = " ".join(["Done.", *logs[process_id][-1:]])
+                logger.set_msg(f"Calculating {label}... {done}", id_=process_id)
+                logger.set_state("success", id_=process_id)
+
+            elif status == "cancelled":
+                logger.set_msg(f"{label} has been cancelled.", id_=process_id)
+                logger.set_state("warning", id_=process_id)
+                stopped = True
+
+            elif status == "timeout" or is_timeout_error(value):
+                fallback = (
+                    "All tasks will be processed on the background. Skipping..."
+                    if fail_fast
+                    else "It will be processed on the background."
+                )
+                logger.set_msg(
+                    f"Warning: {label} failed on the fly. {fallback}",
+                    id_=process_id,
+                )
+                logger.set_state("warning", id_=process_id)
+                failed.append(process_id)
+
+                if fail_fast:
+                    break
+
+            else:
+                # For other exceptions, raise an error
+                raise Exception(f"There was an error trying to compute {value}")
+
+    return CalculationOutcome(results, failed, stopped)
+
+
 def perform_calculation(
     aoi: ee.Geometry,
     rsa: bool,
@@ -75,63 +431,151 @@ def perform_calculation(
     background: bool = False,
     scale: int = None,
     test_time_out: bool = False,
+    flat: bool = False,
+    share_years: bool = True,
+    max_workers: int = 4,
+    timeout: Optional[float] = None,
+    stop_event: Optional[threading.Event] = None,
+    local_results: Optional[ResultsDict] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    tiles: int = 1,
+    tile_depth: int = 2,
+    cache: Optional[ReduceCache] = None,
 ) -> Union[ResultsDict, ee.FeatureCollection, None]:
+    """Compute the results of every year on the fly, or return the FeatureCollection
+    to export as a background task when one of them fails.
+
+    The years are computed concurrently, max_workers at a time. When one of them
+    takes longer than timeout seconds or fails with one of the TIMEOUT_ERRORS, the
+    remaining ones are cancelled and all of them are sent to the background. A
+    getInfo can't be interrupted: the year that took too long keeps running in its
+    thread until the server answers, its result is ignored. When the stop_event is
+    set the calculation is cancelled and None is returned. The results are always
+    in the years order, whichever year finishes first.
+
+    When a local_results dictionary is given, a failed year doesn't stop the
+    calculation: the years computed on the fly are stored in it and only the failed
+    ones are returned in the FeatureCollection to export.
+
+    When a retry_policy is given, the years failing with one of the TIMEOUT_ERRORS
+    are retried with its settings (higher tileScale, AOI split into tiles, coarser
+    scale) before being sent to the background. Each attempt is logged.
+
+    When tiles is greater than 1, the AOI is split into a grid of at least tiles
+    cells that are reduced concurrently and added up. The tiles that time out are
+    split into their quadrants, up to tile_depth times (see tiling.reduce_tiled).
+    The max_workers are shared between the processes and their tiles. The retries
+    of the retry_policy with partitions are tiled the same way.
+
+    When a cache is given, the processes whose inputs were already computed are
+    read from it instead of calling getInfo, and the new results are stored in it.
+    The results of a coarser scale retry are not stored.
+
+    When flat is True the groups are not nested on the server, they are nested here
+    once the results are retrieved (the background tasks are read as usual).
+
+    When share_years is True, the subindicator A years that are also part of a
+    subindicator B period are reduced within the process of the period instead of
+    on their own, see calculation_plan.plan_processes.
+    """
     if not aoi:
         raise Exception(cm.error.no_aoi)
 
     if not logger:
         logger = Logger()
 
-    results: ResultsDict = {}
-    tasks = {}
-    all_succeeded = True
+    matrix = remap_matrix_a if len(years) == 1 else remap_matrix_b
+    settings = ReduceSettings(aoi, matrix, rsa, dem, transition_matrix, scale, flat)
 
-    for year in years:
-        process_id = cs.years_from_dict(year)
-        logger.set_msg(f"Calculating {process_id}...", id_=process_id)
+    planned = plan_calculation(settings, years, share_years, max_workers)
+    processes = {item.process_id: item for item in planned}
 
-        matrix = remap_matrix_a if len(years) == 1 else remap_matrix_b
+    # Keep the years order in the results and in the task
+    order = [cs.years_from_dict(year) for year in years]
+    tasks = get_tasks(planned, order)
 
-        process = reduce_regions(aoi, matrix, rsa, dem, year, transition_matrix, scale)
+    if background:
+        for process_id, item in processes.items():
+            logger.set_msg(
+                f"{item.label} has been scheduled for background processing.",
+                id_=process_id,
+            )
+            logger.set_state("info", id_=process_id)
 
-        tasks[process_id] = ee.Feature(None, process).set("process_id", process_id)
+        return ee.FeatureCollection(list(tasks.values()))
 
-        if not background and all_succeeded:
-            try:
-                if test_time_out:
-                    raise Exception("Computation timed out.")
+    keys, cached = lookup_cache(cache, settings, planned) if cache else ({}, {})
+    attempts = (retry_policy or RetryPolicy((), (), ())).attempts()
 
-                result: Union[SubAYearDict, SubBYearDict] = process.getInfo()
+    # The tiles of a process share the workers of the processes, so there are
+    # about max_workers requests at the same time and not max_workers²
+    tile_workers = max(1, max_workers // max(len(planned) - len(cached), 1))
 
-                logger.set_msg(f"Calculating {process_id}... Done.", id_=process_id)
-                logger.set_state("success", id_=process_id)
-                results[process_id] = result
+    calls, logs = {}, {}
+    for process_id, item in processes.items():
+        logs[process_id] = []
 
-            except Exception as e:
-                if "Computation timed out." in str(
-                    e
-                ) or "User memory limit exceeded" in str(e):
-                    logger.set_msg(
-                        f"Warning: {process_id} failed on the fly. All tasks will be processed on the background. Skipping...",
-                        id_=process_id,
-                    )
-                    logger.set_state("warning", id_=process_id)
-                else:
-                    # For other exceptions, raise an error
-                    raise Exception(f"There was an error trying to compute {e}")
-
-                all_succeeded = False
-
-        elif background:
-            all_succeeded = False
-            logger.set_msg(
-                f"{process_id} has been scheduled for background processing.",
-                id_=process_id,
+        if process_id in cached:
+            calls[process_id] = partial(_from_cache, cached[process_id])
+            logs[process_id].append("Loaded from the cache.")
+            continue
+
+        log = partial(_log_attempt, logger, logs[process_id], item)
+        compute = (
+            _timed_out
+            if test_time_out
+            else partial(
+                compute_process, settings, item, tiles, tile_depth, tile_workers, log
             )
-            logger.set_state("info", id_=process_id)
+        )
+        calls[process_id] = partial(
+            run_with_retries, compute, attempts, log if len(attempts) > 1 else None
+        )
 
-    if all_succeeded:
-        return results
-    else:
-        # At least one computation failed or background is True
+    for process_id, item in processes.items():
+        logger.set_msg(f"Calculating {item.label}...", id_=process_id)
+
+    outcome = collect_results(
+        run_concurrently(calls, max_workers, timeout, stop_event),
+        processes,
+        logger,
+        logs,
+        fail_fast=local_results is None,
+        cache=cache,
+        keys=keys,
+    )
+
+    if outcome.stopped:
+        # The calculation was cancelled by the user
+        return None
+
+    if not outcome.failed:
+        return {process_id: outcome.results[process_id] for process_id in order}
+
+    if local_results is None:
+        # At least one computation failed
         return ee.FeatureCollection(list(tasks.values()))
+
+    # Keep the years computed on the fly and only export the failed ones
+    failed_ids = set(outcome.failed)
+    for process_id in outcome.failed:
+        failed_ids.update(shared_id for shared_id, _ in processes[process_id].shared)
+
+    local_results.update(
+        {
+            process_id: outcome.results[process_id]
+            for process_id in order
+            if process_id in outcome.results
+        }
+    )
+
+    return ee.FeatureCollection(
+        [task for process_id, task in tasks.items() if process_id in failed_ids]
+    )
+
+
+def _log_attempt(logger, logs: List[str], item: PlannedProcess, msg: str) -> None:
+    """Keep the message of an attempt and report it to the logger"""
+
+    logs.append(msg)
+    logger.set_msg(f"Calculating {item.label}... {msg}", item.process_id)
@@ -0,0 +1,179 @@
+"""Chunked and resumable downloads of the Drive files.
+
+The file is requested chunk by chunk with Range headers and every chunk is
+appended to a ".part" file next to the output file, so a download interrupted
+(i.e. by a lost connection or a kernel restart) continues where it stopped. The
+part file is checked against the size and the md5 checksum given by Drive and
+renamed to the output file at once, so the output file is always complete.
+
+The http objects follow the httplib2 interface used by googleapiclient:
+http.request(uri, method, headers=...) returns a (response, content) tuple where
+the response is a dictionary of the lowercase headers with a status attribute.
+"""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional, Union
+
+from component.scripts.concurrent_calls import run_concurrently
+from component.types import Pathlike
+
+__all__ = [
+    "CHUNK_SIZE",
+    "DownloadJob",
+    "get_part_path",
+    "get_md5",
+    "download_resumable",
+    "download_many",
+]
+
+CHUNK_SIZE = 10 * 1024 * 1024
+"int: bytes requested at once, the chunks are written to the disk as they come"
+
+
+class DownloadJob(NamedTuple):
+    """A file to download"""
+
+    uri: str
+    "the media uri of the file, i.e. the uri of files().get_media(fileId=...)"
+
+    output_file: Pathlike
+    "path of the downloaded file"
+
+    size: Optional[int] = None
+    "expected number of bytes"
+
+    md5: Optional[str] = None
+    "expected md5 checksum (hexadecimal)"
+
+
+def get_part_path(output_file: Pathlike) -> Path:
+    """Return the path of the partial download of a file"""
+
+    output_file = Path(output_file)
+    return output_file.with_name(f"{output_file.name}.part")
+
+
+def get_md5(path: Pathlike, chunk_size: int = CHUNK_SIZE) -> str:
+    """Return the md5 checksum of a file, read by chunks"""
+
+    md5 = hashlib.md5()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            md5.update(chunk)
+
+    return md5.hexdigest()
+
+
+def _get_total_size(response) -> Optional[int]:
+    """Return the total size of a "content-range: bytes 0-99/1234" header"""
+
+    total = response.get("content-range", "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+def download_resumable(http, job: DownloadJob, chunk_size: int = CHUNK_SIZE) -> Path:
+    """Download a file chunk by chunk, continuing its partial download if any.
+
+    Args:
+        http: httplib2.Http like object, authorized to read the file
+        job: the file to download
+        chunk_size: bytes requested at once
+
+    Returns:
+        the path of the downloaded file
+
+    Raises:
+        Exception: if a request fails or if the downloaded file doesn't match the
+            expected size or checksum, the partial download is removed in the
+            latter case
+    """
+
+    output_file = Path(job.output_file)
+    part_file = get_part_path(output_file)
+
+    size = job.size
+    offset = part_file.stat().st_size if part_file.exists() else 0
+
+    with part_file.open("ab") as f:
+        while size is None or offset < size:
+            headers = {"Range": f"bytes={offset}-{offset + chunk_size - 1}"}
+            response, content = http.request(job.uri, "GET", headers=headers)
+
+            # The partial download already has all the bytes
+            if response.status == 416:
+                break
+
+            if response.status not in [200, 206]:
+                raise Exception(
+                    f"The download of {output_file.name} failed with the status "
+                    f"{response.status}."
+                )
+
+            # The server ignored the range and sent the whole file
+            if response.status == 200:
+                f.seek(0)
+                f.truncate()
+                f.write(content)
+                offset = len(content)
+                break
+
+            f.write(content)
+            offset += len(content)
+            size = size or _get_total_size(response)
+
+            if not content or size is None:
+                break
+
+    if job.size is not None and offset != job.size:
+        part_file.unlink()
+        raise Exception(f"{output_file.name} has {offset} bytes instead of {job.size}.")
+
+    if job.md5 is not None and get_md5(part_file) != job.md5:
+        part_file.unlink()
+        raise Exception(f"The checksum of {output_file.name} doesn't match.")
+
+    os.replace(part_file, output_file)
+
+    return output_file
+
+
+def download_many(
+    get_http: Callable[[], object],
+    jobs: Dict[str, DownloadJob],
+    max_workers: int = 4,
+    chunk_size: int = CHUNK_SIZE,
+    stop_event: Optional[threading.Event] = None,
+) -> Dict[str, Union[Path, Exception]]:
+    """Download several files with a bounded number of concurrent downloads.
+
+    httplib2 objects are not thread-safe, so every download uses its own.
+
+    Args:
+        get_http: returns a new authorized http object
+        jobs: key: file to download
+        max_workers: maximum number of files downloaded at the same time
+        chunk_size: bytes requested at once
+        stop_event: when set, the downloads not started yet are cancelled
+
+    Returns:
+        key: path of the downloaded file, or the exception raised by its download,
+        in the jobs order
+    """
+
+    calls = {
+        key: (lambda job=job: download_resumable(get_http(), job, chunk_size))
+        for key, job in jobs.items()
+    }
+
+    outcomes = {}
+    for key, status, value in run_concurrently(
+        calls, max_workers, stop_event=stop_event
+    ):
+        if status == "cancelled":
+            value = Exception(f"The download of {key} was cancelled.")
+        outcomes[key] = value
+
+    return {key: outcomes[key] for key in jobs}
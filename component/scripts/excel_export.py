@@ -0,0 +1,139 @@
+"""Write the report tables into an Excel workbook.
+
+The workbook is created in openpyxl write-only mode, so the rows are streamed to
+disk instead of keeping every cell of every sheet in memory. The column widths are
+computed from the dataframes before writing and the cell styles are created once
+per column, which avoids revisiting the cells once the sheets are written.
+
+The output is the same as writing the dataframes with pandas.DataFrame.to_excel and
+auto-fitting the columns afterwards: bold bordered headers, column width of the
+longest value + 4 and the OBS columns aligned to the right.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from openpyxl.utils import get_column_letter
+
+from component.types import Pathlike
+
+__all__ = ["get_excel_columns", "get_column_widths", "write_excel_sheets"]
+
+WIDTH_PADDING = 4
+"int: characters added to the longest value of each column"
+
+HEADER_FONT = Font(bold=True)
+"openpyxl.styles.Font: font of the header cells, same as pandas"
+
+HEADER_BORDER = Border(
+    left=Side(style="thin"),
+    right=Side(style="thin"),
+    top=Side(style="thin"),
+    bottom=Side(style="thin"),
+)
+"openpyxl.styles.Border: border of the header cells, same as pandas"
+
+HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="top")
+"openpyxl.styles.Alignment: alignment of the header cells, same as pandas"
+
+OBS_ALIGNMENT = Alignment(horizontal="right")
+"openpyxl.styles.Alignment: alignment of the OBS columns (header included)"
+
+
+def get_excel_columns(df: pd.DataFrame) -> List[list]:
+    """Return the values of each column as they are written in the cells.
+
+    Missing values are written as empty strings and infinite values as "inf", as
+    pandas.DataFrame.to_excel does.
+    """
+
+    columns = []
+    for _, series in df.items():
+        values = series.to_numpy(dtype=object)
+        missing = pd.isna(values)
+
+        if pd.api.types.is_float_dtype(series.dtype):
+            values = np.where(np.isposinf(series), "inf", values)
+            values = np.where(np.isneginf(series), "-inf", values)
+
+        columns.append(np.where(missing, "", values).tolist())
+
+    return columns
+
+
+def get_column_widths(df: pd.DataFrame, columns: List[list] = None) -> List[int]:
+    """Return the width of each column, the length of its longest value (header
+    included) + WIDTH_PADDING.
+
+    Args:
+        df: dataframe to write
+        columns: output of get_excel_columns, computed if not given
+    """
+
+    columns = get_excel_columns(df) if columns is None else columns
+
+    widths = []
+    for header, values in zip(df.columns, columns):
+        lengths = pd.Series(values, dtype=object).map(str).str.len().to_numpy()
+        widths.append(max(lengths.max(initial=0), len(str(header))) + WIDTH_PADDING)
+
+    return widths
+
+
+def write_excel_sheets(output_name: Pathlike, sheets: Dict[str, pd.DataFrame]) -> str:
+    """Stream the dataframes into an Excel workbook, one sheet per dataframe.
+
+    Args:
+        output_name: path of the output workbook
+        sheets: sheet name: dataframe, written in the same order
+
+    Returns:
+        the path of the written workbook
+    """
+
+    workbook = Workbook(write_only=True)
+
+    for sheet_name, df in sheets.items():
+        worksheet = workbook.create_sheet(sheet_name)
+
+        columns = get_excel_columns(df)
+        obs_columns = ["OBS" in str(header).upper() for header in df.columns]
+
+        # Column dimensions must be set before writing the first row
+        for i, width in enumerate(get_column_widths(df, columns), 1):
+            worksheet.column_dimensions[get_column_letter(i)].width = width
+
+        header_row = []
+        for header, is_obs in zip(df.columns, obs_columns):
+            cell = WriteOnlyCell(worksheet, value=header)
+            cell.font = HEADER_FONT
+            cell.border = HEADER_BORDER
+            cell.alignment = OBS_ALIGNMENT if is_obs else HEADER_ALIGNMENT
+            header_row.append(cell)
+        worksheet.append(header_row)
+
+        # Only the OBS columns need a styled cell, the other values are written as
+        # they are
+        for i, is_obs in enumerate(obs_columns):
+            if is_obs:
+                columns[i] = (_aligned_cell(worksheet, value) for value in columns[i])
+
+        for row in zip(*columns):
+            worksheet.append(row)
+
+    workbook.save(output_name)
+
+    return str(output_name)
+
+
+def _aligned_cell(worksheet, value) -> WriteOnlyCell:
+    """Return a right aligned write-only cell"""
+
+    cell = WriteOnlyCell(worksheet, value=value)
+    cell.alignment = OBS_ALIGNMENT
+
+    return cell
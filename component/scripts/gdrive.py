@@ -1,5 +1,4 @@
 from pathlib import Path
-import io
 import logging
 import json
 import component.parameter.directory as DIR
@@ -7,11 +6,17 @@ import component.parameter.directory as DIR
 from sepal_ui.scripts.warning import SepalWarning
 
 
-import ee
-import numpy as np
+import httplib2
 from apiclient import discovery
-from googleapiclient.http import MediaIoBaseDownload
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+
+from component.scripts.drive_download import (
+    DownloadJob,
+    download_many,
+    download_resumable,
+)
+from component.scripts.task_registry import DriveIndex, TaskRegistry
 
 logging.getLogger("googleapiclient.discovery_cache").setLevel(logging.ERROR)
 
@@ -38,6 +43,10 @@ class GDrive:
             credentials=Credentials(self.access_token),
         )
 
+        # Cached task states and file ids, shared by all the downloads
+        self.tasks = TaskRegistry()
+        self.files = DriveIndex(self.service)
+
     def print_file_list(self):
         service = self.service
 
@@ -73,56 +82,98 @@ class GDrive:
 
     def get_id(self, filename):
 
-        items = self.get_items()
-        # extract list of names and id and find the wanted file
-        namelist = np.array([items[i]["name"] for i in range(len(items))])
-        idlist = np.array([items[i]["id"] for i in range(len(items))])
-        file_pos = np.where(namelist == filename)
+        file_id = self.files.get_id(filename)
 
-        if len(file_pos[0]) == 0:
+        if file_id is None:
             return (0, filename + " not found")
         else:
-            return (1, idlist[file_pos])
+            return (1, [file_id])
+
+    def get_http(self):
+        """Return a new authorized http object, they are not thread-safe"""
+
+        return AuthorizedHttp(Credentials(self.access_token), http=httplib2.Http())
+
+    def get_download_job(self, file, output_file):
+        """Return the download job of a file of the index, its size and checksum
+        are listed with it so no request is needed"""
+
+        size = file.get("size")
+
+        return DownloadJob(
+            uri=self.service.files().get_media(fileId=file["id"]).uri,
+            output_file=output_file,
+            size=int(size) if size is not None else None,
+            md5=file.get("md5Checksum"),
+        )
 
     def download_file(self, filename, output_file):
 
-        # get file id
-        success, fId = self.get_id(filename)
-        if success == 0:
+        file = self.files.get_files([filename])[filename]
+        if file is None:
             print(filename + " not found")
             return
 
-        request = self.service.files().get_media(fileId=fId[0])
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while done is False:
-            status, done = downloader.next_chunk()
-            # print('Download %d%%.' % int(status.progress() * 100))
+        # The file is written by chunks and an interrupted download is resumed
+        job = self.get_download_job(file, output_file)
 
-        fo = open(output_file, "wb")
-        fo.write(fh.getvalue())
-        fo.close()
+        return download_resumable(self.get_http(), job)
 
-    def delete_file(self, items_to_search, filename):
+    def download_files(self, files, max_workers=4, stop_event=None):
+        """Download several files concurrently.
+
+        Args:
+            files (dict): file name in Drive: output file
+            max_workers (int): maximum number of files downloaded at the same time
+            stop_event (threading.Event): cancels the downloads not started yet
+
+        Returns:
+            file name: path of the downloaded file, or the exception raised by its
+            download
+        """
+
+        # All the files are resolved at once, before the downloads start, with
+        # their size and checksum
+        indexed = self.files.get_files(files)
+        outcomes = {
+            name: Exception(f"{name} not found")
+            for name, file in indexed.items()
+            if file is None
+        }
+
+        jobs = {
+            name: self.get_download_job(file, files[name])
+            for name, file in indexed.items()
+            if file is not None
+        }
+        outcomes.update(
+            download_many(self.get_http, jobs, max_workers, stop_event=stop_event)
+        )
+
+        return {name: outcomes[name] for name in files}
+
+    def delete_file(self, filename):
 
         # get file id
-        success, fId = self.get_id(items_to_search, filename)
+        success, fId = self.get_id(filename)
 
         if success == 0:
             print(filename + " not found")
+            return
 
         self.service.files().delete(fileId=fId[0]).execute()
+        self.files.forget(fId[0])
 
     def get_task(self, task_id):
         """Get the current state of the task"""
 
-        tasks_list = ee.batch.Task.list()
-        for task in tasks_list:
-            if task.id == task_id:
-                return task
+        return self.tasks.get(task_id)
+
+    def get_tasks(self, task_ids):
+        """Get the current state of several tasks at once, None for the ids that
+        don't exist"""
 
-        raise Exception(f"The task id {task_id} doesn't exist in your tasks.")
+        return self.tasks.resolve(task_ids)
 
     def download_from_task_file(self, task_id, tasks_file, task_filename):
         """Download csv file result from GDrive
@@ -1,16 +1,24 @@
 """Reduce land use/land cover image to bioclimatic belts regions using planimetric or real surface area"""
 
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 import ee
-import pandas as pd
 import component.parameter.module_parameter as param
 from component.scripts.surface_area import get_real_surface_area
 from component.parameter.module_parameter import transition_degradation_matrix
-from component.scripts.gee_parse_reduce_regions import filter_groups, reduceGroups
+from component.scripts.gee_parse_reduce_regions import (
+    filter_groups,
+    reduceGroups,
+    reduceGroupsFlat,
+)
+from component.scripts.task_csv import SUB_B_CATEGORIES
+from component.scripts.transition_matrix import TransitionMatrix
 
 NO_DATA_VALUE = 0
 """Union[int, None]: No data value for the remap process"""
 
+TILE_SCALE = 8
+"""int: default tileScale of the reduceRegions calls"""
+
 
 def no_remap(image: ee.Image, remap_matrix: Optional[dict] = None):
     """return remapped or raw image if there's a matrix"""
@@ -28,12 +36,19 @@ def reduce_by_regions(
     image: ee.Image,
     aoi: ee.FeatureCollection,
     scale: int,
+    flat: bool = False,
+    tile_scale: int = TILE_SCALE,
 ):
-    """Reduce image to bioclimatic belts regions using planimetric or real surface area"""
+    """Reduce image to bioclimatic belts regions using planimetric or real surface area
+
+    When flat is True, the groups are not nested on the server and the output is a
+    list of {"__path__": "biobelt_lc", "sum": area} dictionaries.
+    """
 
     # This is the reducer that will be used to calculate the area of each class
     reducer = ee.Reducer.sum().group(1, "lc").group(2, "biobelt")
     group_keys = ["lc", "biobelt"]
+    reduce_groups = reduceGroupsFlat if flat else reduceGroups
 
     feature_collection = (
         image_area.divide(param.UNITS["sqkm"][0])
@@ -45,12 +60,137 @@ def reduce_by_regions(
                 "collection": ee.FeatureCollection(aoi),
                 "reducer": reducer,
                 "scale": scale,
-                "tileScale": 8,
+                "tileScale": tile_scale,
             }
         )
     )
 
-    return reduceGroups(ee.Reducer.sum(), feature_collection, group_keys)
+    return reduce_groups(ee.Reducer.sum(), feature_collection, group_keys)
+
+
+def get_fused_reducer(
+    image_area: ee.Image, biobelt: ee.Image, image: ee.Image, names: List[str]
+) -> Tuple[ee.Image, ee.Reducer, Dict[str, str]]:
+    """Build a single grouped reducer computing the area per biobelt and class of
+    every band of image at once.
+
+    Each band is grouped by its own copy of the area and biobelt bands, the grouped
+    reducers are combined so all of them are computed in the same pass over the
+    pixels.
+
+    Args:
+        image_area: area of each pixel
+        biobelt: bioclimatic belts image
+        image: one band per name, in the same order
+        names: names of the outputs
+
+    Returns:
+        the input image of the reducer, the reducer and the output property of each
+        name
+    """
+
+    area = image_area.divide(param.UNITS["sqkm"][0]).updateMask(biobelt.mask())
+
+    images, reducer, outputs = [], None, {}
+    for i, name in enumerate(names):
+        images.append(
+            area.addBands(image.select([i]))
+            .addBands(biobelt)
+            .rename([f"area_{i}", name, f"biobelt_{i}"])
+        )
+
+        # This is the reducer that will be used to calculate the area of each class
+        grouped = ee.Reducer.sum().group(1, "lc").group(2, "biobelt")
+
+        if reducer is None:
+            reducer, outputs[name] = grouped, "groups"
+        else:
+            reducer = reducer.combine(grouped, f"{name}_")
+            outputs[name] = f"{name}_groups"
+
+    return ee.Image.cat(images), reducer, outputs
+
+
+def reduce_fused_by_regions(
+    image_area: ee.Image,
+    biobelt: ee.Image,
+    image: ee.Image,
+    aoi: ee.FeatureCollection,
+    scale: int,
+    names: List[str],
+    flat: bool = False,
+    tile_scale: int = TILE_SCALE,
+) -> ee.Dictionary:
+    """Reduce every band of image to bioclimatic belts regions in a single pass.
+
+    The output is the same as calling reduce_by_regions on each band, as a
+    dictionary with one key per name.
+    """
+
+    group_keys = ["lc", "biobelt"]
+    reduce_groups = reduceGroupsFlat if flat else reduceGroups
+    input_image, reducer, outputs = get_fused_reducer(image_area, biobelt, image, names)
+
+    feature_collection = input_image.reduceRegions(
+        **{
+            "collection": ee.FeatureCollection(aoi),
+            "reducer": reducer,
+            "scale": scale,
+            "tileScale": tile_scale,
+        }
+    )
+
+    # Split the fused output back into one "groups" collection per name
+    return ee.Dictionary(
+        {
+            name: reduce_groups(
+                ee.Reducer.sum(),
+                feature_collection.map(
+                    lambda feature, output=output: ee.Feature(
+                        None, {"groups": feature.get(output)}
+                    )
+                ),
+                group_keys,
+            )
+            for name, output in outputs.items()
+        }
+    )
+
+
+def reduce_by_features(
+    image_area: ee.Image,
+    biobelt: ee.Image,
+    image: ee.Image,
+    regions: ee.FeatureCollection,
+    scale: int,
+    names: List[str],
+    tile_scale: int = TILE_SCALE,
+):
+    """Reduce every band of image to bioclimatic belts regions of each feature
+    separately, in a single pass.
+
+    The output has the same features as regions, with the area of each biobelt and
+    land cover class (without the empty groups) in the property of each name.
+    """
+
+    input_image, reducer, outputs = get_fused_reducer(image_area, biobelt, image, names)
+
+    feature_collection = input_image.reduceRegions(
+        **{
+            "collection": regions,
+            "reducer": reducer,
+            "scale": scale,
+            "tileScale": tile_scale,
+        }
+    )
+
+    def set_names(feature):
+        for name, output in outputs.items():
+            groups = filter_groups(ee.Feature(None, {"groups": feature.get(output)}))
+            feature = feature.set(name, groups.get("groups"))
+        return feature
+
+    return feature_collection.map(set_names)
 
 
 def reduce_by_region(
@@ -92,6 +232,20 @@ def reduce_by_region(
     )
 
 
+def get_shared_key(year: Dict) -> str:
+    """Return the key of a subindicator A year reduced within a subindicator B
+    process, see reduce_regions"""
+
+    return f"sub_a_{year['year']}"
+
+
+def get_nominal_scale(asset: str) -> float:
+    """Return the nominal scale of the first band of a land cover asset, it's the
+    default scale of the reduce_regions process starting with this asset"""
+
+    return ee.Image(asset).select(0).projection().nominalScale().getInfo()
+
+
 def reduce_regions(
     aoi: ee.FeatureCollection,
     remap_matrix: dict,
@@ -100,7 +254,12 @@ def reduce_regions(
     lc_years: List[Tuple[Dict]],
     transition_matrix: str,
     scale: Optional[int] = None,
-) -> ee.Dictionary:
+    id_property: Optional[str] = None,
+    flat: bool = False,
+    shared_years: Optional[List[Dict]] = None,
+    shared_matrix: Optional[dict] = None,
+    tile_scale: int = TILE_SCALE,
+) -> Union[ee.Dictionary, ee.FeatureCollection]:
     """Reduce land use/land cover image to bioclimatic belts regions using planimetric
     or real surface area
 
@@ -111,12 +270,28 @@ def reduce_regions(
         lc_years (list of strings): list of years (gee asset id) of the land cover
         transition_matrix (pathlike): transition matrix file path
         scale (int): scale of the reduce process
+        id_property (str, optional): when given, the features of aoi are not merged
+            and all of them are reduced in a single reduceRegions call.
+        flat (bool): return the flat {"__path__", "sum"} groups instead of nesting
+            them on the server, see task_csv.flat_to_results.
+        shared_years (list, optional): subindicator A years reduced in the same pass
+            as the subindicator B period, each one is added with get_shared_key.
+            The process has to be computed at the same scale as each of them.
+        shared_matrix (dict, optional): remap matrix of the shared_years
+        tile_scale (int): tileScale of the reduceRegions calls, a higher value uses
+            less memory per tile at the cost of more tiles
 
     Return:
         GEE Dicionary process (is not yet executed), with land cover class area
-        per land cover (when both dates are input) and biobelts
+        per land cover (when both dates are input) and biobelts. When id_property
+        is given, a FeatureCollection with one feature per aoi feature, containing
+        the id_property and the same keys as the dictionary.
     """
 
+    regions = None
+    if id_property:
+        regions = ee.FeatureCollection(aoi).select([id_property])
+
     aoi = aoi.geometry()
 
     # extract years from lc_years
@@ -151,55 +326,46 @@ def reduce_regions(
             ee_lc_start, ee_end_base, ee_report, aoi, transition_matrix, remap_matrix
         )
 
-        return (
-            ee.Dictionary(
-                {
-                    "baseline_degradation": reduce_by_regions(
-                        image_area,
-                        clip_biobelt,
-                        final_degradation.select("baseline_degradation"),
-                        aoi,
-                        scale,
-                    )
-                }
-            )
-            .combine(
-                {
-                    "final_degradation": reduce_by_regions(
-                        image_area,
-                        clip_biobelt,
-                        final_degradation.select("final_degradation"),
-                        aoi,
-                        scale,
-                    )
-                }
-            )
-            .combine(
-                {
-                    "baseline_transition": reduce_by_regions(
-                        image_area,
-                        clip_biobelt,
-                        final_degradation.select("baseline_transition"),
-                        aoi,
-                        scale,
-                    )
-                }
-            )
-            .combine(
-                {
-                    "report_transition": reduce_by_regions(
-                        image_area,
-                        clip_biobelt,
-                        final_degradation.select("report_transition"),
-                        aoi,
-                        scale,
-                    )
-                }
-            )
+        # The land cover of the shared years is reduced along with the categories
+        shared_years = shared_years or []
+        names = SUB_B_CATEGORIES + [get_shared_key(year) for year in shared_years]
+        image = ee.Image.cat(
+            [final_degradation.select(SUB_B_CATEGORIES)]
+            + [
+                no_remap(ee.Image(year["asset"]).select(0), shared_matrix).rename(name)
+                for year, name in zip(shared_years, names[len(SUB_B_CATEGORIES) :])
+            ]
+        )
+
+        if regions is not None:
+            return reduce_by_features(
+                image_area, clip_biobelt, image, regions, scale, names, tile_scale
+            ).select([id_property, *names], None, False)
+
+        # The four categories are reduced in the same pass over the pixels
+        return reduce_fused_by_regions(
+            image_area, clip_biobelt, image, aoi, scale, names, flat, tile_scale
         )
 
+    if regions is not None:
+        return reduce_by_features(
+            image_area,
+            clip_biobelt,
+            no_remap(ee_lc_start, remap_matrix),
+            regions,
+            scale,
+            ["sub_a"],
+            tile_scale,
+        ).select([id_property, "sub_a"], None, False)
+
     reduced_collection = reduce_by_regions(
-        image_area, clip_biobelt, no_remap(ee_lc_start, remap_matrix), aoi, scale
+        image_area,
+        clip_biobelt,
+        no_remap(ee_lc_start, remap_matrix),
+        aoi,
+        scale,
+        flat,
+        tile_scale,
     )
 
     return ee.Dictionary({"sub_a": reduced_collection})
@@ -210,7 +376,7 @@ def get_transition(
     ee_end_base: ee.Image,
     ee_report: ee.Image,
     aoi: ee.Geometry,
-    transition_matrix: str,
+    transition_matrix: Union[str, TransitionMatrix],
     remap_matrix: Optional[Dict] = None,
 ):
     """Returns a transition image from two land cover images
@@ -221,7 +387,7 @@ def get_transition(
         ee_end_base (ee.Image): baseline end land cover image
         ee_report (ee.Image): reporting land cover image
         aoi (ee.Geometry): Area of interest
-        transition_matrix (str): Path to transition matrix, has to contain from_code, to_code and impact_code columns
+        transition_matrix (str, TransitionMatrix): Path to transition matrix, has to contain from_code, to_code and impact_code columns
         remap_matrix (Optional[Dict], optional): Remap matrix (from_code, to_code). Defaults to None.
     """
 
@@ -229,7 +395,7 @@ def get_transition(
     ee_start_base = no_remap(ee_start_base, remap_matrix).rename("land_cover_start")
     ee_end_base = no_remap(ee_end_base, remap_matrix).rename("land_cover_end")
     ee_report = no_remap(ee_report, remap_matrix).rename("land_cover_report")
-    transition_matrix = pd.read_csv(transition_matrix)
+    transitions, impacts = TransitionMatrix.load(transition_matrix).remap_lists()
 
     # Compute transition between baseline images
     baseline_transition = (
@@ -243,15 +409,11 @@ def get_transition(
 
     # Remap transitions according to the transition matrix
     baseline_degradation = baseline_transition.remap(
-        transition_matrix["transition"].tolist(),
-        transition_matrix["impact_code"].tolist(),
-        NO_DATA_VALUE,
+        transitions, impacts, NO_DATA_VALUE
     ).rename("baseline_degradation")
 
     report_degradation = report_transition.remap(
-        transition_matrix["transition"].tolist(),
-        transition_matrix["impact_code"].tolist(),
-        NO_DATA_VALUE,
+        transitions, impacts, NO_DATA_VALUE
     ).rename("report_degradation")
 
     # Create transition between degradation images
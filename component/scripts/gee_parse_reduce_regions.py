@@ -172,3 +172,16 @@ def reduceGroups(reducer, featureCollection, groupKeys):
     return ee.Dictionary(
         reduced.iterate(function=accumulate, first=ee.Dictionary())
     ).get("groups")
+
+
+def reduceGroupsFlat(reducer, featureCollection, groupKeys):
+    """Same as reduceGroups but without nesting the groups on the server.
+
+    It returns the output of reduceFlattened, a list of {"__path__": "1_2", "sum": x}
+    dictionaries where the path has the group values in the reversed groupKeys order
+    (i.e. biobelt_lc). It skips the iterate over every path, which is the most
+    expensive part of reduceGroups, the nesting is done client-side.
+    """
+
+    filtered_collection = ee.FeatureCollection(featureCollection.map(filter_groups))
+    return reduceFlattened(filtered_collection, reducer, groupKeys)
@@ -0,0 +1,193 @@
+"""Interpolation of the sub_a results for the reporting years that were not computed.
+
+The computed years of a results dictionary are parsed once into a years × cells
+matrix, where each cell is a (belt_class, lc_class) pair. All the requested
+reporting years are then interpolated from their bracket years in a single
+vectorized call.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from component.types import ResultsDict
+
+__all__ = ["INTERPOLATION_METHODS", "SubAYearMatrix"]
+
+
+def linear(x0, x1, x, y0, y1, belts):
+    """Linear interpolation between the two bracket years.
+
+    It uses the same operations as scipy.interpolate.interp1d so the output is
+    identical to the one previously computed with it.
+    """
+
+    slope = (y1 - y0) / (x1 - x0)
+
+    return slope * (x - x0) + y0
+
+
+def nearest(x0, x1, x, y0, y1, belts):
+    """Take the values of the closest bracket year (the first one on ties)"""
+
+    return np.where(x - x0 <= x1 - x, y0, y1)
+
+
+def constant_share(x0, x1, x, y0, y1, belts):
+    """Interpolate the belt areas linearly and keep the land cover shares of the
+    first bracket year inside each belt."""
+
+    total0 = np.zeros_like(y0)
+    total1 = np.zeros_like(y1)
+    for belt in np.unique(belts):
+        mask = belts == belt
+        total0[:, mask] = np.nansum(y0[:, mask], axis=1, keepdims=True)
+        total1[:, mask] = np.nansum(y1[:, mask], axis=1, keepdims=True)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = np.where(total0 > 0, y0 / total0, 0)
+
+    return share * linear(x0, x1, x, total0, total1, belts)
+
+
+INTERPOLATION_METHODS: Dict[str, Callable] = {
+    "linear": linear,
+    "nearest": nearest,
+    "constant_share": constant_share,
+}
+"dict: interpolation methods, all of them receive the bracket years (x0, x1), the target years (x), the bracket values (y0, y1) and the belt of each cell"
+
+
+class SubAYearMatrix:
+    """Sub_a areas of the computed years as a years × cells matrix.
+
+    Args:
+        results (dict): results dictionary coming from the model
+    """
+
+    def __init__(self, results: ResultsDict):
+        self.years = sorted(int(y) for y in results if len(y.split("_")) == 1)
+
+        cells: Dict[Tuple[int, int], int] = {}
+        orders: List[np.ndarray] = []
+        sums: List[List[float]] = []
+
+        for year in self.years:
+            order, year_sums = [], []
+            for belt in results[str(year)]["sub_a"]:
+                for group in belt["groups"]:
+                    key = (belt["biobelt"], group["lc"])
+                    order.append(cells.setdefault(key, len(cells)))
+                    year_sums.append(group["sum"])
+            orders.append(np.array(order, dtype=np.int64))
+            sums.append(year_sums)
+
+        cell_keys = np.array(list(cells), dtype=np.float64).reshape(-1, 2)
+        self.belts = cell_keys[:, 0]
+        self.classes = cell_keys[:, 1]
+
+        # Cells that are not present in a year are NaN
+        self.values = np.full((len(self.years), len(cells)), np.nan)
+        for i, (order, year_sums) in enumerate(zip(orders, sums)):
+            self.values[i, order] = year_sums
+
+        # Keep the order of each year, it's the one of the reduceRegions output
+        self.orders = dict(zip(self.years, orders))
+        self.year_index = {year: i for i, year in enumerate(self.years)}
+
+    def _frame(self, cols: np.ndarray, values: np.ndarray) -> pd.DataFrame:
+        """Return a parsed dataframe (belt_class, lc_class, sum) of the given cells"""
+
+        return pd.DataFrame(
+            {
+                "belt_class": self.belts[cols],
+                "lc_class": self.classes[cols],
+                "sum": values,
+            }
+        )
+
+    def get_year(self, year: int) -> pd.DataFrame:
+        """Return the parsed dataframe of a computed year"""
+
+        cols = self.orders[int(year)]
+        return self._frame(cols, self.values[self.year_index[int(year)], cols])
+
+    def interpolate(
+        self,
+        targets: Dict[int, Tuple[int, int]],
+        method: str = "linear",
+    ) -> Dict[int, pd.DataFrame]:
+        """Interpolate all the target years at once.
+
+        Only the cells present in both bracket years are interpolated, they are
+        returned in the order of the first bracket year.
+
+        Args:
+            targets (dict): target year: (bracket year 1, bracket year 2)
+            method (str): one of the INTERPOLATION_METHODS keys
+        """
+
+        if method not in INTERPOLATION_METHODS:
+            raise ValueError(
+                f"Unknown interpolation method '{method}', use one of "
+                f"{list(INTERPOLATION_METHODS)}"
+            )
+
+        if not targets:
+            return {}
+
+        target_years = list(targets)
+        x0, x1 = np.array([targets[year] for year in target_years], dtype=np.float64).T
+        x = np.array(target_years, dtype=np.float64)
+
+        y0 = self.values[[self.year_index[int(year)] for year in x0]]
+        y1 = self.values[[self.year_index[int(year)] for year in x1]]
+
+        interpolated = INTERPOLATION_METHODS[method](
+            x0[:, None], x1[:, None], x[:, None], y0, y1, self.belts
+        )
+
+        output = {}
+        for i, year in enumerate(target_years):
+            cols = self.orders[int(x0[i])]
+            cols = cols[~np.isnan(y1[i, cols])]
+            output[year] = self._frame(cols, interpolated[i, cols])
+
+        return output
+
+    def parse_years(
+        self,
+        reporting_years: Dict[int, list],
+        years: Optional[List[int]] = None,
+        method: str = "linear",
+    ) -> Dict[int, pd.DataFrame]:
+        """Return the parsed dataframe of each reporting year.
+
+        Computed years are returned as they are and the other ones are interpolated
+        between the bracket years defined in reporting_years.
+
+        Args:
+            reporting_years (dict): output of get_sub_a_break_points
+            years (list, optional): years to parse, all the reporting years by
+                default.
+            method (str): one of the INTERPOLATION_METHODS keys
+        """
+
+        years = list(reporting_years) if years is None else years
+
+        targets = {
+            int(year): tuple(item["year"] for item in reporting_years[int(year)][:2])
+            for year in years
+            if int(year) not in self.year_index
+        }
+        interpolated = self.interpolate(targets, method)
+
+        return {
+            year: (
+                interpolated[int(year)]
+                if int(year) in interpolated
+                else self.get_year(year)
+            )
+            for year in years
+        }
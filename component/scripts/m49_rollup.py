@@ -0,0 +1,194 @@
+"""Roll-up of the country results into the M49 regions.
+
+The results are areas, so the results of a region are the sum of the results of
+its countries (see result_algebra.add_results) and its MGCI and degradation
+percentages are computed from the summed areas with the usual report functions,
+without any new reduction in Earth Engine.
+
+The m49_countries.csv file of the module only lists the countries, so by default
+they are all rolled up into the World. The full hierarchy (regions, sub-regions
+and intermediate regions) is read from the "Standard country or area codes" file
+published by UNSD, see read_m49_regions.
+"""
+
+from typing import Dict, List, Literal, Optional
+
+import pandas as pd
+
+import component.parameter.module_parameter as param
+from component.scripts.report_tables import REPORT_TABLES
+from component.scripts.result_algebra import add_results
+from component.scripts.scripts import get_sub_a_batch_reports, get_sub_b_data_reports
+from component.types import Pathlike, ResultsDict
+
+__all__ = [
+    "WORLD",
+    "M49_LEVELS",
+    "get_m49_code",
+    "read_m49_regions",
+    "roll_up_results",
+    "get_roll_up_reports",
+]
+
+WORLD = "001"
+"str: M49 code of the World"
+
+M49_LEVELS = {
+    "world": ("Global Code", "Global Name"),
+    "region": ("Region Code", "Region Name"),
+    "sub-region": ("Sub-region Code", "Sub-region Name"),
+    "intermediate region": ("Intermediate Region Code", "Intermediate Region Name"),
+}
+"dict: level: (code column, name column) of the UNSD file, from the top level"
+
+COUNTRY_CODE = "M49 Code"
+"str: column of the country codes in the UNSD file"
+
+
+def get_m49_code(code) -> str:
+    """Return a M49 code as a 3 digits string, i.e. 4 -> "004" """
+
+    return str(int(code)).zfill(3)
+
+
+def read_m49_regions(path: Optional[Pathlike] = None) -> pd.DataFrame:
+    """Read the regions of each country.
+
+    Args:
+        path: semicolon separated "Standard country or area codes" file of UNSD
+            (with the M49_LEVELS columns). By default, the countries of
+            m49_countries.csv are all in the World.
+
+    Returns:
+        one row per country and region with the m49, region, region_name and level
+        columns, the codes are 3 digits strings
+    """
+
+    if path is None:
+        countries = pd.read_csv(param.M49_FILE, sep=";", dtype={"m49": str})
+
+        # Skip the rows without a valid code (Sark is shifted by one column)
+        countries = countries[countries.m49.str.isdigit().fillna(False)]
+        return pd.DataFrame(
+            {
+                "m49": countries.m49.map(get_m49_code),
+                "region": WORLD,
+                "region_name": "World",
+                "level": "world",
+            }
+        )
+
+    df = pd.read_csv(path, sep=";", dtype=str)
+
+    missing = {COUNTRY_CODE, *M49_LEVELS["world"]} - set(df.columns)
+    if missing:
+        raise ValueError(f"The M49 file is missing the columns {sorted(missing)}")
+
+    regions = []
+    for level, (code_col, name_col) in M49_LEVELS.items():
+        if code_col not in df.columns:
+            continue
+
+        # Not every country has an intermediate region
+        level_df = df[df[code_col].notna() & df[COUNTRY_CODE].notna()]
+        regions.append(
+            pd.DataFrame(
+                {
+                    "m49": level_df[COUNTRY_CODE].map(get_m49_code),
+                    "region": level_df[code_col].map(get_m49_code),
+                    "region_name": level_df[name_col],
+                    "level": level,
+                }
+            )
+        )
+
+    return pd.concat(regions, ignore_index=True)
+
+
+def roll_up_results(
+    country_results: Dict[str, ResultsDict], regions: Optional[pd.DataFrame] = None
+) -> Dict[str, ResultsDict]:
+    """Add up the results of the countries of each region.
+
+    Only the countries with results are added up, the regions without any of them
+    are not returned.
+
+    Args:
+        country_results: M49 code of the country: its results
+        regions: regions of each country, as returned by read_m49_regions
+
+    Returns:
+        M49 code of the region: its results, in the regions order
+    """
+
+    regions = read_m49_regions() if regions is None else regions
+    country_results = {get_m49_code(k): v for k, v in country_results.items()}
+
+    rolled_up = {}
+    for region, region_df in regions.groupby("region", sort=False):
+        results = [
+            country_results[m49] for m49 in region_df.m49 if m49 in country_results
+        ]
+        if results:
+            rolled_up[region] = add_results(*results)
+
+    return rolled_up
+
+
+def get_roll_up_reports(
+    country_results: Dict[str, ResultsDict],
+    reporting_years_sub_a: dict,
+    sub_b_year: dict,
+    transition_matrix: str,
+    source_detail: str,
+    regions: Optional[pd.DataFrame] = None,
+    which: Literal["both", "sub_a", "sub_b"] = "both",
+) -> Dict[str, pd.DataFrame]:
+    """Build the report tables of every region from the results of its countries.
+
+    The tables can be written with excel_export.write_excel_sheets or
+    report_tables.write_report_tables.
+
+    Args:
+        country_results: M49 code of the country: its results
+        reporting_years_sub_a: the reporting years for sub_a
+        sub_b_year: the reporting years for sub_b (user's input)
+        transition_matrix: the transition matrix file
+        source_detail: the source detail of the reports
+        regions: regions of each country, as returned by read_m49_regions
+        which: the subindicator tables to build
+
+    Returns:
+        table name: report of all the regions, in the REPORT_TABLES order
+    """
+
+    regions = read_m49_regions() if regions is None else regions
+    names = dict(zip(regions.region, regions.region_name))
+
+    tables: Dict[str, List[pd.DataFrame]] = {table: [] for table in REPORT_TABLES}
+
+    for region, results in roll_up_results(country_results, regions).items():
+        details = dict(
+            geo_area_name=names[region],
+            ref_area=int(region),
+            source_detail=source_detail,
+        )
+
+        if which in ["both", "sub_a"]:
+            mtn_df, grnvi_df, grncov_df = get_sub_a_batch_reports(
+                results, reporting_years_sub_a, **details
+            )
+            tables["Table1_ER_MTN_TOTL"].append(mtn_df)
+            tables["Table2_ER_MTN_GRNCOV"].append(grncov_df)
+            tables["Table3_ER_MTN_GRNCVI"].append(grnvi_df)
+
+        if which in ["both", "sub_b"]:
+            sub_b_reports = get_sub_b_data_reports(
+                results, sub_b_year, transition_matrix, **details
+            )
+            tables["Table4_ER_MTN_DGRDA"] += [report[1] for report in sub_b_reports]
+            tables["Table5_ER_MTN_DGRDP"] += [report[0] for report in sub_b_reports]
+
+    return {
+        table: pd.concat(dfs, ignore_index=True) for table, dfs in tables.items() if dfs
+    }
@@ -1,4 +1,6 @@
-from typing import List, Tuple
+from typing import List, Tuple, Union
+
+import numpy as np
 import pandas as pd
 
 import component.parameter.module_parameter as param
@@ -6,12 +8,36 @@ import component.scripts as cs
 
 # isort: off
 from component.parameter.index_parameters import mountain_area_cols
-from component.scripts.report_scripts import (
-    fill_parsed_df,
-    get_belt_desc,
-    get_nature,
-    get_obs_status,
-)
+from component.scripts.result_cube import SubACube, as_sub_a_cube, compensated_sum
+from component.scripts.report_scripts import annotate_report
+
+
+def get_mountain_area_by_year(data: Union[pd.DataFrame, SubACube]) -> pd.DataFrame:
+    """Area of each belt class and total area for every year of the cube.
+
+    Table1_MountainArea
+
+    Args:
+        data (SubACube, DataFrame): results of one or several years. Dataframes
+            with several years must have a 'year' column.
+    """
+
+    cube = as_sub_a_cube(data)
+    n_years, n_belts, _ = cube.values.shape
+
+    # Calculate belt area (all the belt classes are present in the cube)
+    belt_area = compensated_sum(cube.values, axis=2)
+
+    # Add total area for all belt_classes
+    return pd.DataFrame(
+        {
+            "year": np.repeat(cube.years, n_belts + 1),
+            "belt_class": np.tile(
+                np.append(cube.belts.astype(object), "Total"), n_years
+            ),
+            "sum": np.column_stack([belt_area, belt_area.sum(axis=1)]).ravel(),
+        }
+    )
 
 
 def get_mountain_area(parsed_df):
@@ -21,18 +47,45 @@ def get_mountain_area(parsed_df):
     Table1_MountainArea
     """
 
-    # Fill dataframe with missing values
-    df = fill_parsed_df(parsed_df.copy())
+    cube = as_sub_a_cube(parsed_df)
+    area_df = get_mountain_area_by_year(cube)
 
-    # Calculate belt area
-    belt_area_df = df.groupby(["belt_class"]).sum().reset_index()
+    return area_df[area_df.year == cube.years[0]].drop(columns="year")
 
-    # Add total area for all belt_classes
 
-    total_green = pd.DataFrame(columns=["belt_class", "sum"])
-    total_green.loc[0] = ["Total", belt_area_df["sum"].sum()]
+def _build_report(
+    area_df: pd.DataFrame, geo_area_name: str, ref_area: str, source_detail: str
+) -> pd.DataFrame:
+    """Add the report columns to a Table1 dataframe. The table must have a 'year'
+    column that will be used as time period.
+    """
+
+    report_df = area_df
+    report_df["OBS_VALUE"] = report_df["sum"]
+    report_df["OBS_VALUE_RSA"] = param.TBD  # TODO: check if we can report RSA
+    report_df["UNIT_MEASURE"] = "KM2"
+    report_df["UNIT_MULT"] = param.TBD
+
+    # The following cols are equal for both tables
+    report_df["Indicator"] = "15.4.2"
+    report_df["SeriesID"] = param.TBD
+    report_df["SERIES"] = param.TBD
+    report_df["SeriesDesc"] = param.TBD
+    report_df["GeoAreaName"] = geo_area_name
+    report_df["REF_AREA"] = ref_area
+    report_df["TIME_PERIOD"] = report_df["year"]
+    report_df["TIME_DETAIL"] = report_df["year"]
+    report_df["SOURCE_DETAIL"] = source_detail
+    report_df["COMMENT_OBS"] = "FAO estimate"
+
+    # round obs_value
+    report_df["OBS_VALUE"] = report_df["OBS_VALUE"].round(4)
+    report_df["OBS_VALUE_RSA"] = report_df["OBS_VALUE"].round(4)
+
+    # Add descriptions, "NA" values, NATURE and OBS_STATUS
+    report_df = annotate_report(report_df)
 
-    return pd.concat([belt_area_df, total_green])
+    return report_df[mountain_area_cols].reset_index(drop=True)
 
 
 def get_report(
@@ -55,39 +108,27 @@ def get_report(
         - source_detail
     """
 
-    report_df = get_mountain_area(parsed_df)
-    report_df["OBS_VALUE"] = report_df["sum"]
-    report_df["OBS_VALUE_RSA"] = param.TBD  # TODO: check if we can report RSA
-    report_df["UNIT_MEASURE"] = "KM2"
-    report_df["UNIT_MULT"] = param.TBD
+    area_df = get_mountain_area(parsed_df).assign(year=year)
 
-    # The following cols are equal for both tables
-    report_df["Indicator"] = "15.4.2"
-    report_df["SeriesID"] = param.TBD
-    report_df["SERIES"] = param.TBD
-    report_df["SeriesDesc"] = param.TBD
-    report_df["GeoAreaName"] = geo_area_name
-    report_df["REF_AREA"] = ref_area
-    report_df["TIME_PERIOD"] = year
-    report_df["TIME_DETAIL"] = year
-    report_df["SOURCE_DETAIL"] = source_detail
-    report_df["COMMENT_OBS"] = "FAO estimate"
-    report_df["BIOCLIMATIC_BELT"] = report_df.apply(get_belt_desc, axis=1)
-
-    # round obs_value
-    report_df["OBS_VALUE"] = report_df["OBS_VALUE"].round(4)
-    report_df["OBS_VALUE_RSA"] = report_df["OBS_VALUE"].round(4)
+    return _build_report(area_df, geo_area_name, ref_area, source_detail)
 
-    # Convert DataFrame to object type
-    report_df = report_df.astype(object)
 
-    # fill NaN values with "N/A"
-    report_df.fillna("NA", inplace=True)
+def get_report_by_year(
+    data: Union[pd.DataFrame, SubACube],
+    geo_area_name: str,
+    ref_area: str,
+    source_detail: str,
+) -> pd.DataFrame:
+    """Create the Table1_MountainArea report of all the years at once.
 
-    # fill zeros with "N/A"
-    report_df.replace(0, "NA", inplace=True)
+    The output is the same as concatenating the output of get_report for each
+    year.
 
-    report_df["NATURE"] = report_df.apply(get_nature, axis=1)
-    report_df["OBS_STATUS"] = report_df.apply(get_obs_status, axis=1)
+    Args:
+        data (SubACube, DataFrame): results of all the reporting years. Dataframes
+            must have a 'year' column.
+    """
 
-    return report_df[mountain_area_cols].reset_index(drop=True)
+    return _build_report(
+        get_mountain_area_by_year(data), geo_area_name, ref_area, source_detail
+    )
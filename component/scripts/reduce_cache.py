@@ -0,0 +1,226 @@
+"""Persistent cache of the reduce_regions results.
+
+Running a calculation again with the same inputs (AOI, land cover assets, remap
+matrix, transition matrix, DEM, RSA flag and scale) gives the same results, so the
+result of every process is stored in a SQLite database under RESULTS_DIR, keyed by
+a hash of its inputs (see get_cache_key). perform_calculation looks every process
+up before calling getInfo.
+
+The entries are evicted in least recently used order when the database is larger
+than max_size. The assets are identified by their id only, so the cache has to be
+invalidated when an asset is replaced with the same id:
+
+    python -m component.scripts.reduce_cache --all
+    python -m component.scripts.reduce_cache --process-id 2000_2015_2018
+    python -m component.scripts.reduce_cache --stats
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, List, Optional
+
+import component.parameter.directory as DIR
+from component.types import Pathlike
+
+__all__ = ["CACHE_VERSION", "CACHE_FILE", "get_cache_key", "ReduceCache"]
+
+CACHE_VERSION = 1
+"int: part of every key, to be increased when the format of the results changes"
+
+CACHE_FILE = DIR.RESULTS_DIR / "reduce_cache.sqlite"
+"Path: default location of the cache database"
+
+MAX_SIZE = 100 * 1024 * 1024
+"int: default maximum size of the cached results, in bytes"
+
+
+def _file_digest(path: Optional[Pathlike]) -> Optional[str]:
+    """Return the sha256 of the content of a file, so an edited file (i.e. a custom
+    transition matrix) doesn't match its previous results"""
+
+    if path is None or not Path(path).is_file():
+        return None if path is None else str(path)
+
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def get_cache_key(
+    aoi,
+    years: List[dict],
+    matrix: dict,
+    transition_matrix: Optional[Pathlike],
+    dem: Optional[str],
+    rsa: bool,
+    scale: Optional[float],
+    shared_years: Optional[List[dict]] = None,
+) -> str:
+    """Return a stable hash of the inputs of a process.
+
+    Args:
+        aoi: the ee object of the AOI (its serialized expression is hashed) or its
+            serialization
+        years: land cover assets and years of the process
+        matrix: remap matrix of the land cover classes
+        transition_matrix: path of the transition matrix file, its content is hashed
+        dem: DEM asset id
+        rsa: whether the real surface area is used
+        scale: scale of the reduction, None for the nominal scale of the assets
+        shared_years: sub A years reduced within the process
+    """
+
+    inputs = {
+        "version": CACHE_VERSION,
+        "aoi": aoi.serialize() if hasattr(aoi, "serialize") else aoi,
+        "years": years,
+        "shared_years": shared_years or [],
+        "matrix": matrix,
+        "transition_matrix": _file_digest(transition_matrix),
+        "dem": dem,
+        "rsa": bool(rsa),
+        "scale": scale,
+    }
+    text = json.dumps(inputs, sort_keys=True, default=str)
+
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ReduceCache:
+    """SQLite store of the process results, with a size bounded LRU eviction.
+
+    A connection is opened for every operation, so the cache can be used from
+    several threads.
+
+    Args:
+        path: database file, created if it doesn't exist
+        max_size: maximum size of the stored results in bytes
+        clock: function returning the current time in seconds
+    """
+
+    def __init__(
+        self,
+        path: Pathlike = CACHE_FILE,
+        max_size: int = MAX_SIZE,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = Path(path)
+        self.max_size = max_size
+        self.clock = clock
+
+        with self.connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, process_id TEXT, value TEXT, size INTEGER, "
+                "created REAL, accessed REAL)"
+            )
+
+    def connect(self) -> ContextManager[sqlite3.Connection]:
+        """Return a new connection to the database, to use as a context manager"""
+
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the result of a key and mark it as recently used, None if it's
+        not cached"""
+
+        with self.connect() as db:
+            row = db.execute("SELECT value FROM results WHERE key = ?", (key,))
+            row = row.fetchone()
+            if row is None:
+                return None
+
+            db.execute(
+                "UPDATE results SET accessed = ? WHERE key = ?", (self.clock(), key)
+            )
+
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, process_id: str = "") -> None:
+        """Store the result of a key and evict the least recently used results if
+        the cache is too large"""
+
+        text = json.dumps(value)
+        now = self.clock()
+
+        with self.connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (key, process_id, text, len(text), now, now),
+            )
+            self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """Remove the least recently used results until they fit in max_size"""
+
+        rows = db.execute(
+            "SELECT key, size FROM results ORDER BY accessed DESC, created DESC"
+        )
+
+        total, evicted = 0, []
+        for key, size in rows.fetchall():
+            total += size
+            if total > self.max_size:
+                evicted.append((key,))
+
+        db.executemany("DELETE FROM results WHERE key = ?", evicted)
+
+    def invalidate(
+        self, key: Optional[str] = None, process_id: Optional[str] = None
+    ) -> int:
+        """Remove the result of a key, the results of a process id or all of them
+        when none is given.
+
+        Returns:
+            the number of removed results
+        """
+
+        query, params = "DELETE FROM results", ()
+        if key is not None:
+            query, params = f"{query} WHERE key = ?", (key,)
+        elif process_id is not None:
+            query, params = f"{query} WHERE process_id = ?", (process_id,)
+
+        with self.connect() as db:
+            return db.execute(query, params).rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of results and their size in bytes"""
+
+        with self.connect() as db:
+            count, size = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+
+        return {"results": count, "size": size}
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, int]:
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cache", default=str(CACHE_FILE), help="database file")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--all", action="store_true", help="remove all the results")
+    group.add_argument("--key", help="remove the result of a key")
+    group.add_argument("--process-id", help="remove the results of a process id")
+    group.add_argument("--stats", action="store_true", help="print the cache size")
+    args = parser.parse_args(argv)
+
+    cache = ReduceCache(args.cache)
+
+    if args.stats:
+        stats = cache.stats()
+        print(f"{stats['results']} results, {stats['size']} bytes")
+        return stats
+
+    removed = cache.invalidate(args.key, args.process_id)
+    print(f"{removed} results removed")
+
+    return {"removed": removed}
+
+
+if __name__ == "__main__":
+    main()
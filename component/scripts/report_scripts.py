@@ -1,6 +1,8 @@
+import numpy as np
 import pandas as pd
 
 import component.parameter.module_parameter as param
+from component.scripts.transition_matrix import TransitionMatrix
 
 BELT_TABLE = pd.read_csv(param.BIOBELTS_DESC)
 "pd.Dataframe: bioclimatic belts classes and description"
@@ -8,6 +10,12 @@ BELT_TABLE = pd.read_csv(param.BIOBELTS_DESC)
 LC_CLASSES = pd.read_csv(param.LC_CLASSES)
 "pd.Dataframe: fixed land cover classes, description and colors"
 
+BELT_DESC = dict(zip(BELT_TABLE.belt_class, BELT_TABLE.desc))
+"dict: bioclimatic belt class to description"
+
+LC_DESC = dict(zip(LC_CLASSES.lc_class, LC_CLASSES.desc))
+"dict: land cover class to description"
+
 
 def get_nature(row):
     """return nature column based on OBS_VALUE"""
@@ -47,6 +55,51 @@ def get_lc_desc(row):
     return desc.values[0]
 
 
+def map_desc(codes: pd.Series, desc: dict) -> pd.Series:
+    """Return the description of each code, codes without description are kept.
+
+    It's the vectorized version of get_belt_desc and get_lc_desc.
+    """
+
+    return codes.map(desc).where(codes.isin(list(desc)), codes)
+
+
+def annotate_report(report_df: pd.DataFrame, land_cover: bool = False):
+    """Add the description and status columns shared by all the report tables.
+
+    It adds BIOCLIMATIC_BELT (and LAND_COVER if requested) from the class codes,
+    converts the dataframe to object, replaces the NaN and zero values by "NA" and
+    sets the NATURE and OBS_STATUS columns from OBS_VALUE. This is done column-wise
+    and gives the same output as applying get_belt_desc, get_lc_desc, get_nature and
+    get_obs_status row by row.
+
+    Args:
+        report_df (pd.DataFrame): report with belt_class, OBS_VALUE and, if
+            land_cover is True, lc_class columns.
+        land_cover (bool): whether to add the LAND_COVER column or not.
+    """
+
+    report_df["BIOCLIMATIC_BELT"] = map_desc(report_df["belt_class"], BELT_DESC)
+
+    if land_cover:
+        report_df["LAND_COVER"] = map_desc(report_df["lc_class"], LC_DESC)
+
+    # Convert DataFrame to object type
+    report_df = report_df.astype(object)
+
+    # fill NaN values with "N/A"
+    report_df.fillna("NA", inplace=True)
+
+    # fill zeros with "N/A"
+    report_df.replace(0, "NA", inplace=True)
+
+    missing = (report_df["OBS_VALUE"] == "NA").to_numpy()
+    report_df["NATURE"] = np.where(missing, "N", "C")
+    report_df["OBS_STATUS"] = np.where(missing, "M", "A")
+
+    return report_df
+
+
 def fill_parsed_df(parsed_df):
     """Fill parsed_df with missing values.
 
@@ -80,14 +133,7 @@ def get_impact(row, transition_matrix: str):
         transition_matrix: transition_matrix dataframe (custom or default)
     """
 
-    # Read the transition matrix safely with pandas
-    transition_table = pd.read_csv(transition_matrix)
-
-    # Check that both
-    if not all([row["from_lc"], row["to_lc"]]):
-        return 0
+    # The matrix is read once and cached by TransitionMatrix.load
+    transition_matrix = TransitionMatrix.load(transition_matrix)
 
-    return transition_table[
-        (transition_table.from_code == row["from_lc"])
-        & (transition_table.to_code == row["to_lc"])
-    ]["impact_code"].values[0]
+    return int(transition_matrix.impact_of(row["from_lc"], row["to_lc"]))
@@ -0,0 +1,246 @@
+"""Typed columnar files of the SDG report tables.
+
+The five report tables can be written as parquet, feather or csv files instead of a
+multi-sheet Excel workbook. They are much faster to write and to read back when the
+reports of several countries are combined, and the Excel workbook can be rendered
+from them at the very end with tables_to_excel.
+
+Every table is written with a fixed schema (TABLE_SCHEMAS): text columns are
+strings, the computed years are integers and the observation values are floats
+where the "NA" values of the report are stored as nulls.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from component.parameter.index_parameters import (
+    mountain_area_cols,
+    sub_a_cols,
+    sub_a_landtype_cols,
+    sub_b_landtype_cols,
+    sub_b_perc_cols,
+)
+from component.scripts.excel_export import write_excel_sheets
+from component.types import Pathlike
+
+__all__ = [
+    "REPORT_FORMATS",
+    "REPORT_TABLES",
+    "TABLE_SCHEMAS",
+    "to_schema",
+    "from_schema",
+    "get_table_path",
+    "write_report_tables",
+    "read_report_tables",
+    "tables_to_excel",
+]
+
+REPORT_FORMATS = ["xlsx", "parquet", "feather", "csv"]
+"list: output formats of export_reports, parquet and feather require pyarrow"
+
+NA_VALUE = "NA"
+"str: value of the missing observations in the report tables"
+
+
+def _schema(
+    columns: List[str], integers: Tuple[str, ...] = (), text: Tuple[str, ...] = ()
+) -> Dict[str, str]:
+    """Return the dtype of each column.
+
+    Args:
+        columns: columns of the report table
+        integers: columns stored as nullable integers
+        text: OBS columns that are not computed yet and are stored as strings
+    """
+
+    schema = {}
+    for col in columns:
+        if col in integers:
+            schema[col] = "Int64"
+        elif col.startswith("OBS_VALUE") and col not in text:
+            schema[col] = "float64"
+        else:
+            schema[col] = "string"
+
+    return schema
+
+
+TABLE_SCHEMAS: Dict[str, Dict[str, str]] = {
+    "Table1_ER_MTN_TOTL": _schema(
+        mountain_area_cols, integers=("TIME_PERIOD", "TIME_DETAIL")
+    ),
+    "Table2_ER_MTN_GRNCOV": _schema(
+        sub_a_landtype_cols, integers=("TIME_PERIOD", "TIME_DETAIL")
+    ),
+    "Table3_ER_MTN_GRNCVI": _schema(
+        sub_a_cols, integers=("TIME_PERIOD", "TIME_DETAIL")
+    ),
+    "Table4_ER_MTN_DGRDA": _schema(
+        sub_b_landtype_cols, text=("OBS_VALUE_RSA", "OBS_VALUE_RSA_NET")
+    ),
+    "Table5_ER_MTN_DGRDP": _schema(sub_b_perc_cols),
+}
+"dict: table name: {column: dtype}, the fixed schema of the columnar files"
+
+REPORT_TABLES = list(TABLE_SCHEMAS)
+"list: names of the report tables, in the workbook order"
+
+
+def to_schema(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    """Cast a report table to its fixed schema.
+
+    Args:
+        df: report table as returned by the report functions
+        table: one of REPORT_TABLES keys
+
+    Raises:
+        ValueError: if a column is missing or if a numeric column has a value that
+            is neither a number nor "NA"
+    """
+
+    schema = TABLE_SCHEMAS[table]
+    df = df.reset_index(drop=True)
+
+    missing = set(schema) - set(df.columns)
+    if missing:
+        raise ValueError(f"The {table} table is missing the columns {sorted(missing)}")
+
+    typed = {}
+    for col, dtype in schema.items():
+        if dtype == "string":
+            typed[col] = df[col].astype("string")
+        else:
+            # Only the "NA" observations become nulls, any other value that is not a
+            # number would be lost
+            missing = df[col].isna() | (df[col].astype(str) == NA_VALUE)
+            values = pd.to_numeric(df[col].where(~missing), errors="coerce")
+
+            invalid = values.isna() & ~missing
+            if invalid.any():
+                raise ValueError(
+                    f"The {col} column of the {table} table has non numeric values: "
+                    f"{sorted(df[col][invalid].astype(str).unique())}"
+                )
+
+            typed[col] = values.astype(dtype)
+
+    return pd.DataFrame(typed)
+
+
+def from_schema(df: pd.DataFrame, table: str) -> pd.DataFrame:
+    """Return a typed table as a report table, with "NA" for the missing
+    observation values.
+
+    Args:
+        df: table with the fixed schema, i.e. read from a columnar file
+        table: one of REPORT_TABLES keys
+    """
+
+    schema = TABLE_SCHEMAS[table]
+    df = df[list(schema)].astype(object)
+
+    for col, dtype in schema.items():
+        if dtype != "string":
+            df[col] = df[col].where(df[col].notna(), NA_VALUE)
+
+    return df
+
+
+def get_table_path(folder: Pathlike, prefix: str, table: str, file_format: str) -> Path:
+    """Return the path of the columnar file of a table"""
+
+    return Path(folder, f"{prefix}_{table}.{file_format}")
+
+
+def write_report_tables(
+    tables: Dict[str, pd.DataFrame], folder: Pathlike, prefix: str, file_format: str
+) -> List[str]:
+    """Write the report tables as typed columnar files.
+
+    Args:
+        tables: table name: report table
+        folder: output folder
+        prefix: prefix of the file names, i.e. the workbook name without extension
+        file_format: one of parquet, feather or csv
+
+    Returns:
+        the paths of the written files, in the tables order
+    """
+
+    if file_format not in REPORT_FORMATS[1:]:
+        raise ValueError(
+            f"Unknown table format '{file_format}', use one of {REPORT_FORMATS[1:]}"
+        )
+
+    paths = []
+    for table, df in tables.items():
+        path = get_table_path(folder, prefix, table, file_format)
+        typed_df = to_schema(df, table)
+
+        if file_format == "parquet":
+            typed_df.to_parquet(path, index=False)
+        elif file_format == "feather":
+            typed_df.to_feather(path)
+        else:
+            typed_df.to_csv(path, index=False)
+
+        paths.append(str(path))
+
+    return paths
+
+
+def read_report_tables(paths: List[Pathlike]) -> Dict[str, pd.DataFrame]:
+    """Read the columnar files written by write_report_tables.
+
+    The table of each file and its format are taken from the file name.
+
+    Returns:
+        table name: typed table, in the REPORT_TABLES order
+    """
+
+    tables = {}
+    for path in map(Path, paths):
+        table = next((name for name in REPORT_TABLES if path.stem.endswith(name)), None)
+        if table is None:
+            raise ValueError(f"{path.name} is not a report table file")
+
+        schema = TABLE_SCHEMAS[table]
+        file_format = path.suffix[1:]
+
+        if file_format == "parquet":
+            df = pd.read_parquet(path)
+        elif file_format == "feather":
+            df = pd.read_feather(path)
+        elif file_format == "csv":
+            # Only the empty cells are missing values, "NA" is a valid text
+            df = pd.read_csv(
+                path,
+                dtype=schema,
+                keep_default_na=False,
+                na_values={col: [""] for col, t in schema.items() if t != "string"},
+            )
+        else:
+            raise ValueError(f"Unknown table format '{file_format}'")
+
+        tables[table] = df.astype(schema)
+
+    return {table: tables[table] for table in REPORT_TABLES if table in tables}
+
+
+def tables_to_excel(paths: List[Pathlike], output_name: Pathlike) -> str:
+    """Render the Excel workbook of a set of columnar report tables.
+
+    Args:
+        paths: files written by write_report_tables
+        output_name: path of the output workbook
+
+    Returns:
+        the path of the written workbook
+    """
+
+    tables = read_report_tables(paths)
+    sheets = {table: from_schema(df, table) for table, df in tables.items()}
+
+    return write_excel_sheets(output_name, sheets)
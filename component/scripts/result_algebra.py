@@ -0,0 +1,99 @@
+"""Operations on the results dictionaries returned by perform_calculation.
+
+The results are areas per biobelt and land cover class (or transition/impact code
+for subindicator B), so the results of disjoint areas can be added up into the
+results of their union, or subtracted to get the results of the difference.
+"""
+
+from typing import Dict, Tuple
+
+from component.types import ResultsDict
+
+__all__ = ["add_results", "subtract_results", "merge_results"]
+
+
+def _iter_areas(results: ResultsDict):
+    """Yield ((process_id, category, biobelt, lc), sum) for each leaf group"""
+
+    for process_id, result in results.items():
+        for category, items in result.items():
+            for item in items or []:
+                belt = item["biobelt"]
+                for group in item["groups"]:
+                    yield (process_id, category, belt, group["lc"]), group["sum"]
+
+
+def _to_results(areas: Dict[Tuple, float], categories: Dict) -> ResultsDict:
+    """Nest the areas keyed by (process_id, category, biobelt, lc)"""
+
+    results: ResultsDict = {
+        process_id: {category: [] for category in process_categories}
+        for process_id, process_categories in categories.items()
+    }
+    belts: Dict[Tuple, dict] = {}
+
+    for (process_id, category, belt, lc), sum_ in areas.items():
+        key = (process_id, category, belt)
+        if key not in belts:
+            belts[key] = {"biobelt": belt, "groups": []}
+            results[process_id][category].append(belts[key])
+        belts[key]["groups"].append({"lc": lc, "sum": sum_})
+
+    return results
+
+
+def add_results(*results: ResultsDict) -> ResultsDict:
+    """Add up the areas of several results, i.e. the results of the parts of an AOI.
+
+    The process ids and categories of all the results are kept, the areas of the
+    same (process_id, category, biobelt, lc) are summed.
+    """
+
+    areas: Dict[Tuple, float] = {}
+    categories: Dict[str, Dict[str, None]] = {}
+
+    for result in results:
+        for process_id, process_result in result.items():
+            categories.setdefault(process_id, {}).update(dict.fromkeys(process_result))
+        for key, sum_ in _iter_areas(result):
+            areas[key] = areas.get(key, 0) + sum_
+
+    return _to_results(areas, categories)
+
+
+def subtract_results(results: ResultsDict, other: ResultsDict) -> ResultsDict:
+    """Subtract the areas of other from results, i.e. remove the results of a part
+    of the AOI.
+
+    The groups of other that are not in results are kept with a negative area, so
+    other must be included in results for the output to be meaningful.
+    """
+
+    negated = [
+        {process_id: {category: [] for category in result}}
+        for process_id, result in other.items()
+    ]
+    negated += [
+        {
+            process_id: {
+                category: [{"biobelt": belt, "groups": [{"lc": lc, "sum": -sum_}]}]
+            }
+        }
+        for (process_id, category, belt, lc), sum_ in _iter_areas(other)
+    ]
+
+    return add_results(results, *negated)
+
+
+def merge_results(*results: ResultsDict) -> ResultsDict:
+    """Merge the process ids of several results of the same AOI, i.e. the years
+    computed on the fly and the ones exported as a task.
+
+    A process id found in several results is taken from the last one.
+    """
+
+    merged: ResultsDict = {}
+    for result in results:
+        merged.update(result)
+
+    return merged
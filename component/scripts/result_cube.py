@@ -0,0 +1,411 @@
+"""Dense NumPy representation of the calculation results.
+
+The nested results dictionary (see component.types.ResultsDict) is convenient to
+transfer the reduceRegions output from GEE but it's expensive to query. The cubes
+defined here store the areas in dense arrays indexed by year, belt and land cover
+class, so the reporting tables can be computed with plain array reductions.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from component.scripts.report_scripts import BELT_TABLE, LC_CLASSES
+from component.scripts.task_csv import SUB_B_CATEGORIES, read_task_columns
+from component.types import Pathlike, ResultColumns, ResultsDict
+
+__all__ = [
+    "SubACube",
+    "SubBCube",
+    "as_sub_a_cube",
+    "as_sub_b_cube",
+    "compensated_sum",
+]
+
+
+def _index_map(codes: Sequence) -> Dict:
+    """Return a dictionary mapping each code to its position in the axis"""
+    return {code: i for i, code in enumerate(codes)}
+
+
+def _axis(observed: np.ndarray, reference: Sequence[int] = ()) -> np.ndarray:
+    """Return the sorted union of the observed and the reference codes"""
+    return np.union1d(np.asarray(observed, dtype=np.int64), np.asarray(reference))
+
+
+def _positions(axis: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Return the position of each code in the (sorted) axis"""
+    return np.searchsorted(axis, np.asarray(codes, dtype=np.int64))
+
+
+def compensated_sum(
+    values: np.ndarray,
+    axis: Union[int, Tuple[int, ...]],
+    mask: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Sum the values over the given axis (or axes) with Kahan summation.
+
+    The cells are accumulated in order and the ones where mask is False are
+    skipped, which is what pandas does when summing the rows of a groupby. This
+    keeps the tables computed from a cube equal to the ones computed with pandas.
+
+    Args:
+        values (array): values to sum
+        axis (int, tuple): axis or axes to reduce
+        mask (array): boolean array broadcastable to values, cells to sum
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    mask = np.ones(values.shape, dtype=bool) if mask is None else mask
+    mask = np.broadcast_to(mask, values.shape)
+
+    axes = (axis,) if isinstance(axis, int) else tuple(axis)
+    axes = tuple(ax % values.ndim for ax in axes)
+    target = tuple(range(values.ndim - len(axes), values.ndim))
+
+    values = np.moveaxis(values, axes, target)
+    mask = np.moveaxis(mask, axes, target)
+    shape = values.shape[: values.ndim - len(axes)]
+    values = values.reshape(shape + (-1,))
+    mask = mask.reshape(shape + (-1,))
+
+    total = np.zeros(shape)
+    compensation = np.zeros(shape)
+    for i in range(values.shape[-1]):
+        y = values[..., i] - compensation
+        t = total + y
+        compensation = np.where(mask[..., i], (t - total) - y, compensation)
+        total = np.where(mask[..., i], t, total)
+
+    return total
+
+
+class SubACube:
+    """Sub-A land cover areas as a dense years × belt × lc array.
+
+    Args:
+        years (array): reporting years, first axis of values
+        belts (array): bioclimatic belt codes, second axis of values
+        classes (array): land cover class codes, third axis of values
+        values (array): area of each year, belt and land cover class
+        observed (array): boolean array with the same shape as values, True where
+            the combination was returned by the reduction.
+    """
+
+    def __init__(
+        self,
+        years: np.ndarray,
+        belts: np.ndarray,
+        classes: np.ndarray,
+        values: np.ndarray,
+        observed: Optional[np.ndarray] = None,
+    ):
+        self.years = np.asarray(years, dtype=np.int64)
+        self.belts = np.asarray(belts, dtype=np.int64)
+        self.classes = np.asarray(classes, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.observed = (
+            np.asarray(observed, dtype=bool)
+            if observed is not None
+            else np.ones(self.values.shape, dtype=bool)
+        )
+
+        self.year_index = _index_map(self.years.tolist())
+        self.belt_index = _index_map(self.belts.tolist())
+        self.class_index = _index_map(self.classes.tolist())
+
+    @classmethod
+    def from_flat(cls, years, belts, classes, sums) -> "SubACube":
+        """Build the cube from flat arrays, one item per (year, belt, lc) area"""
+
+        years = np.asarray(years, dtype=np.int64)
+        belts = np.asarray(belts, dtype=np.int64)
+        classes = np.asarray(classes, dtype=np.int64)
+
+        year_axis = np.unique(years)
+        belt_axis = _axis(belts, BELT_TABLE.belt_class)
+        class_axis = _axis(classes, LC_CLASSES.lc_class)
+
+        idx = (
+            _positions(year_axis, years),
+            _positions(belt_axis, belts),
+            _positions(class_axis, classes),
+        )
+        shape = (len(year_axis), len(belt_axis), len(class_axis))
+
+        values = np.zeros(shape)
+        observed = np.zeros(shape, dtype=bool)
+        np.add.at(values, idx, np.asarray(sums, dtype=np.float64))
+        observed[idx] = True
+
+        return cls(year_axis, belt_axis, class_axis, values, observed)
+
+    @classmethod
+    def from_results(cls, results: ResultsDict) -> "SubACube":
+        """Build the cube from the single year items of a results dictionary"""
+
+        years, belts, classes, sums = [], [], [], []
+        for process_id, result in results.items():
+            if len(process_id.split("_")) > 1:
+                continue
+            for belt in result["sub_a"]:
+                for group in belt["groups"]:
+                    years.append(int(process_id))
+                    belts.append(belt["biobelt"])
+                    classes.append(group["lc"])
+                    sums.append(group["sum"])
+
+        return cls.from_flat(years, belts, classes, sums)
+
+    @classmethod
+    def from_columns(cls, columns: ResultColumns) -> "SubACube":
+        """Build the cube from the columnar output of read_from_csv"""
+
+        mask = columns["category"] == "sub_a"
+        return cls.from_flat(
+            columns["process_id"][mask].astype(np.int64),
+            columns["biobelt"][mask],
+            columns["lc"][mask],
+            columns["sum"][mask],
+        )
+
+    @classmethod
+    def from_csv(cls, task_file: Pathlike) -> "SubACube":
+        """Build the cube from a task csv file downloaded from GDrive"""
+        return cls.from_columns(read_task_columns(task_file))
+
+    @classmethod
+    def from_dataframe(cls, parsed_df: pd.DataFrame, year: int = 0) -> "SubACube":
+        """Build the cube from a parsed dataframe (belt_class, lc_class, sum).
+
+        If the dataframe has no "year" column, all the rows are assigned to the
+        given year.
+        """
+
+        years = (
+            parsed_df["year"] if "year" in parsed_df else np.full(len(parsed_df), year)
+        )
+
+        return cls.from_flat(
+            years, parsed_df["belt_class"], parsed_df["lc_class"], parsed_df["sum"]
+        )
+
+    def year_values(self, year: Optional[int] = None) -> np.ndarray:
+        """Return the belt × lc array of the given year (the first one by default)"""
+
+        if year is None:
+            return self.values[0]
+
+        return self.values[self.year_index[int(year)]]
+
+    def to_dataframe(self, year: Optional[int] = None) -> pd.DataFrame:
+        """Return the observed areas of the given year as a parsed dataframe"""
+
+        i = 0 if year is None else self.year_index[int(year)]
+        belt_idx, class_idx = np.nonzero(self.observed[i])
+
+        return pd.DataFrame(
+            {
+                "belt_class": self.belts[belt_idx],
+                "lc_class": self.classes[class_idx],
+                "sum": self.values[i][belt_idx, class_idx],
+            }
+        )
+
+
+class SubBCube:
+    """Sub-B areas as a dense years × category × belt × from_lc × to_lc array.
+
+    The transition categories (baseline_transition, report_transition) are decoded
+    into the from_lc and to_lc axes. The degradation categories contain impact
+    codes, which are stored with from_lc = 0 and to_lc = impact code, the same way
+    as a transition code lower than 100 is decoded.
+
+    Args:
+        years (list): process ids of each reporting period (i.e. "2000_2015_2018")
+        categories (list): sub_b categories, second axis of values
+        belts (array): bioclimatic belt codes, third axis of values
+        classes (array): land cover class codes, last two axes of values
+        values (array): area of each period, category, belt and transition
+        observed (array): boolean array with the same shape as values, True where
+            the combination was returned by the reduction.
+    """
+
+    def __init__(
+        self,
+        years: List[str],
+        categories: List[str],
+        belts: np.ndarray,
+        classes: np.ndarray,
+        values: np.ndarray,
+        observed: Optional[np.ndarray] = None,
+    ):
+        self.years = list(years)
+        self.categories = list(categories)
+        self.belts = np.asarray(belts, dtype=np.int64)
+        self.classes = np.asarray(classes, dtype=np.int64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.observed = (
+            np.asarray(observed, dtype=bool)
+            if observed is not None
+            else np.ones(self.values.shape, dtype=bool)
+        )
+
+        self.year_index = _index_map(self.years)
+        self.category_index = _index_map(self.categories)
+        self.belt_index = _index_map(self.belts.tolist())
+        self.class_index = _index_map(self.classes.tolist())
+
+    @classmethod
+    def from_flat(cls, years, categories, belts, transitions, sums) -> "SubBCube":
+        """Build the cube from flat arrays, one item per (period, category, belt,
+        transition) area"""
+
+        years = np.asarray(years, dtype=object)
+        categories = np.asarray(categories, dtype=object)
+        transitions = np.asarray(transitions, dtype=np.int64)
+        belts = np.asarray(belts, dtype=np.int64)
+
+        from_lc, to_lc = transitions // 100, transitions % 100
+
+        year_axis = sorted(set(years.tolist()))
+        cat_axis = list(SUB_B_CATEGORIES) + sorted(
+            set(categories.tolist()) - set(SUB_B_CATEGORIES)
+        )
+        belt_axis = _axis(belts, BELT_TABLE.belt_class)
+        class_axis = _axis(np.concatenate([from_lc, to_lc]), LC_CLASSES.lc_class)
+
+        year_pos, cat_pos = _index_map(year_axis), _index_map(cat_axis)
+        idx = (
+            np.array([year_pos[y] for y in years], dtype=np.int64),
+            np.array([cat_pos[c] for c in categories], dtype=np.int64),
+            _positions(belt_axis, belts),
+            _positions(class_axis, from_lc),
+            _positions(class_axis, to_lc),
+        )
+        shape = (
+            len(year_axis),
+            len(cat_axis),
+            len(belt_axis),
+            len(class_axis),
+            len(class_axis),
+        )
+
+        values = np.zeros(shape)
+        observed = np.zeros(shape, dtype=bool)
+        np.add.at(values, idx, np.asarray(sums, dtype=np.float64))
+        observed[idx] = True
+
+        return cls(year_axis, cat_axis, belt_axis, class_axis, values, observed)
+
+    @classmethod
+    def from_results(cls, results: ResultsDict) -> "SubBCube":
+        """Build the cube from the multi year items of a results dictionary"""
+
+        years, categories, belts, transitions, sums = [], [], [], [], []
+        for process_id, result in results.items():
+            if len(process_id.split("_")) == 1:
+                continue
+            for category, items in result.items():
+                for belt in items:
+                    for group in belt["groups"]:
+                        years.append(process_id)
+                        categories.append(category)
+                        belts.append(belt["biobelt"])
+                        transitions.append(group["lc"])
+                        sums.append(group["sum"])
+
+        return cls.from_flat(years, categories, belts, transitions, sums)
+
+    @classmethod
+    def from_columns(cls, columns: ResultColumns) -> "SubBCube":
+        """Build the cube from the columnar output of read_from_csv"""
+
+        mask = columns["category"] != "sub_a"
+        return cls.from_flat(
+            columns["process_id"][mask],
+            columns["category"][mask],
+            columns["biobelt"][mask],
+            columns["lc"][mask],
+            columns["sum"][mask],
+        )
+
+    @classmethod
+    def from_csv(cls, task_file: Pathlike) -> "SubBCube":
+        """Build the cube from a task csv file downloaded from GDrive"""
+        return cls.from_columns(read_task_columns(task_file))
+
+    @classmethod
+    def from_dataframe(cls, parsed_df: pd.DataFrame, year: str = "") -> "SubBCube":
+        """Build the cube from a parsed dataframe (category, belt_class, transition,
+        sum).
+
+        If the dataframe has no "year" column, all the rows are assigned to the
+        given process id.
+        """
+
+        years = (
+            parsed_df["year"] if "year" in parsed_df else np.full(len(parsed_df), year)
+        )
+
+        return cls.from_flat(
+            years,
+            parsed_df["category"],
+            parsed_df["belt_class"],
+            parsed_df["transition"],
+            parsed_df["sum"],
+        )
+
+    def category_values(self, category: str, year: Optional[str] = None) -> np.ndarray:
+        """Return the belt × from_lc × to_lc array of the given category and period
+        (the first one by default)"""
+
+        i = 0 if year is None else self.year_index[year]
+        return self.values[i, self.category_index[category]]
+
+    def category_observed(
+        self, category: str, year: Optional[str] = None
+    ) -> np.ndarray:
+        """Return the observed mask of the given category and period"""
+
+        i = 0 if year is None else self.year_index[year]
+        return self.observed[i, self.category_index[category]]
+
+    def to_dataframe(self, category: str, year: Optional[str] = None) -> pd.DataFrame:
+        """Return the observed areas of the given category as a parsed dataframe"""
+
+        observed = self.category_observed(category, year)
+        values = self.category_values(category, year)
+        belt_idx, from_idx, to_idx = np.nonzero(observed)
+
+        from_lc, to_lc = self.classes[from_idx], self.classes[to_idx]
+
+        return pd.DataFrame(
+            {
+                "category": category,
+                "belt_class": self.belts[belt_idx],
+                "transition": from_lc * 100 + to_lc,
+                "sum": values[belt_idx, from_idx, to_idx],
+                "from_lc": from_lc,
+                "to_lc": to_lc,
+            }
+        )
+
+
+def as_sub_a_cube(data: Union[pd.DataFrame, SubACube]) -> SubACube:
+    """Return the sub_a data as a cube, building it from a parsed dataframe if needed"""
+
+    if isinstance(data, SubACube):
+        return data
+
+    return SubACube.from_dataframe(data)
+
+
+def as_sub_b_cube(data: Union[pd.DataFrame, SubBCube]) -> SubBCube:
+    """Return the sub_b data as a cube, building it from a parsed dataframe if needed"""
+
+    if isinstance(data, SubBCube):
+        return data
+
+    return SubBCube.from_dataframe(data)
@@ -0,0 +1,154 @@
+"""Cache of the parsed results of a calculation.
+
+The results dictionary returned by the calculation (or read from a task file) is
+a nested json-like structure. Parsing it into dataframes is done by the dashboard
+every time a year is selected and again by the report export. The ResultsCache
+keeps every parsed element so each of them is parsed only once per results
+dictionary. The elements are keyed on a fingerprint of the results, so they are
+dropped when the results are replaced (reset) but also when they are updated in
+place (i.e. model.results[key] = ...).
+"""
+
+import hashlib
+import json
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import pandas as pd
+
+from component.scripts.interpolation import SubAYearMatrix
+from component.scripts.scripts import (
+    get_sub_b_key,
+    parse_result,
+    select_sub_b_year,
+)
+from component.types import ResultsDict
+
+__all__ = ["get_fingerprint", "ResultsCache"]
+
+
+def get_fingerprint(results: Optional[ResultsDict]) -> str:
+    """Return a hash of the content of a results dictionary"""
+
+    text = json.dumps(results, sort_keys=True, default=str)
+
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class ResultsCache:
+    """Memoize the parsed elements of a results dictionary.
+
+    Args:
+        results (dict, optional): results dictionary coming from the model
+    """
+
+    def __init__(self, results: Optional[ResultsDict] = None):
+        self.reset(results)
+
+    def reset(self, results: Optional[ResultsDict] = None) -> None:
+        """Drop all the parsed elements and set the new results"""
+
+        self.results = results
+        self.fingerprint = get_fingerprint(results)
+        self._cache: Dict[Hashable, Any] = {}
+
+    def validate(self) -> None:
+        """Drop the parsed elements if the results were modified in place"""
+
+        fingerprint = get_fingerprint(self.results)
+
+        if fingerprint != self.fingerprint:
+            self.fingerprint = fingerprint
+            self._cache = {}
+
+    def _get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached element or create it with factory, without validating
+        the cache"""
+
+        if key not in self._cache:
+            self._cache[key] = factory()
+
+        return self._cache[key]
+
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached element or create it with factory"""
+
+        self.validate()
+
+        return self._get(key, factory)
+
+    @property
+    def year_matrix(self) -> SubAYearMatrix:
+        """Sub_a computed years parsed as a single matrix"""
+
+        return self.get("year_matrix", lambda: SubAYearMatrix(self.results))
+
+    def sub_a_years(
+        self,
+        reporting_years: Dict[int, list],
+        years: Optional[List[int]] = None,
+        method: str = "linear",
+    ) -> Dict[int, pd.DataFrame]:
+        """Return the parsed dataframe of each sub_a reporting year.
+
+        Same output as scripts.parse_sub_a_years, but the years that were already
+        parsed (or interpolated with the same bracket years and method) are reused.
+
+        Args:
+            reporting_years (dict): output of get_sub_a_break_points
+            years (list, optional): years to parse, all the reporting years by
+                default.
+            method (str): one of the INTERPOLATION_METHODS keys
+        """
+
+        self.validate()
+        years = list(reporting_years) if years is None else years
+        year_matrix = self._get("year_matrix", lambda: SubAYearMatrix(self.results))
+
+        def bracket(year: int) -> Tuple[int, ...]:
+            if int(year) in year_matrix.year_index:
+                return ()
+            return tuple(item["year"] for item in reporting_years[int(year)][:2])
+
+        keys = {year: ("sub_a", int(year), bracket(year), method) for year in years}
+        missing = [year for year in years if keys[year] not in self._cache]
+
+        # Interpolate all the missing years in a single call
+        if missing:
+            parsed = year_matrix.parse_years(reporting_years, missing, method)
+            for year in missing:
+                self._cache[keys[year]] = parsed[year]
+
+        return {year: self._cache[keys[year]] for year in years}
+
+    def sub_a_year(
+        self, reporting_years: Dict[int, list], year: int, method: str = "linear"
+    ) -> pd.DataFrame:
+        """Return the parsed dataframe of a single sub_a reporting year"""
+
+        return self.sub_a_years(reporting_years, [year], method)[year]
+
+    def sub_b_year(self, target_year: Dict[str, Tuple[int, int]]) -> pd.DataFrame:
+        """Return the parsed sub_b dataframe of the given period.
+
+        Same output as scripts.parse_sub_b_year, the results of each period are
+        parsed only once and shared by the baseline and report selections.
+
+        Args:
+            target_year: {'baseline': [2000, 2015]} or {'report': [2015, 2020]}
+        """
+
+        self.validate()
+        key = get_sub_b_key(self.results, target_year)
+
+        if key is None:
+            return None
+
+        def select() -> pd.DataFrame:
+            parsed_df = self._get(
+                ("sub_b", key), lambda: parse_result(self.results[key], single=False)
+            )
+            return select_sub_b_year(parsed_df, target_year)
+
+        category = "baseline" if "baseline" in target_year else "report"
+
+        return self._get(("sub_b", key, category), select)
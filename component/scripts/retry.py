@@ -0,0 +1,134 @@
+"""Retry ladder of the on the fly computations.
+
+When a process fails with one of the TIMEOUT_ERRORS, it's retried with settings that
+are more likely to finish: first with a higher tileScale, then splitting the AOI
+into tiles and, only when the user allows it, at a coarser scale. Every attempt and
+its duration is logged.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from component.scripts.gee import TILE_SCALE
+
+__all__ = [
+    "TIMEOUT_ERRORS",
+    "COARSER_SCALE_FACTORS",
+    "RetryPolicy",
+    "describe_attempt",
+    "is_timeout_error",
+    "run_with_retries",
+]
+
+TIMEOUT_ERRORS = ["Computation timed out.", "User memory limit exceeded"]
+"list: errors of the on the fly computations that can be retried or sent to the background"
+
+COARSER_SCALE_FACTORS = (2, 4)
+"tuple: factors of the scale tried when the user allows a coarser scale"
+
+
+def is_timeout_error(error: BaseException) -> bool:
+    """Return True if the error is one of the TIMEOUT_ERRORS"""
+
+    return any(message in str(error) for message in TIMEOUT_ERRORS)
+
+
+class RetryPolicy:
+    """Settings of the consecutive attempts of a process.
+
+    Each attempt is a dictionary with the tile_scale of the reduceRegions calls, the
+    number of parts the AOI is split into and the factor applied to the scale. The
+    first attempt uses the default settings, then each step keeps the settings of
+    the previous one.
+
+    Args:
+        tile_scales: tileScale of the retries
+        partitions: number of parts of the AOI, tried after the tile scales
+        scale_factors: factors of the scale, tried after the partitions. Leave it
+            empty when a coarser scale is not allowed.
+    """
+
+    def __init__(
+        self,
+        tile_scales: Sequence[int] = (16,),
+        partitions: Sequence[int] = (4,),
+        scale_factors: Sequence[float] = (),
+    ):
+        self.tile_scales = list(tile_scales)
+        self.partitions = list(partitions)
+        self.scale_factors = list(scale_factors)
+
+    def attempts(self) -> List[Dict[str, Any]]:
+        """Return the settings of every attempt, in order"""
+
+        attempt = {"tile_scale": TILE_SCALE, "partitions": 1, "scale_factor": 1}
+        attempts = [attempt]
+
+        steps = [
+            ("tile_scale", self.tile_scales),
+            ("partitions", self.partitions),
+            ("scale_factor", self.scale_factors),
+        ]
+        for key, values in steps:
+            for value in values:
+                attempt = {**attempt, key: value}
+                attempts.append(attempt)
+
+        return attempts
+
+
+def describe_attempt(attempt: Dict[str, Any]) -> str:
+    """Return a short description of the settings of an attempt"""
+
+    return (
+        f"tileScale={attempt['tile_scale']}, partitions={attempt['partitions']}, "
+        f"scale x{attempt['scale_factor']}"
+    )
+
+
+def run_with_retries(
+    compute: Callable[[Dict[str, Any]], Any],
+    attempts: List[Dict[str, Any]],
+    log: Optional[Callable[[str], None]] = None,
+    clock: Callable[[], float] = time.monotonic,
+) -> Any:
+    """Call compute with the settings of each attempt until one of them succeeds.
+
+    Only the TIMEOUT_ERRORS are retried, the other errors and the error of the last
+    attempt are raised.
+
+    Args:
+        compute: function computing the process with the settings of an attempt
+        attempts: settings of the attempts, see RetryPolicy.attempts
+        log: function receiving the message of each attempt
+        clock: function returning the current time in seconds
+    """
+
+    log = log or (lambda msg: None)
+
+    for i, attempt in enumerate(attempts, 1):
+        start = clock()
+        settings = describe_attempt(attempt)
+
+        try:
+            result = compute(attempt)
+
+        except Exception as e:
+            elapsed = clock() - start
+            if not is_timeout_error(e) or i == len(attempts):
+                log(
+                    f"Attempt {i}/{len(attempts)} ({settings}) failed in {elapsed:.1f}s"
+                )
+                raise
+
+            log(
+                f"Attempt {i}/{len(attempts)} ({settings}) failed in {elapsed:.1f}s, "
+                "retrying..."
+            )
+            continue
+
+        log(
+            f"Attempt {i}/{len(attempts)} ({settings}) finished in {clock() - start:.1f}s"
+        )
+
+        return result
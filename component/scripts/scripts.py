@@ -1,17 +1,12 @@
 from typing import TYPE_CHECKING
-from component.types import Pathlike
+from component.types import Pathlike, ResultColumns, ResultsDict
 import random
-import re
 from pathlib import Path
-from typing import Dict, List, Literal, Tuple, Union
+from typing import Dict, List, Literal, Optional, Tuple, Union
 
 import ipyvuetify as v
 import numpy as np
 import pandas as pd
-from scipy.interpolate import interp1d
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Alignment
-
 
 import component.parameter.directory as DIR
 import component.parameter.module_parameter as param
@@ -19,9 +14,15 @@ import component.scripts as cs
 from component.scripts import mountain_area as mntn
 from component.scripts import sub_a as sub_a
 from component.scripts import sub_b as sub_b
+from component.scripts.excel_export import write_excel_sheets
+from component.scripts.interpolation import SubAYearMatrix
+from component.scripts.report_tables import write_report_tables
+from component.scripts.result_cube import SubACube
+from component.scripts.task_csv import read_task_columns, read_task_results
 
 if TYPE_CHECKING:
     from component.model.model import MgciModel
+    from component.scripts.results_cache import ResultsCache
 
 
 __all__ = [
@@ -40,8 +41,12 @@ __all__ = [
     "years_from_dict",
     "parse_to_year_a",
     "parse_sub_b_year",
+    "get_sub_b_key",
+    "select_sub_b_year",
     "parse_result",
     "get_reporting_years",
+    "get_sub_a_batch_reports",
+    "parse_sub_a_years",
 ]
 
 
@@ -286,7 +291,12 @@ def parse_to_year_a(results, reporting_years, year: int) -> Union[pd.DataFrame,
 
 
 def interpolate_sub_a_data(
-    results: dict, reporting_years, year1: int, year2: int, target_year: int
+    results: dict,
+    reporting_years,
+    year1: int,
+    year2: int,
+    target_year: int,
+    method: str = "linear",
 ) -> pd.DataFrame:  # type: ignore
     """Interpolate sub A data between two years.
 
@@ -295,6 +305,7 @@ def interpolate_sub_a_data(
         year1 (int): first year
         year2 (int): second year
         target_year (int): target year
+        method (str): interpolation method, one of INTERPOLATION_METHODS keys
     """
 
     if not year2 > year1:
@@ -302,61 +313,93 @@ def interpolate_sub_a_data(
 
     if not (year1 < target_year < year2):
         raise Exception("target year has to be in between year1 and year 2")
-    df1 = parse_to_year_a(results, reporting_years, year1)
-    df2 = parse_to_year_a(results, reporting_years, year2)
 
-    # Ensure both dataframes have the same structure
-    if not (df1.columns == df2.columns).all():
-        raise Exception("Dataframes must have the same columns")
+    # Only the cells present in both years are interpolated. The method can be
+    # changed without having to change the rest of the code
+    year_matrix = SubAYearMatrix(results)
+    interpolated = year_matrix.interpolate({target_year: (year1, year2)}, method)
 
-    # Merge dataframes on belt_class and lc_class
-    # This will ensure that the dataframes have the same structure
-    merged_df = df1.merge(df2, on=["belt_class", "lc_class"])
+    return interpolated[target_year]
 
-    # Perform linear interpolation between y1 and y2
-    # I've used this function because later we can change the interpolation
-    # method without having to change the rest of the code
 
-    interp_func = interp1d(
-        [year1, year2], np.vstack([merged_df["sum_x"], merged_df["sum_y"]]), axis=0
-    )
+def parse_sub_a_years(
+    results: dict,
+    reporting_years,
+    years: Optional[List[int]] = None,
+    method: str = "linear",
+) -> Dict[int, pd.DataFrame]:
+    """Return the parsed dataframe of each sub_a reporting year.
 
-    # Get the interpolated data for the requested year
-    interpolated_data = interp_func(target_year)
+    Each computed year is parsed only once and all the missing reporting years are
+    interpolated in a single call.
 
-    # Create a new DataFrame with the interpolated data
-    df_interpolated = merged_df[["belt_class", "lc_class"]].copy()
-    df_interpolated["sum"] = interpolated_data
+    Args:
+        results (dict): dictionary with results coming from model
+        reporting_years (dict): output of get_sub_a_break_points
+        years (list, optional): years to parse, all the reporting years by default
+        method (str): interpolation method, one of INTERPOLATION_METHODS keys
+    """
 
-    return df_interpolated
+    return SubAYearMatrix(results).parse_years(reporting_years, years, method)
 
 
-def parse_sub_b_year(
+def get_sub_b_key(
     results: Dict, target_year: Dict[str, Tuple[int, int]]
-) -> pd.DataFrame:
-    """Return the parsed df for the given year .
+) -> Union[str, None]:
+    """Return the results key containing the requested sub_b period.
 
     Args:
         target_year: a dictionary with the following structure:
             {'baseline': [2000, 2015]}, or
             {'report': [2015, 2020]}
     """
+
+    sub_b_keys = [key for key in results.keys() if len(key.split("_")) > 1]
+
+    # All the keys contain the baseline
     if "baseline" in target_year:
-        for key in results.keys():
-            if len(key.split("_")) > 1:
-                df = parse_result(results[key], single=False)
-                # Decode transition to from_code and to_code
-                df.loc[:, "from_lc"] = df.transition // 100
-                df.loc[:, "to_lc"] = df.transition % 100
-                return df[df.category == "baseline_transition"]
+        return next(iter(sub_b_keys), None)
 
     # target_year is a tuple of the (start_baseline, report_year)
     year = target_year.get("report")[1]
-    for key in results.keys():
-        if len(key.split("_")) > 1:
-            if str(year) in key:
-                df = parse_result(results[key], single=False)
-                return df[df.category == "final_degradation"]
+    return next((key for key in sub_b_keys if str(year) in key), None)
+
+
+def select_sub_b_year(
+    df: pd.DataFrame, target_year: Dict[str, Tuple[int, int]]
+) -> pd.DataFrame:
+    """Select the rows of a parsed sub_b result needed for the given period.
+
+    Args:
+        df: output of parse_result(results[key], single=False)
+        target_year: {'baseline': [2000, 2015]} or {'report': [2015, 2020]}
+    """
+
+    if "baseline" in target_year:
+        # Decode transition to from_code and to_code
+        df = df.assign(from_lc=df.transition // 100, to_lc=df.transition % 100)
+        return df[df.category == "baseline_transition"]
+
+    return df[df.category == "final_degradation"]
+
+
+def parse_sub_b_year(
+    results: Dict, target_year: Dict[str, Tuple[int, int]]
+) -> pd.DataFrame:
+    """Return the parsed df for the given year .
+
+    Args:
+        target_year: a dictionary with the following structure:
+            {'baseline': [2000, 2015]}, or
+            {'report': [2015, 2020]}
+    """
+
+    key = get_sub_b_key(results, target_year)
+
+    if key is None:
+        return None
+
+    return select_sub_b_year(parse_result(results[key], single=False), target_year)
 
 
 def parse_result(result: dict, single: bool = False) -> pd.DataFrame:
@@ -416,37 +459,21 @@ def parse_result(result: dict, single: bool = False) -> pd.DataFrame:
     return df
 
 
-def read_from_csv(task_file: Pathlike) -> dict:
+def read_from_csv(
+    task_file: Pathlike, columnar: bool = False
+) -> Union[ResultsDict, ResultColumns]:
     """read csv format from feature collection exportation in gee
 
     Args:
         task_file(path): full path of downloaded task
+        columnar (bool): if True, return flat arrays (process_id, category, biobelt,
+            lc, sum) instead of the nested results dictionary.
     """
 
-    sub_b_cats = [
-        "baseline_degradation",
-        "final_degradation",
-        "baseline_transition",
-        "report_transition",
-    ]
-    results = {}
-    raw_results_df = pd.read_csv(task_file)
-
-    def read_line(line):
-        return eval(
-            re.sub(r"([a-zA-Z]+)", r"'\1'", line).replace("=", ":").replace("'E'", "E")
-        )
-
-    for _, row in raw_results_df.iterrows():
+    if columnar:
+        return read_task_columns(task_file)
 
-        if len(str(row["process_id"]).split("_")) > 1:
-            results[row["process_id"]] = {}
-            for cat in sub_b_cats:
-                results[row["process_id"]][cat] = read_line(row[cat])
-        else:
-            results[str(row["process_id"])] = {"sub_a": read_line(row["sub_a"])}
-
-    return results
+    return read_task_results(task_file)
 
 
 def get_sub_a_break_points(user_input_years: list) -> dict:
@@ -546,6 +573,70 @@ def get_sub_a_data_reports(
     return sub_a_reports, mtn_reports
 
 
+def get_sub_a_stacked_df(
+    results: dict,
+    reporting_years_sub_a,
+    method: str = "linear",
+    cache: Optional["ResultsCache"] = None,
+) -> pd.DataFrame:
+    """Parse all the sub_a reporting years into a single dataframe.
+
+    Args:
+        method (str): interpolation method, one of INTERPOLATION_METHODS keys
+        cache (ResultsCache, optional): cache of the parsed results, if given the
+            years that were already parsed are reused.
+
+    Returns:
+        dataframe with year, belt_class, lc_class and sum columns.
+    """
+
+    if cache is not None:
+        parsed_dfs = cache.sub_a_years(reporting_years_sub_a, method=method)
+    else:
+        parsed_dfs = parse_sub_a_years(results, reporting_years_sub_a, method=method)
+
+    return pd.concat(
+        [parsed_df.assign(year=year) for year, parsed_df in parsed_dfs.items()],
+        ignore_index=True,
+    )
+
+
+def get_sub_a_batch_reports(
+    results: dict,
+    reporting_years_sub_a,
+    geo_area_name,
+    ref_area,
+    source_detail,
+    method: str = "linear",
+    cache: Optional["ResultsCache"] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Build the sub_a tables of all the reporting years at once.
+
+    All the years are parsed into a single stacked dataframe and the three tables
+    are computed from it, instead of computing each table year by year as in
+    get_sub_a_data_reports.
+
+    Args:
+        method (str): interpolation method for the years that were not computed,
+            one of INTERPOLATION_METHODS keys
+        cache (ResultsCache, optional): cache of the parsed results
+
+    Returns:
+        Table1_ER_MTN_TOTL, Table3_ER_MTN_GRNCVI and Table2_ER_MTN_GRNCOV reports
+    """
+
+    print(f"Reporting {list(reporting_years_sub_a)} for sub_a and mtn")
+    stacked_df = get_sub_a_stacked_df(results, reporting_years_sub_a, method, cache)
+    cube = SubACube.from_dataframe(stacked_df)
+
+    mtn_report = mntn.get_report_by_year(cube, geo_area_name, ref_area, source_detail)
+    mgci_report, mgci_land_type_report = sub_a.get_reports_by_year(
+        cube, geo_area_name, ref_area, source_detail
+    )
+
+    return mtn_report, mgci_report, mgci_land_type_report
+
+
 def filter_report_years(sub_b_years):
     """This function filtersout reports which doesn't have to be reported"""
     result = []
@@ -582,6 +673,7 @@ def get_sub_b_data_reports(
     geo_area_name,
     ref_area,
     source_detail,
+    cache: Optional["ResultsCache"] = None,
 ) -> List:
 
     sub_b_reports = []
@@ -595,7 +687,10 @@ def get_sub_b_data_reports(
     for year in sub_b_years:
         print(f"Reporting {year} for sub_b")
         # Get year label for the report
-        parsed_df = cs.parse_sub_b_year(results, year)
+        if cache is not None:
+            parsed_df = cache.sub_b_year(year)
+        else:
+            parsed_df = cs.parse_sub_b_year(results, year)
         sub_b_reports.append(
             sub_b.get_reports(
                 parsed_df,
@@ -621,20 +716,10 @@ def export_reports(
     report_folder: str,
     session_id: str,
     which: Literal["both", "sub_a", "sub_b"] = "both",
-) -> None:
-    """
-    This function exports the reports of the model's results (calculation).
-    It separates the reports into two categories: sub_a_reports and sub_b_reports.
-    For each group in the results, it performs the following steps:
-        - Splits the group name by "_" to get the year(s)
-        - If there is only one year, it parses the result and appends the sub_a_report
-            to the sub_a_reports list
-        - If there are multiple years, it parses the result and for each year:
-            - Groups the parsed dataframe by belt_class and target_lc
-            - Renames the target_lc column to lc_class
-            - Appends the sub_a_report to the sub_a_reports list
-        - Appends the sub_b_report to the sub_b_reports list
-
+    cache: Optional["ResultsCache"] = None,
+    file_format: Literal["xlsx", "parquet", "feather", "csv"] = "xlsx",
+) -> Union[str, List[str]]:
+    """Export the reports of the model's results (calculation).
 
     Args:
         results (dict): The results of the model's calculation
@@ -644,77 +729,18 @@ def export_reports(
         ref_area (str): The reference area (calculated from the aoimodel)
         source_detail (str): The source detail (from user's input)
         transition_matrix (str): The transition matrix (from user's input)
-        output_folder (str): The output folder path
+        report_folder (str): The output folder path
         session_id (str): The session id randomy created by the model
-    """
-    output_folder = Path(report_folder)
-
-    sub_a_reports, mtn_reports = get_sub_a_data_reports(
-        results, reporting_years_sub_a, geo_area_name, ref_area, source_detail
-    )
+        which (str): the subindicator tables to export
+        cache (ResultsCache, optional): cache of the parsed results
+        file_format (str): "xlsx" writes a single workbook with one sheet per
+            table, the other formats write one typed columnar file per table (see
+            report_tables.TABLE_SCHEMAS), they can be rendered into the workbook
+            later with report_tables.tables_to_excel.
 
-    sub_b_reports = get_sub_b_data_reports(
-        results, sub_b_year, transition_matrix, geo_area_name, ref_area, source_detail
-    )
-
-    # Concat all reports
-    mtn_reports_df = pd.concat(mtn_reports)
-
-    # sub a reports
-    er_mtn_grnvi_df = pd.concat([report[0] for report in sub_a_reports])
-    er_mtn_grncov_df = pd.concat([report[1] for report in sub_a_reports])
-
-    # sub b reports
-    er_mtn_dgrp_df = pd.concat([report[0] for report in sub_b_reports])
-    er_mtn_dgda_df = pd.concat([report[1] for report in sub_b_reports])
-
-    output_name = str(Path(output_folder, output_folder.name + f"{session_id}.xlsx"))
-
-    with pd.ExcelWriter(output_name) as writer:
-        mtn_reports_df.to_excel(writer, sheet_name="Table1_ER_MTN_TOTL", index=False)
-        er_mtn_grncov_df.to_excel(
-            writer, sheet_name="Table2_ER_MTN_GRNCOV", index=False
-        )
-        er_mtn_grnvi_df.to_excel(writer, sheet_name="Table3_ER_MTN_GRNCVI", index=False)
-        er_mtn_dgda_df.to_excel(writer, sheet_name="Table4_ER_MTN_DGRDA", index=False)
-        er_mtn_dgrp_df.to_excel(writer, sheet_name="Table5_ER_MTN_DGRDP", index=False)
-
-        for sheetname in writer.sheets:
-            worksheet = writer.sheets[sheetname]
-            for col in worksheet.columns:
-                max_length = 0
-                column = col[0]
-                for cell in col:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(cell.value)
-                    except:
-                        pass
-                adjusted_width = max(max_length, len(str(column.value))) + 4
-                worksheet.column_dimensions[get_column_letter(column.column)].width = (
-                    adjusted_width
-                )
-
-                # Align "obs_value" column to the right
-                if "OBS" in column.value:
-                    for cell in col:
-                        cell.alignment = Alignment(horizontal="right")
-
-    return output_name
-
-
-def export_reports(
-    results: dict,
-    reporting_years_sub_a: dict,
-    sub_b_year,
-    geo_area_name,
-    ref_area,
-    source_detail,
-    transition_matrix,
-    report_folder: str,
-    session_id: str,
-    which: Literal["both", "sub_a", "sub_b"] = "both",
-) -> str:
+    Returns:
+        the path of the workbook, or the paths of the table files
+    """
 
     output_folder = Path(report_folder)
     output_name = str(Path(output_folder, output_folder.name + f"{session_id}.xlsx"))
@@ -723,71 +749,46 @@ def export_reports(
             Path(output_folder, output_folder.name + f"{session_id}_{which}.xlsx")
         )
 
-    with pd.ExcelWriter(output_name) as writer:
-        if which in ["both", "sub_a"]:
-            # Get and process Sub A reports
-            sub_a_reports, mtn_reports = get_sub_a_data_reports(
-                results, reporting_years_sub_a, geo_area_name, ref_area, source_detail
-            )
-            mtn_reports_df = pd.concat(mtn_reports)
-            er_mtn_grnvi_df = pd.concat([report[0] for report in sub_a_reports])
-            er_mtn_grncov_df = pd.concat([report[1] for report in sub_a_reports])
-
-            # Write Sub A reports to Excel
-            mtn_reports_df.to_excel(
-                writer, sheet_name="Table1_ER_MTN_TOTL", index=False
-            )
-            er_mtn_grncov_df.to_excel(
-                writer, sheet_name="Table2_ER_MTN_GRNCOV", index=False
-            )
-            er_mtn_grnvi_df.to_excel(
-                writer, sheet_name="Table3_ER_MTN_GRNCVI", index=False
-            )
-
-        if which in ["both", "sub_b"]:
-            # Get and process Sub B reports
-            sub_b_reports = get_sub_b_data_reports(
-                results,
-                sub_b_year,
-                transition_matrix,
-                geo_area_name,
-                ref_area,
-                source_detail,
-            )
-            er_mtn_dgrp_df = pd.concat([report[0] for report in sub_b_reports])
-            er_mtn_dgda_df = pd.concat([report[1] for report in sub_b_reports])
-
-            # Write Sub B reports to Excel
-            er_mtn_dgda_df.to_excel(
-                writer, sheet_name="Table4_ER_MTN_DGRDA", index=False
-            )
-            er_mtn_dgrp_df.to_excel(
-                writer, sheet_name="Table5_ER_MTN_DGRDP", index=False
-            )
-
-        # Formatting
-        for sheetname in writer.sheets:
-            worksheet = writer.sheets[sheetname]
-            for col in worksheet.columns:
-                max_length = 0
-                column = col[0]
-                for cell in col:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = max(max_length, len(str(column.value))) + 4
-                worksheet.column_dimensions[get_column_letter(column.column)].width = (
-                    adjusted_width
-                )
+    sheets = {}
+
+    if which in ["both", "sub_a"]:
+        # Get and process Sub A reports
+        mtn_reports_df, er_mtn_grnvi_df, er_mtn_grncov_df = get_sub_a_batch_reports(
+            results,
+            reporting_years_sub_a,
+            geo_area_name,
+            ref_area,
+            source_detail,
+            cache=cache,
+        )
+        sheets["Table1_ER_MTN_TOTL"] = mtn_reports_df
+        sheets["Table2_ER_MTN_GRNCOV"] = er_mtn_grncov_df
+        sheets["Table3_ER_MTN_GRNCVI"] = er_mtn_grnvi_df
+
+    if which in ["both", "sub_b"]:
+        # Get and process Sub B reports
+        sub_b_reports = get_sub_b_data_reports(
+            results,
+            sub_b_year,
+            transition_matrix,
+            geo_area_name,
+            ref_area,
+            source_detail,
+            cache=cache,
+        )
+        sheets["Table4_ER_MTN_DGRDA"] = pd.concat(
+            [report[1] for report in sub_b_reports]
+        )
+        sheets["Table5_ER_MTN_DGRDP"] = pd.concat(
+            [report[0] for report in sub_b_reports]
+        )
 
-                # Align "obs_value" column to the right
-                if "OBS" in str(column.value).upper():
-                    for cell in col:
-                        cell.alignment = Alignment(horizontal="right")
+    if file_format != "xlsx":
+        return write_report_tables(
+            sheets, output_folder, Path(output_name).stem, file_format
+        )
 
-    return output_name
+    return write_excel_sheets(output_name, sheets)
 
 
 def map_matrix_to_dict(matrix_file_path: str):
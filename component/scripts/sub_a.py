@@ -1,20 +1,24 @@
-from typing import Optional, Tuple, TYPE_CHECKING
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple, TYPE_CHECKING, Union
 
+import numpy as np
 import pandas as pd
 import component.scripts as cs
 
 # isort: off
 from component.parameter.index_parameters import sub_a_cols, sub_a_landtype_cols
+import component.parameter.directory as DIR
 import component.parameter.module_parameter as param
 
 
-from component.scripts.report_scripts import (
-    fill_parsed_df,
-    get_nature,
-    get_belt_desc,
-    get_lc_desc,
-    get_obs_status,
+from component.scripts.result_cube import (
+    SubACube,
+    as_sub_a_cube,
+    compensated_sum,
 )
+from component.scripts.report_scripts import annotate_report, fill_parsed_df
+from component.types import Pathlike
 
 if TYPE_CHECKING:
     from component.model.model import MgciModel
@@ -23,157 +27,244 @@ if TYPE_CHECKING:
 LC_MAP_MATRIX = pd.read_csv(param.LC_MAP_MATRIX)
 
 
-def get_mgci_landtype(parsed_df):
-    """Takes in a parsed DataFrame as an input and returns a concatenated
-    DataFrame that includes the calculation of belt area and group them by
-    land cover class (lc_class) and belt_class.
+@lru_cache(maxsize=8)
+def _read_green_lookup(green_file: str, mtime: float) -> np.ndarray:
+    """Read a green/non green file into a dense boolean array indexed by lc code.
 
-    Table2_1542a_LandCoverType
+    The mtime is only used as part of the cache key, so the file is read again
+    when it's modified.
     """
 
-    df = fill_parsed_df(parsed_df.copy())
+    df = pd.read_csv(green_file)
+    code_col = "to_code" if "to_code" in df.columns else "lc_class"
 
-    # As for this subindicator we will always use the same land cover classification,
-    # we can use the param.LC_MAP_MATRIX to get the is_green value.
+    if not {code_col, "green"}.issubset(df.columns):
+        raise ValueError(
+            f"The green/non green file {green_file} must have a 'to_code' "
+            "(or 'lc_class') and a 'green' column."
+        )
 
-    df["is_green"] = df.apply(
-        lambda row: LC_MAP_MATRIX.loc[LC_MAP_MATRIX.to_code == row["lc_class"]][
-            "green"
-        ].iloc[0],
-        axis=1,
-    )
+    df = df.drop_duplicates(code_col)
+    codes = df[code_col].to_numpy(dtype=np.int64)
 
-    # Get area of "green" classes and group them by belt_class
-    green_cover = (
-        df[df.is_green == 1]
-        .groupby(["belt_class"])
-        .sum()
-        .reset_index()[["belt_class", "sum"]]
-    )
+    lookup = np.zeros(codes.max() + 1, dtype=bool)
+    lookup[codes] = df["green"].to_numpy() == 1
+    lookup.flags.writeable = False
 
-    # Add total area of green cover for all belt_classes
-    total_green = pd.DataFrame(columns=["belt_class", "sum"])
-    total_green.loc[0] = ["Total", green_cover["sum"].sum()]
+    return lookup
 
-    green_cover = pd.concat([green_cover, total_green])
 
-    # Add lc_class
-    green_cover["lc_class"] = "Green Cover"
+def get_green_lookup(green_file: Optional[Pathlike] = None) -> np.ndarray:
+    """Return a boolean array where lookup[lc_code] is True for the green classes.
 
-    # with latest changes, we don't need to calculate belt area
+    As for this subindicator we will always use the same land cover classification,
+    the default definition comes from param.LC_MAP_MATRIX. A custom definition can be
+    given with a csv file containing a 'to_code' (or 'lc_class') and a 'green'
+    column. Relative file names are searched in DIR.TRANSITION_DIR.
 
-    # Calculate belt area
-    # belt_area_df = df.groupby(["belt_class"]).sum().reset_index()[["belt_class", "sum"]]
-    # belt_area_df["lc_class"] = "All"
+    Args:
+        green_file (path, optional): custom green/non green definition
+    """
 
-    # land_type_df = pd.concat([df, belt_area_df])
+    green_file = Path(green_file or param.LC_MAP_MATRIX)
+    if not green_file.is_absolute():
+        green_file = DIR.TRANSITION_DIR / green_file
 
-    by_lc_df = df.groupby(["lc_class"]).sum().reset_index()[["lc_class", "sum"]]
-    by_lc_df["belt_class"] = "Total"
+    return _read_green_lookup(str(green_file), green_file.stat().st_mtime)
 
-    ltype_df = pd.concat([df, by_lc_df, green_cover])
 
-    # round to up to 2 decimals
-    ltype_df["sum"] = ltype_df["sum"].apply(lambda x: round(x, 2))
+def get_green_mask(
+    classes: np.ndarray, green_file: Optional[Pathlike] = None
+) -> np.ndarray:
+    """Return a boolean array, True for the green land cover classes.
 
-    return ltype_df
+    Args:
+        classes (array): land cover class codes
+        green_file (path, optional): custom green/non green definition
+    """
 
+    lookup = get_green_lookup(green_file)
+    classes = np.asarray(classes, dtype=np.int64)
+    known = (classes >= 0) & (classes < len(lookup))
 
-def get_mgci(parsed_df: pd.DataFrame) -> pd.DataFrame:
-    """Calculates the MGCI (Mountain Green
-    Cover Index) for each belt class.
+    return np.where(known, lookup[np.where(known, classes, 0)], False)
 
-    It groups the data by "belt_class" and "is_green",
-    adds a column "is_green" to the dataframe based on the param.lc_map_matrix, calculates the
-    green and non-green areas, and calculates the mgci value. The function then returns
-    a new dataframe with the belts and their respective mgci values.
 
-    Table3_1542a_MGCI
+def get_mgci_by_year(
+    data: Union[pd.DataFrame, SubACube], green_file: Optional[Pathlike] = None
+) -> pd.DataFrame:
+    """Calculate the MGCI of every belt and year of a cube in a single reduction.
+
+    Args:
+        data (SubACube, DataFrame): results of one or several years. Dataframes
+            with several years must have a 'year' column.
+        green_file (path, optional): custom green/non green definition
+
+    Returns:
+        dataframe with year, belt_class, sumgreen, sumnon_green and mgci columns.
+        The "Total" belt of each year is included.
     """
 
-    df = fill_parsed_df(parsed_df.copy())
+    cube = as_sub_a_cube(data)
+    is_green = get_green_mask(cube.classes, green_file)
+
+    # years x belts arrays
+    green = compensated_sum(cube.values, axis=2, mask=is_green)
+    non_green = compensated_sum(cube.values, axis=2, mask=~is_green)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mgci = green / (green + non_green) * 100
+        total_mgci = green.sum(axis=1) / (green.sum(axis=1) + non_green.sum(axis=1))
+        total_mgci = np.nan_to_num(total_mgci * 100)
+
+    n_years, n_belts = green.shape
 
-    # Adds is_green column to the dataframe based on lc_class.
-    df["is_green"] = df.apply(
-        lambda row: LC_MAP_MATRIX.loc[LC_MAP_MATRIX.to_code == row["lc_class"]][
-            "green"
-        ].iloc[0],
-        axis=1,
+    belt_df = pd.DataFrame(
+        {
+            "year": np.repeat(cube.years, n_belts),
+            "belt_class": np.tile(cube.belts, n_years).astype(object),
+            "sumgreen": green.ravel(),
+            "sumnon_green": non_green.ravel(),
+            "mgci": mgci.ravel(),
+        }
     )
+    total_df = pd.DataFrame(
+        {
+            "year": cube.years,
+            "belt_class": "Total",
+            "sumgreen": np.nan,
+            "sumnon_green": np.nan,
+            "mgci": total_mgci,
+        }
+    )
+
+    return (
+        pd.concat([belt_df, total_df])
+        .sort_values("year", kind="stable")
+        .reset_index(drop=True)
+    )
+
+
+def get_landtype_by_year(
+    data: Union[pd.DataFrame, SubACube], green_file: Optional[Pathlike] = None
+) -> pd.DataFrame:
+    """Area of each belt and land cover class, the total area of each land cover
+    class and the green cover of each belt, for every year of the cube.
+
+    Table2_1542a_LandCoverType
+
+    Args:
+        data (SubACube, DataFrame): results of one or several years. Dataframes
+            with several years must have a 'year' column.
+        green_file (path, optional): custom green/non green definition
+    """
 
-    # Get the green and non green total area for each belt
-    tmp_df = df.groupby(["belt_class", "is_green"], as_index=False).sum()
+    cube = as_sub_a_cube(data)
+    values = cube.values
+    years, belts, classes = cube.years, cube.belts, cube.classes
+    n_years, n_belts, n_classes = values.shape
+
+    # Area of each belt and land cover class (all the combinations are present)
+    df = pd.DataFrame(
+        {
+            "year": np.repeat(years, n_belts * n_classes),
+            "belt_class": np.tile(np.repeat(belts, n_classes), n_years),
+            "lc_class": np.tile(classes, n_years * n_belts),
+            "sum": values.ravel(),
+        }
+    )
 
-    # Split by green and non-green
-    green_df = tmp_df[tmp_df.is_green == 1]
-    non_green_df = tmp_df[tmp_df.is_green == 0]
+    # Get area of "green" classes by belt_class and add the total green cover
+    is_green = get_green_mask(classes, green_file)
+    green_area = compensated_sum(values, axis=2, mask=is_green)
+    green_cover = pd.DataFrame(
+        {
+            "year": np.repeat(years, n_belts + 1),
+            "belt_class": np.tile(np.append(belts.astype(object), "Total"), n_years),
+            "sum": np.column_stack([green_area, green_area.sum(axis=1)]).ravel(),
+            "lc_class": "Green Cover",
+        }
+    )
 
-    # Merge and calculate mgci
-    green_non_green = pd.merge(
-        green_df,
-        non_green_df,
-        on=["belt_class"],
-        suffixes=["green", "non_green"],
-        how="outer",
+    by_lc_df = pd.DataFrame(
+        {
+            "year": np.repeat(years, n_classes),
+            "lc_class": np.tile(classes, n_years),
+            "sum": compensated_sum(values, axis=1).ravel(),
+            "belt_class": "Total",
+        }
     )
-    green_non_green = green_non_green.fillna(0)
 
-    green_non_green["mgci"] = (
-        green_non_green["sumgreen"]
-        / (green_non_green["sumgreen"] + green_non_green["sumnon_green"])
-        * 100
+    ltype_df = (
+        pd.concat([df, by_lc_df, green_cover])
+        .sort_values("year", kind="stable")
+        .reset_index(drop=True)
     )
-    green_non_green = green_non_green[
-        ["belt_class", "sumgreen", "sumnon_green", "mgci"]
-    ]
-
-    # Return a dataframe with all the columns
-    total_mgci = pd.DataFrame(
-        [
-            [
-                "Total",
-                green_non_green.sum()["sumgreen"]
-                / (
-                    green_non_green.sum()["sumgreen"]
-                    + green_non_green.sum()["sumnon_green"]
-                )
-                * 100,
-            ]
-        ],
-        columns=["belt_class", "mgci"],
-    ).fillna(0)
+
+    # round to up to 2 decimals
+    ltype_df["sum"] = ltype_df["sum"].apply(lambda x: round(x, 2))
+
+    return ltype_df
+
+
+def get_mgci_table_by_year(
+    data: Union[pd.DataFrame, SubACube], green_file: Optional[Pathlike] = None
+) -> pd.DataFrame:
+    """MGCI of each belt and proportion of each land cover class over the belt area
+    and over the total area, for every year of the cube.
+
+    Table3_1542a_MGCI
+
+    Args:
+        data (SubACube, DataFrame): results of one or several years. Dataframes
+            with several years must have a 'year' column.
+        green_file (path, optional): custom green/non green definition
+    """
+
+    cube = as_sub_a_cube(data)
+    values = cube.values
+    years, belts, classes = cube.years, cube.belts, cube.classes
+    n_years, n_belts, n_classes = values.shape
+
+    belt_area = compensated_sum(values, axis=2)
+    total_area = values.reshape(n_years, -1).sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        proportion = values / belt_area[:, :, None] * 100
+        total_proportion = compensated_sum(values, axis=1) / total_area[:, None] * 100
+
+    mgci_df = get_mgci_by_year(cube, green_file)
 
     # Add label for LAND COVER column
-    mgci_df = pd.concat([green_non_green, total_mgci])
     mgci_df["lc_class"] = "MGCI"
 
     # Get the proportion of each land cover class in each belt
-
-    # Get the total area of each belt
-    belt_area_df = df.groupby(["belt_class"]).sum().reset_index()[["belt_class", "sum"]]
-
-    expanded_df = df.merge(belt_area_df, on="belt_class", how="left")
-    expanded_df["proportion"] = expanded_df["sum_x"] / expanded_df["sum_y"] * 100
-    expanded_df.rename(columns={"proportion": "mgci"}, inplace=True)
+    expanded_df = pd.DataFrame(
+        {
+            "year": np.repeat(years, n_belts * n_classes),
+            "belt_class": np.tile(np.repeat(belts, n_classes), n_years),
+            "lc_class": np.tile(classes, n_years * n_belts),
+            "sum_x": values.ravel(),
+            "sum_y": np.repeat(belt_area.ravel(), n_classes),
+            "mgci": proportion.ravel(),
+        }
+    )
 
     # Now get the proportion of each land cover class over the total area
-
-    total_area_df = df.copy()
-    total_area = total_area_df["sum"].sum()
-    # sum all lc_classes
-    total_area_df = total_area_df.groupby(["lc_class"]).sum().reset_index()
-    total_area_df["proportion_total_area"] = total_area_df["sum"] / total_area * 100
-    # drop sum column
-    total_area_df.drop(columns=["sum"], inplace=True)
-    # rename proportion column
-    total_area_df.rename(
-        columns={"proportion_total_area": "mgci"},
-        inplace=True,
+    total_area_df = pd.DataFrame(
+        {
+            "year": np.repeat(years, n_classes),
+            "lc_class": np.tile(classes, n_years),
+            "mgci": total_proportion.ravel(),
+            "belt_class": "Total",
+        }
     )
-    # add belt_class column
-    total_area_df["belt_class"] = "Total"
 
-    result = pd.concat([mgci_df, expanded_df, total_area_df])
+    result = (
+        pd.concat([mgci_df, expanded_df, total_area_df])
+        .sort_values("year", kind="stable")
+        .reset_index(drop=True)
+    )
 
     # round to up to 4 decimals
     result["mgci"] = result["mgci"].apply(lambda x: round(x, 4))
@@ -181,51 +272,72 @@ def get_mgci(parsed_df: pd.DataFrame) -> pd.DataFrame:
     return result
 
 
-def get_report(
-    parsed_df: pd.DataFrame,
-    year: int,
+def get_mgci_landtype(parsed_df, green_file: Optional[Pathlike] = None):
+    """Takes in a parsed DataFrame as an input and returns a concatenated
+    DataFrame that includes the calculation of belt area and group them by
+    land cover class (lc_class) and belt_class.
+
+    Table2_1542a_LandCoverType
+
+    Args:
+        green_file (path, optional): custom green/non green definition
+    """
+
+    cube = as_sub_a_cube(parsed_df)
+    ltype_df = get_landtype_by_year(cube, green_file)
+
+    return ltype_df[ltype_df.year == cube.years[0]].drop(columns="year")
+
+
+def get_mgci(
+    parsed_df: pd.DataFrame, green_file: Optional[Pathlike] = None
+) -> pd.DataFrame:
+    """Calculates the MGCI (Mountain Green
+    Cover Index) for each belt class.
+
+    It sums the green and non-green areas of each belt (based on the
+    param.lc_map_matrix or the custom green_file) and calculates the mgci value.
+    It also returns the proportion of each land cover class over the belt area and
+    over the total area.
+
+    Table3_1542a_MGCI
+
+    Args:
+        green_file (path, optional): custom green/non green definition
+    """
+
+    cube = as_sub_a_cube(parsed_df)
+    result = get_mgci_table_by_year(cube, green_file)
+
+    return result[result.year == cube.years[0]].drop(columns="year")
+
+
+def _build_report(
+    table_df: pd.DataFrame,
     geo_area_name: str,
     ref_area: str,
     source_detail: str,
-    land_type: Optional[bool] = False,
+    land_type: bool,
 ) -> pd.DataFrame:
+    """Add the report columns to a Table2 (land_type) or Table3 dataframe. The
+    table must have a 'year' column that will be used as time period.
     """
-    This function takes in a parsed DataFrame, a year, and an optional land_type
-    parameter.
-    Based on the land_type parameter, it either generates a report on mountain
-    green cover index (MGCI) or MGCI by land cover class and belt class.
-
-    The function then adds several additional columns to the resulting DataFrame
-    such as 'Value', 'Units', 'SeriesID', 'SeriesDescription', 'GeoAreaName',
-    'GeoAreaCode', 'TimePeriod', 'Time_Detail', 'Source', 'FootNote', 'Nature',
-    'Reporting Type', 'Observation Status', 'Bioclimatic Belt', 'ISOalpha3',
-    'Type', and 'SeriesCode'.
 
-    **extra_args:
-        Extra parameters used when model = None and function is executed from
-        outside the ui
-        - geo_area_name
-        - ref_area
-        - source_detail
-    """
+    report_df = table_df
 
     if land_type:
         # Table2_1542a_LandCoverType
-        report_df = get_mgci_landtype(parsed_df)
         report_df["OBS_VALUE"] = report_df["sum"]
         report_df["OBS_VALUE_RSA"] = param.TBD  # TODO: check if we can report RSA
         report_df["UNIT_MEASURE"] = "KM2"
         report_df["UNIT_MULT"] = param.TBD
-        report_df["LAND_COVER"] = report_df.apply(get_lc_desc, axis=1)
         output_cols = sub_a_landtype_cols
     else:
         # Table3_1542a_MGCI
-        report_df = get_mgci(parsed_df)
         report_df["OBS_VALUE"] = report_df.mgci
         report_df["OBS_VALUE_RSA"] = param.TBD  # TODO: check if we can report RSA
         report_df["UNIT_MEASURE"] = "PT"
         report_df["UNIT_MULT"] = param.TBD
-        report_df["LAND_COVER"] = report_df.apply(get_lc_desc, axis=1)
         output_cols = sub_a_cols
 
     # The following cols are equal for both tables
@@ -235,32 +347,63 @@ def get_report(
     report_df["SeriesDesc"] = param.TBD
     report_df["GeoAreaName"] = geo_area_name
     report_df["REF_AREA"] = ref_area
-    report_df["TIME_PERIOD"] = year
-    report_df["TIME_DETAIL"] = year
+    report_df["TIME_PERIOD"] = report_df["year"]
+    report_df["TIME_DETAIL"] = report_df["year"]
     report_df["SOURCE_DETAIL"] = source_detail
     report_df["COMMENT_OBS"] = "FAO estimate"
-    report_df["BIOCLIMATIC_BELT"] = report_df.apply(get_belt_desc, axis=1)
 
     # round obs_value
     report_df["OBS_VALUE"] = report_df["OBS_VALUE"].round(4)
     report_df["OBS_VALUE_RSA"] = report_df["OBS_VALUE"].round(4)
 
-    # Convert DataFrame to object type
-    report_df = report_df.astype(object)
+    # Add descriptions, "NA" values, NATURE and OBS_STATUS
+    report_df = annotate_report(report_df, land_cover=True)
+
+    if land_type:
+        n_years = report_df["year"].nunique()
+        assert len(report_df) == 55 * n_years, "Report should have 55 rows per year"
+
+    return report_df[output_cols].reset_index(drop=True)
 
-    # fill NaN values with "N/A"
-    report_df.fillna("NA", inplace=True)
 
-    # fill zeros with "N/A"
-    report_df.replace(0, "NA", inplace=True)
+def get_report(
+    parsed_df: pd.DataFrame,
+    year: int,
+    geo_area_name: str,
+    ref_area: str,
+    source_detail: str,
+    land_type: Optional[bool] = False,
+    green_file: Optional[Pathlike] = None,
+) -> pd.DataFrame:
+    """
+    This function takes in a parsed DataFrame, a year, and an optional land_type
+    parameter.
+    Based on the land_type parameter, it either generates a report on mountain
+    green cover index (MGCI) or MGCI by land cover class and belt class.
 
-    report_df["NATURE"] = report_df.apply(get_nature, axis=1)
-    report_df["OBS_STATUS"] = report_df.apply(get_obs_status, axis=1)
+    The function then adds several additional columns to the resulting DataFrame
+    such as 'Value', 'Units', 'SeriesID', 'SeriesDescription', 'GeoAreaName',
+    'GeoAreaCode', 'TimePeriod', 'Time_Detail', 'Source', 'FootNote', 'Nature',
+    'Reporting Type', 'Observation Status', 'Bioclimatic Belt', 'ISOalpha3',
+    'Type', and 'SeriesCode'.
+
+    **extra_args:
+        Extra parameters used when model = None and function is executed from
+        outside the ui
+        - geo_area_name
+        - ref_area
+        - source_detail
+        - green_file: custom green/non green definition
+    """
 
     if land_type:
-        assert len(report_df) == 55, "Report should have 55 rows"
+        table_df = get_mgci_landtype(parsed_df, green_file)
+    else:
+        table_df = get_mgci(parsed_df, green_file)
 
-    return report_df[output_cols].reset_index(drop=True)
+    return _build_report(
+        table_df.assign(year=year), geo_area_name, ref_area, source_detail, land_type
+    )
 
 
 def get_reports(
@@ -269,6 +412,7 @@ def get_reports(
     geo_area_name: str,
     ref_area: str,
     source_detail: str,
+    green_file: Optional[Pathlike] = None,
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     SubIndA_MGCI
@@ -276,7 +420,13 @@ def get_reports(
     """
 
     mgci_report = get_report(
-        parsed_df, year_s, geo_area_name, ref_area, source_detail, land_type=False
+        parsed_df,
+        year_s,
+        geo_area_name,
+        ref_area,
+        source_detail,
+        land_type=False,
+        green_file=green_file,
     )
 
     mgci_land_type_report = get_report(
@@ -286,6 +436,46 @@ def get_reports(
         ref_area,
         source_detail,
         land_type=True,
+        green_file=green_file,
+    )
+
+    return mgci_report, mgci_land_type_report
+
+
+def get_reports_by_year(
+    data: Union[pd.DataFrame, SubACube],
+    geo_area_name: str,
+    ref_area: str,
+    source_detail: str,
+    green_file: Optional[Pathlike] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Build the SubIndA_MGCI and SubIndA_LandType reports of all the years at once.
+
+    The tables of every year are computed from the same cube, the output is the
+    same as concatenating the output of get_reports for each year.
+
+    Args:
+        data (SubACube, DataFrame): results of all the reporting years. Dataframes
+            must have a 'year' column.
+        green_file (path, optional): custom green/non green definition
+    """
+
+    cube = as_sub_a_cube(data)
+
+    mgci_report = _build_report(
+        get_mgci_table_by_year(cube, green_file),
+        geo_area_name,
+        ref_area,
+        source_detail,
+        land_type=False,
+    )
+
+    mgci_land_type_report = _build_report(
+        get_landtype_by_year(cube, green_file),
+        geo_area_name,
+        ref_area,
+        source_detail,
+        land_type=True,
     )
 
     return mgci_report, mgci_land_type_report
@@ -1,5 +1,6 @@
-from typing import Dict, Optional, Tuple, TYPE_CHECKING
+from typing import Dict, Optional, Tuple, TYPE_CHECKING, Union
 
+import numpy as np
 import pandas as pd
 
 import component.parameter.module_parameter as param
@@ -8,12 +9,13 @@ import component.scripts as cs
 # isort: off
 from component.parameter.index_parameters import sub_b_landtype_cols, sub_b_perc_cols
 
-from component.scripts.report_scripts import (
-    get_impact,
-    get_nature,
-    get_belt_desc,
-    get_obs_status,
+from component.scripts.result_cube import (
+    SubBCube,
+    as_sub_b_cube,
+    compensated_sum,
 )
+from component.scripts.transition_matrix import TransitionMatrix
+from component.scripts.report_scripts import annotate_report
 
 if TYPE_CHECKING:
     from component.model.model import MgciModel
@@ -22,66 +24,81 @@ BELT_TABLE = pd.read_csv(param.BIOBELTS_DESC)
 "pd.Dataframe: bioclimatic belts classes and description"
 
 
-def get_degraded_area(parsed_df: pd.DataFrame, transition_matrix: str):
-    """Return net and gross area of degraded land per belt class"""
+def get_impact_matrix(
+    classes: np.ndarray, transition_matrix: Union[str, TransitionMatrix]
+) -> np.ndarray:
+    """Return a from_lc × to_lc array with the impact code of each transition.
 
-    # Prepare df
-    df = parsed_df.copy()
-    df_type = df.reset_index().loc[0, "category"]
+    Transitions from or to the no data class (0) have no impact (0), neither have
+    the ones that are not defined in the matrix (see
+    TransitionMatrix.check_transitions).
+    """
 
-    if df_type == "baseline_transition":
-        df["impact"] = df.apply(
-            lambda x: get_impact(x, transition_matrix=transition_matrix), axis=1
-        )
-    elif df_type == "final_degradation":
-        df["impact"] = df["transition"]
-    else:
-        raise ValueError("Invalid df_type")
+    return TransitionMatrix.load(transition_matrix).impact_matrix(classes)
 
-    # get the degraded area
-    degraded = (
-        df[df.impact == 1]
-        .groupby(["belt_class"])
-        .sum(numeric_only=True)
-        .reset_index()[["belt_class", "sum"]]
-    )
-    degraded.rename(columns={"sum": "degraded"}, inplace=True)
-
-    # get the stable area
-    stable = (
-        df[df.impact == 2]
-        .groupby(["belt_class"])
-        .sum(numeric_only=True)
-        .reset_index()[["belt_class", "sum"]]
-    )
-    stable.rename(columns={"sum": "stable"}, inplace=True)
 
-    # Get net degraded area per belt class as the sum of degraded minus improved
+def get_degraded_area(
+    parsed_df: Union[pd.DataFrame, SubBCube],
+    transition_matrix: Union[str, TransitionMatrix],
+    category: Optional[str] = None,
+):
+    """Return net and gross area of degraded land per belt class.
 
-    improved = (
-        df[df.impact == 3]
-        .groupby(["belt_class"])
-        .sum(numeric_only=True)
-        .reset_index()[["belt_class", "sum"]]
-    )
-    improved.rename(columns={"sum": "improved"}, inplace=True)
+    There's one row per belt class of BELT_TABLE and of the data, sorted by belt
+    code whatever the order of the belts in the results. It's the order the outer
+    merges of the previous implementation gave with pandas >= 2.2, older versions
+    put the belts found in the data first.
+
+    Args:
+        parsed_df: parsed dataframe from cs.parse_sub_b_year or a sub_b cube.
+        transition_matrix: path to the transition matrix file or a TransitionMatrix.
+        category: either baseline_transition or final_degradation. Required when
+            parsed_df is a cube, otherwise it's read from the dataframe.
+    """
+
+    if category is None:
+        if isinstance(parsed_df, SubBCube):
+            raise ValueError("The category is required when using a cube.")
+        category = parsed_df.reset_index().loc[0, "category"]
 
-    net_degraded = degraded.merge(improved, on="belt_class", how="outer")
-    net_degraded["net_degraded"] = net_degraded.degraded - net_degraded.improved
+    cube = as_sub_b_cube(parsed_df)
+    values = cube.category_values(category)
+    observed = cube.category_observed(category)
 
-    # Add stable area
-    net_degraded = net_degraded.merge(stable, on="belt_class", how="outer")
+    if category == "baseline_transition":
+        impact = get_impact_matrix(cube.classes, transition_matrix)
 
-    # we must be sure that all belt classes are present.
-    # if not, we must add them with 0 values
-    net_degraded = net_degraded.merge(
-        BELT_TABLE[["belt_class"]],
-        left_on="belt_class",
-        right_on="belt_class",
-        how="outer",
-    )[["belt_class", "degraded", "stable", "improved", "net_degraded"]]
+        # The transitions that occur must be defined in the matrix
+        from_pos, to_pos = np.nonzero(observed.any(axis=0))
+        TransitionMatrix.load(transition_matrix).check_transitions(
+            cube.classes[from_pos], cube.classes[to_pos]
+        )
+    elif category == "final_degradation":
+        # Degradation codes are stored in the to_lc axis
+        impact = np.broadcast_to(cube.classes, values.shape[1:])
+    else:
+        raise ValueError("Invalid df_type")
 
-    return net_degraded
+    def get_area(impact_code):
+        """Return the area of the given impact per belt, NaN if it doesn't occur"""
+        mask = observed & (impact == impact_code)
+        area = compensated_sum(values, axis=(1, 2), mask=mask)
+        return np.where(mask.any(axis=(1, 2)), area, np.nan)
+
+    # get the degraded, stable and improved area
+    degraded, stable, improved = get_area(1), get_area(2), get_area(3)
+
+    # Get net degraded area per belt class as the degraded minus improved area.
+    # All belt classes are present in the cube, the missing ones are NaN.
+    return pd.DataFrame(
+        {
+            "belt_class": cube.belts,
+            "degraded": degraded,
+            "stable": stable,
+            "improved": improved,
+            "net_degraded": degraded - improved,
+        }
+    )
 
 
 def get_pdma_area(parsed_df, transition_matrix: str):
@@ -176,23 +193,12 @@ def get_report(
     report_df["SOURCE_DETAIL"] = source_detail
     report_df["COMMENT_OBS"] = "FAO estimate"
 
-    report_df["BIOCLIMATIC_BELT"] = report_df.apply(get_belt_desc, axis=1)
-
     # round obs_value
     report_df["OBS_VALUE"] = report_df["OBS_VALUE"].round(4)
     report_df["OBS_VALUE_NET"] = report_df["OBS_VALUE_NET"].round(4)
 
-    # Convert DataFrame to object type
-    report_df = report_df.astype(object)
-
-    # Now fill NaN values with "NA"
-    report_df.fillna("NA", inplace=True)
-
-    # fill zeros with "N/A"
-    report_df.replace(0, "NA", inplace=True)
-
-    report_df["NATURE"] = report_df.apply(get_nature, axis=1)
-    report_df["OBS_STATUS"] = report_df.apply(get_obs_status, axis=1)
+    # Add descriptions, "NA" values, NATURE and OBS_STATUS
+    report_df = annotate_report(report_df)
 
     return report_df[output_cols]
 
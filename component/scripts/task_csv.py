@@ -0,0 +1,326 @@
+"""Read the CSV files exported by the GEE background tasks.
+
+GEE serializes the reduceRegions dictionaries in a java-like notation, i.e.:
+
+    [{biobelt=1, groups=[{lc=2, sum=3.1E2}, {lc=3, sum=12.5}]}, ...]
+
+Instead of rewriting each cell into a python literal and evaluating it, the cells are
+scanned with a small tokenizer that emits one (biobelt, lc, sum) row per leaf group.
+
+The flat results (reduce_regions(..., flat=True)) are read the same way, their cells
+are lists of {__path__=biobelt_lc, sum=x} dictionaries.
+"""
+
+import csv
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from component.types import Pathlike, ResultColumns, ResultsDict
+
+__all__ = [
+    "SUB_B_CATEGORIES",
+    "iter_groups",
+    "read_task_columns",
+    "read_task_results",
+    "read_task_results_by_id",
+    "features_to_results",
+    "flat_to_columns",
+    "flat_to_results",
+]
+
+SUB_B_CATEGORIES = [
+    "baseline_degradation",
+    "final_degradation",
+    "baseline_transition",
+    "report_transition",
+]
+"list: columns of the task csv containing the sub_b results"
+
+_TOKEN = re.compile(r"([A-Za-z_]\w*)=|([{}\[\]])|([^\s,{}\[\]=]+)")
+"re.Pattern: matches either a key (name=), a bracket or a scalar value"
+
+
+def iter_groups(
+    text: str, empty_belts: bool = False
+) -> Iterator[Tuple[int, int, float]]:
+    """Yield (biobelt, lc, sum) rows from a GEE serialized cell.
+
+    The input is a list of {biobelt, groups} dictionaries, where groups is a list of
+    {lc, sum} dictionaries, or a flat list of {__path__, sum} dictionaries where the
+    path is "biobelt_lc". Keys can appear in any order inside each dictionary.
+
+    Args:
+        text (str): content of a sub_a or sub_b cell of the task csv file.
+        empty_belts (bool): if True, a (biobelt, None, None) row is yielded for the
+            biobelts with an empty groups list, so they can be kept.
+    """
+
+    # Each open dictionary is a frame: [biobelt, lc, sum, leaf rows]
+    stack: List[list] = []
+    key = None
+
+    for match in _TOKEN.finditer(text):
+        name, bracket, value = match.groups()
+
+        if name:
+            key = name
+
+        elif value:
+            if not stack:
+                raise ValueError(f"Unexpected value '{value}' outside a group.")
+            frame = stack[-1]
+            if key == "biobelt":
+                frame[0] = int(float(value))
+            elif key == "lc":
+                frame[1] = int(float(value))
+            elif key == "sum":
+                frame[2] = float(value)
+            elif key == "__path__":
+                belt, lc = value.split("_")
+                frame[0], frame[1] = int(float(belt)), int(float(lc))
+            else:
+                raise ValueError(f"Unknown key '{key}' in the task file.")
+            key = None
+
+        elif bracket == "{":
+            stack.append([None, None, None, []])
+
+        elif bracket == "}":
+            belt, lc, sum_, rows = stack.pop()
+
+            if sum_ is not None and belt is not None:
+                # Flat group, it already has both keys
+                yield belt, lc, sum_
+            elif sum_ is not None:
+                # Leaf group, attach it to the parent biobelt
+                if not stack or lc is None:
+                    raise ValueError("Found a land cover group without biobelt.")
+                stack[-1][3].append((lc, sum_))
+            else:
+                if belt is None:
+                    raise ValueError("Found a biobelt group without biobelt key.")
+                if not rows and empty_belts:
+                    yield belt, None, None
+                for lc, sum_ in rows:
+                    yield belt, lc, sum_
+
+        # "[" and "]" only delimit the lists, the frames already carry the nesting
+
+    if stack:
+        raise ValueError("Unbalanced brackets in the task file.")
+
+
+def _iter_cells(
+    task_file: Pathlike, id_property: Optional[str] = None
+) -> Iterator[Tuple[str, str, str, str]]:
+    """Stream the task file and yield (feature_id, process_id, category, cell) for
+    each result. feature_id is empty when there's no id_property."""
+
+    with open(task_file, newline="") as f:
+        for row in csv.DictReader(f):
+            process_id = str(row["process_id"]).strip()
+            feature_id = str(row[id_property]).strip() if id_property else ""
+
+            if len(process_id.split("_")) > 1:
+                for cat in SUB_B_CATEGORIES:
+                    yield feature_id, process_id, cat, row.get(cat) or ""
+            else:
+                yield feature_id, process_id, "sub_a", row.get("sub_a") or ""
+
+
+def _to_sub_items(rows: Iterable[Tuple[int, int, float]]) -> list:
+    """Nest (biobelt, lc, sum) rows into the reduceRegions output format, the sums
+    of repeated (biobelt, lc) rows are added up. The (biobelt, None, None) rows keep
+    a biobelt with empty groups"""
+
+    belts: Dict[int, Dict[int, float]] = {}
+    for belt, lc, sum_ in rows:
+        groups = belts.setdefault(belt, {})
+        if lc is not None:
+            groups[lc] = groups.get(lc, 0) + sum_
+
+    return [
+        {"biobelt": belt, "groups": [{"lc": lc, "sum": s} for lc, s in groups.items()]}
+        for belt, groups in belts.items()
+    ]
+
+
+def read_task_columns(task_file: Pathlike) -> ResultColumns:
+    """Read a task csv file into flat columnar arrays.
+
+    Args:
+        task_file (path): full path of downloaded task
+
+    Returns:
+        dict of numpy arrays with process_id, category, biobelt, lc and sum. For
+        sub_b categories the lc column contains either the transition code or the
+        impact code.
+    """
+
+    process_ids, categories, belts, lcs, sums = [], [], [], [], []
+
+    for _, process_id, cat, cell in _iter_cells(task_file):
+        for belt, lc, sum_ in iter_groups(cell):
+            process_ids.append(process_id)
+            categories.append(cat)
+            belts.append(belt)
+            lcs.append(lc)
+            sums.append(sum_)
+
+    return {
+        "process_id": np.array(process_ids, dtype=object),
+        "category": np.array(categories, dtype=object),
+        "biobelt": np.array(belts, dtype=np.int64),
+        "lc": np.array(lcs, dtype=np.int64),
+        "sum": np.array(sums, dtype=np.float64),
+    }
+
+
+def read_task_results(task_file: Pathlike) -> ResultsDict:
+    """Read a task csv file into the nested results dictionary.
+
+    The output has the same structure as the one returned by perform_calculation
+    when the process is computed on the fly.
+    """
+
+    results: ResultsDict = {}
+
+    for _, process_id, cat, cell in _iter_cells(task_file):
+        results.setdefault(process_id, {})[cat] = _to_sub_items(
+            iter_groups(cell, empty_belts=True)
+        )
+
+    return results
+
+
+def read_task_results_by_id(
+    task_file: Pathlike, id_property: str
+) -> Dict[str, ResultsDict]:
+    """Read a task csv file exported from a reduce_regions process with id_property.
+
+    Args:
+        task_file (path): full path of downloaded task
+        id_property (str): column identifying the feature of each row
+
+    Returns:
+        feature id: results dictionary. The rows of the features sharing the same id
+        (i.e. the parts of a country) are added up.
+    """
+
+    rows: Dict[str, Dict[str, Dict[str, list]]] = {}
+
+    for feature_id, process_id, cat, cell in _iter_cells(task_file, id_property):
+        cells = rows.setdefault(feature_id, {}).setdefault(process_id, {})
+        cells.setdefault(cat, []).extend(iter_groups(cell, empty_belts=True))
+
+    return {
+        feature_id: {
+            process_id: {cat: _to_sub_items(cat_rows) for cat, cat_rows in cats.items()}
+            for process_id, cats in processes.items()
+        }
+        for feature_id, processes in rows.items()
+    }
+
+
+def features_to_results(
+    collection: dict, id_property: str, process_id: str
+) -> Dict[str, ResultsDict]:
+    """Key the evaluated output of a reduce_regions process with id_property by
+    feature id.
+
+    Args:
+        collection (dict): the getInfo() of the reduce_regions FeatureCollection
+        id_property (str): property identifying each feature
+        process_id (str): year key of the process, i.e. "2000" or "2000_2015_2018"
+
+    Returns:
+        feature id: results dictionary with the single process_id key. The features
+        sharing the same id are added up.
+    """
+
+    rows: Dict[str, Dict[str, list]] = {}
+
+    for feature in collection["features"]:
+        properties = feature["properties"]
+        cells = rows.setdefault(str(properties[id_property]), {})
+
+        for cat in ["sub_a", *SUB_B_CATEGORIES]:
+            if cat in properties:
+                # The biobelts without groups are kept with a (biobelt, None, None)
+                # row, see _to_sub_items
+                cells.setdefault(cat, []).extend(
+                    (item["biobelt"], group["lc"], group["sum"])
+                    for item in properties[cat] or []
+                    for group in item["groups"] or [{"lc": None, "sum": None}]
+                )
+
+    return {
+        feature_id: {
+            process_id: {cat: _to_sub_items(cat_rows) for cat, cat_rows in cats.items()}
+        }
+        for feature_id, cats in rows.items()
+    }
+
+
+def flat_to_columns(flat_results: Dict[str, Dict[str, list]]) -> ResultColumns:
+    """Build the columnar arrays of flat results.
+
+    Args:
+        flat_results: process_id: {category: [{"__path__": "biobelt_lc", "sum": x}]}
+            as returned by the getInfo of a flat reduce_regions process.
+
+    Returns:
+        the same columns as read_task_columns
+    """
+
+    process_ids, categories, paths, sums = [], [], [], []
+
+    for process_id, result in flat_results.items():
+        for cat, rows in result.items():
+            for row in rows or []:
+                process_ids.append(str(process_id))
+                categories.append(cat)
+                paths.append(row["__path__"])
+                sums.append(row["sum"])
+
+    # Split all the "biobelt_lc" paths at once
+    parts = np.char.partition(np.array(paths, dtype=str), "_").reshape(-1, 3)
+
+    return {
+        "process_id": np.array(process_ids, dtype=object),
+        "category": np.array(categories, dtype=object),
+        "biobelt": parts[:, 0].astype(np.float64).astype(np.int64),
+        "lc": parts[:, 2].astype(np.float64).astype(np.int64),
+        "sum": np.array(sums, dtype=np.float64),
+    }
+
+
+def flat_to_results(flat_results: Dict[str, Dict[str, list]]) -> ResultsDict:
+    """Nest flat results into the results dictionary returned by perform_calculation.
+
+    Args:
+        flat_results: process_id: {category: [{"__path__": "biobelt_lc", "sum": x}]}
+    """
+
+    columns = flat_to_columns(flat_results)
+    rows = zip(
+        columns["process_id"],
+        columns["category"],
+        columns["biobelt"].tolist(),
+        columns["lc"].tolist(),
+        columns["sum"].tolist(),
+    )
+
+    grouped: Dict[str, Dict[str, list]] = {
+        str(process_id): {cat: [] for cat in result}
+        for process_id, result in flat_results.items()
+    }
+    for process_id, cat, belt, lc, sum_ in rows:
+        grouped[process_id][cat].append((belt, lc, sum_))
+
+    return {
+        process_id: {cat: _to_sub_items(cat_rows) for cat, cat_rows in result.items()}
+        for process_id, result in grouped.items()
+    }
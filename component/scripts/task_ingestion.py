@@ -0,0 +1,226 @@
+"""Bulk ingestion of the background tasks of a folder.
+
+Every calculation sent to the background writes a task file (json) with the id of
+its ee task and the model state needed to build its reports (see
+deferred_calculation.task_process). ingest_tasks handles all the task files of a
+folder at once: the states of their tasks are resolved with a single listing, the
+results of the completed ones are downloaded concurrently and their reports are
+built in a process pool, the CPU bound part of the ingestion.
+
+The outcome of every task file is summarized in a table: "done" with the path of
+its reports, "pending" with the state of its task or "failed" with the error. The
+tasks whose reports were built by a previous ingestion are not built again.
+"""
+
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional
+
+import pandas as pd
+
+from component.scripts.batch import FAILED_STATES
+from component.scripts.result_algebra import merge_results
+from component.scripts.scripts import export_reports
+from component.scripts.task_csv import read_task_results
+from component.types import Pathlike, ResultsDict
+
+__all__ = [
+    "TASK_STATUSES",
+    "TaskFile",
+    "read_task_file",
+    "export_task_reports",
+    "ingest_tasks",
+]
+
+TASK_STATUSES = ["done", "pending", "failed"]
+"list: status of the task files in the ingest_tasks summary"
+
+
+class TaskFile(NamedTuple):
+    """Content of a task file"""
+
+    path: Path
+    "path of the task file"
+
+    task_id: str
+    "id of the ee task"
+
+    model_state: dict
+    "inputs of the reports, see deferred_calculation.task_process"
+
+    local_results: ResultsDict
+    "results of the years that were computed on the fly"
+
+    @property
+    def result_name(self) -> str:
+        """Name of the exported file in Drive"""
+        return f"{self.path.stem}.csv"
+
+    @property
+    def result_file(self) -> Path:
+        """Path of the downloaded result, in a folder next to the task file"""
+        return self.path.parent / self.path.stem / self.result_name
+
+    @property
+    def report_file(self) -> Path:
+        """Path of the reports workbook, as named by scripts.export_reports"""
+        folder = Path(self.model_state["report_folder"])
+        return folder / f"{folder.name}{self.model_state['session_id']}.xlsx"
+
+
+def read_task_file(path: Pathlike) -> TaskFile:
+    """Read a task file written by deferred_calculation.task_process"""
+
+    path = Path(path)
+    data = json.loads(path.read_text())
+
+    return TaskFile(
+        path=path,
+        task_id=data["task"]["id"].strip(),
+        model_state=data["model_state"],
+        local_results=data.get("local_results", {}),
+    )
+
+
+def export_task_reports(task_file: TaskFile, result_file: Pathlike) -> str:
+    """Build the reports of a downloaded task result.
+
+    The years computed on the fly are merged with the downloaded ones.
+
+    Returns:
+        the path of the reports workbook
+    """
+
+    state = task_file.model_state
+
+    # reporting_years_sub_a always have to be integers
+    reporting_years_sub_a = {
+        int(key): value for key, value in state["reporting_years_sub_a"].items()
+    }
+    results = merge_results(task_file.local_results, read_task_results(result_file))
+
+    return export_reports(
+        results,
+        reporting_years_sub_a,
+        state["sub_b_year"],
+        state["geo_area_name"],
+        state["ref_area"],
+        state["source_detail"],
+        state["transition_matrix"],
+        Path(state["report_folder"]),
+        state["session_id"],
+    )
+
+
+def ingest_tasks(
+    folder: Pathlike,
+    drive,
+    max_workers: int = 4,
+    max_processes: int = 2,
+    export: Callable[[TaskFile, Pathlike], str] = export_task_reports,
+    log: Optional[Callable[[str], None]] = None,
+    force: bool = False,
+) -> pd.DataFrame:
+    """Download the results and build the reports of all the task files of a folder.
+
+    Args:
+        folder: folder of the task files, i.e. DIR.TASKS_DIR
+        drive: GDrive instance, or a stand-in with get_tasks and download_files
+        max_workers: maximum number of results downloaded at the same time
+        max_processes: number of processes building the reports, they are built in
+            the current process if it's lower than 2
+        export: builds the reports of a task file from its downloaded result
+        log: function receiving the progress messages
+        force: build the reports again even if they already exist
+
+    Returns:
+        one row per task file with the task, state, status (one of TASK_STATUSES)
+        and detail columns, in the files order
+    """
+
+    log = log or (lambda msg: None)
+    rows: Dict[str, dict] = {}
+
+    def set_row(name, status, detail, state=None):
+        rows[name] = dict(task=name, state=state, status=status, detail=detail)
+
+    task_files: Dict[str, TaskFile] = {}
+    for path in sorted(Path(folder).glob("*.json")):
+        try:
+            task_files[path.stem] = read_task_file(path)
+        except (KeyError, ValueError) as e:
+            set_row(path.stem, "failed", f"Invalid task file: {e}")
+
+    # The states of all the tasks are resolved in a single pass
+    log(f"Checking the state of {len(task_files)} tasks...")
+    tasks = drive.get_tasks([task_file.task_id for task_file in task_files.values()])
+
+    completed: Dict[str, TaskFile] = {}
+    for name, task_file in task_files.items():
+        task = tasks[task_file.task_id]
+
+        if task is None:
+            set_row(name, "failed", "The task doesn't exist in your tasks.")
+        elif task.state == "COMPLETED" and task_file.report_file.exists() and not force:
+            set_row(name, "done", str(task_file.report_file), task.state)
+        elif task.state == "COMPLETED":
+            completed[name] = task_file
+        elif task.state in FAILED_STATES:
+            set_row(name, "failed", f"The task state is {task.state}.", task.state)
+        else:
+            set_row(name, "pending", f"The task state is {task.state}.", task.state)
+
+    # The results downloaded by a previous ingestion are not downloaded again
+    to_download = {
+        task_file.result_name: task_file.result_file
+        for task_file in completed.values()
+        if not task_file.result_file.exists()
+    }
+    for result_file in to_download.values():
+        result_file.parent.mkdir(exist_ok=True)
+
+    log(f"Downloading the results of {len(to_download)} completed tasks...")
+    downloads = {
+        task_file.result_name: task_file.result_file for task_file in completed.values()
+    }
+    downloads.update(drive.download_files(to_download, max_workers))
+
+    downloaded: Dict[str, TaskFile] = {}
+    for name, task_file in completed.items():
+        outcome = downloads[task_file.result_name]
+        if isinstance(outcome, Exception):
+            set_row(name, "failed", f"Download failed: {outcome}", "COMPLETED")
+        else:
+            downloaded[name] = task_file
+
+    log(f"Exporting the reports of {len(downloaded)} tasks...")
+    if max_processes < 2:
+        outcomes = {}
+        for name, task_file in downloaded.items():
+            try:
+                outcomes[name] = export(task_file, task_file.result_file)
+            except Exception as e:
+                outcomes[name] = e
+    else:
+        with ProcessPoolExecutor(max_workers=max_processes) as executor:
+            futures = {
+                executor.submit(export, task_file, task_file.result_file): name
+                for name, task_file in downloaded.items()
+            }
+            outcomes = {
+                futures[future]: future.exception() or future.result()
+                for future in as_completed(futures)
+            }
+
+    for name, outcome in outcomes.items():
+        if isinstance(outcome, Exception):
+            set_row(name, "failed", f"Export failed: {outcome}", "COMPLETED")
+        else:
+            set_row(name, "done", str(outcome), "COMPLETED")
+
+    summary = [rows[name] for name in sorted(rows)]
+    counts = pd.Series([row["status"] for row in summary]).value_counts()
+    log(", ".join(f"{counts.get(status, 0)} {status}" for status in TASK_STATUSES))
+
+    return pd.DataFrame(summary, columns=["task", "state", "status", "detail"])
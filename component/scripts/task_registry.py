@@ -0,0 +1,224 @@
+"""Cached indexes of the ee tasks and of the result files in Drive.
+
+Looking up a task (or a Drive file) used to list all of them every time, which is
+quadratic when hundreds of country tasks are downloaded. TaskRegistry keeps the
+state of every task from a single listing and DriveIndex keeps a name: id index of
+the CSV files, so many tasks and files are resolved with a handful of requests.
+
+Both take the api they wrap as an argument (the ee.batch module and the Drive v3
+service), so they can be used with local stand-ins.
+"""
+
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import ee
+
+__all__ = ["TaskRegistry", "DriveIndex"]
+
+
+class TaskRegistry:
+    """State of the ee tasks, refreshed with a single listing of all of them.
+
+    ee.batch.Task.list pages through the task list by itself, so one refresh is a
+    single (paged) call whatever the number of tasks looked up.
+
+    Args:
+        batch: the ee.batch module, or a stand-in with the same interface
+        max_age: seconds before the states are listed again
+        clock: function returning the current time in seconds
+    """
+
+    def __init__(
+        self,
+        batch=None,
+        max_age: float = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.batch = batch or ee.batch
+        self.max_age = max_age
+        self.clock = clock
+
+        self.tasks: Dict[str, "ee.batch.Task"] = {}
+        self.refreshed_at: Optional[float] = None
+
+    def refresh(self) -> None:
+        """List all the tasks"""
+
+        self.tasks = {task.id: task for task in self.batch.Task.list()}
+        self.refreshed_at = self.clock()
+
+    def is_stale(self) -> bool:
+        """Return True if the states are older than max_age"""
+
+        return (
+            self.refreshed_at is None or self.clock() - self.refreshed_at > self.max_age
+        )
+
+    def resolve(self, task_ids: Iterable[str]) -> Dict[str, Optional["ee.batch.Task"]]:
+        """Return the task of each id, None for the ids that don't exist.
+
+        The tasks are listed again only if the states are stale or if one of the
+        ids is unknown (i.e. the task was started after the last listing).
+        """
+
+        task_ids = [task_id.strip() for task_id in task_ids]
+
+        if self.is_stale() or any(task_id not in self.tasks for task_id in task_ids):
+            self.refresh()
+
+        return {task_id: self.tasks.get(task_id) for task_id in task_ids}
+
+    def get(self, task_id: str) -> "ee.batch.Task":
+        """Return the task of an id, see resolve"""
+
+        task = self.resolve([task_id])[task_id.strip()]
+
+        if task is None:
+            raise Exception(f"The task id {task_id} doesn't exist in your tasks.")
+
+        return task
+
+
+class DriveIndex:
+    """Name: id index of the CSV files in Drive.
+
+    The first refresh pages through all the files, the next ones only list the
+    files modified since the newest file of the index. The deleted files are not
+    seen by these refreshes, so the whole index is listed again once it's older
+    than max_age (or a file can be removed with forget). When several files have
+    the same name, the most recent one is used.
+
+    Args:
+        service: Drive v3 service, as built by googleapiclient.discovery.build
+        page_size: number of files per page
+        query: query of the indexed files
+        max_age: seconds before the whole index is listed again
+        clock: function returning the current time in seconds
+    """
+
+    def __init__(
+        self,
+        service,
+        page_size: int = 1000,
+        query: str = "mimeType='text/csv'",
+        max_age: float = 60,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.service = service
+        self.page_size = page_size
+        self.query = query
+        self.max_age = max_age
+        self.clock = clock
+
+        self.reset()
+
+    def reset(self) -> None:
+        """Empty the index, the next refresh lists all the files"""
+
+        self.files: Dict[str, List[dict]] = {}
+        self.names: Dict[str, str] = {}
+        self.modified_time: Optional[str] = None
+        self.listed_at: Optional[float] = None
+
+    def list_files(self, query: str) -> List[dict]:
+        """Return all the files of a query, following the pages"""
+
+        files, page_token = [], None
+
+        while True:
+            response = (
+                self.service.files()
+                .list(
+                    q=query,
+                    pageSize=self.page_size,
+                    pageToken=page_token,
+                    fields="nextPageToken, files(id, name, modifiedTime, size, md5Checksum)",
+                )
+                .execute()
+            )
+            files += response.get("files", [])
+            page_token = response.get("nextPageToken")
+
+            if not page_token:
+                return files
+
+    def _remove(self, name: str, file_id: str) -> None:
+        """Remove a file id from the files of a name"""
+
+        files = [f for f in self.files.pop(name, []) if f["id"] != file_id]
+        if files:
+            self.files[name] = files
+
+    def is_stale(self) -> bool:
+        """Return True if the whole index was listed more than max_age ago"""
+
+        return self.listed_at is None or self.clock() - self.listed_at > self.max_age
+
+    def refresh(self) -> None:
+        """Add the files created or modified since the last refresh, or list all
+        the files again if the index is stale"""
+
+        if self.is_stale():
+            self.reset()
+            self.listed_at = self.clock()
+
+        query = f"{self.query} and trashed=false"
+        if self.modified_time:
+            # The files modified at the same time as the newest one are listed
+            # again, they are not indexed twice
+            query += f" and modifiedTime >= '{self.modified_time}'"
+
+        for file in self.list_files(query):
+
+            # The file may have been renamed since it was indexed
+            previous = self.names.get(file["id"])
+            if previous is not None:
+                self._remove(previous, file["id"])
+
+            self.files[file["name"]] = sorted(
+                self.files.get(file["name"], []) + [file],
+                key=lambda f: f["modifiedTime"],
+                reverse=True,
+            )
+            self.names[file["id"]] = file["name"]
+
+            # RFC 3339 times in UTC are ordered as strings
+            self.modified_time = max(self.modified_time or "", file["modifiedTime"])
+
+    def get_files(self, names: Iterable[str]) -> Dict[str, Optional[dict]]:
+        """Return the most recent file of each name, None for the files that are
+        not found.
+
+        The files have the id, name, modifiedTime, size and md5Checksum fields. The
+        index is refreshed if it's stale or if one of the names is not in it.
+        """
+
+        names = list(names)
+
+        if self.is_stale() or any(name not in self.files for name in names):
+            self.refresh()
+
+        return {
+            name: self.files[name][0] if name in self.files else None for name in names
+        }
+
+    def get_ids(self, names: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Return the id of each file name, None for the files that are not found.
+        See get_files"""
+
+        return {
+            name: file and file["id"] for name, file in self.get_files(names).items()
+        }
+
+    def get_id(self, name: str) -> Optional[str]:
+        """Return the id of a file name, see get_ids"""
+
+        return self.get_ids([name])[name]
+
+    def forget(self, file_id: str) -> None:
+        """Remove a file from the index, i.e. once it's deleted"""
+
+        name = self.names.pop(file_id, None)
+        if name is not None:
+            self._remove(name, file_id)
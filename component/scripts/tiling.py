@@ -0,0 +1,179 @@
+"""Spatial partitioning of an AOI into tiles reduced separately.
+
+The areas are additive, so a large AOI can be reduced as a set of smaller tiles
+whose results are added up (see result_algebra.add_results). The tiles are the
+intersection of the AOI with the cells of a regular grid over its bounds.
+
+reduce_tiled reduces the tiles concurrently and splits the ones that fail with a
+time out into four quadrants (a quadtree), so the tile size adapts to the AOI.
+"""
+
+import math
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import ee
+
+from component.scripts.result_algebra import add_results
+from component.scripts.retry import is_timeout_error
+from component.types import ResultsDict
+
+__all__ = [
+    "get_grid",
+    "split_bounds",
+    "get_bounds",
+    "get_rectangle",
+    "get_tile",
+    "get_cell_filter",
+    "split_aoi",
+    "reduce_tiled",
+]
+
+Bounds = Tuple[float, float, float, float]
+"""(xmin, ymin, xmax, ymax) of a rectangle"""
+
+
+def get_grid(bounds: Bounds, parts: int) -> List[Bounds]:
+    """Split the bounds into a grid of at least parts cells.
+
+    The grid has the same number of rows and columns, so parts is rounded up to the
+    next square (i.e. 2 -> 4, 5 -> 9).
+    """
+
+    xmin, ymin, xmax, ymax = bounds
+    n = math.ceil(math.sqrt(max(parts, 1)))
+    xs = [xmin + (xmax - xmin) * i / n for i in range(n + 1)]
+    ys = [ymin + (ymax - ymin) * i / n for i in range(n + 1)]
+
+    # Use the exact bounds at the edges, so the cells cover all of them
+    xs[-1], ys[-1] = xmax, ymax
+
+    return [(xs[i], ys[j], xs[i + 1], ys[j + 1]) for j in range(n) for i in range(n)]
+
+
+def split_bounds(bounds: Bounds) -> List[Bounds]:
+    """Split the bounds into its four quadrants"""
+
+    xmin, ymin, xmax, ymax = bounds
+    xmid, ymid = (xmin + xmax) / 2, (ymin + ymax) / 2
+
+    return [
+        (xmin, ymin, xmid, ymid),
+        (xmid, ymin, xmax, ymid),
+        (xmin, ymid, xmid, ymax),
+        (xmid, ymid, xmax, ymax),
+    ]
+
+
+def get_bounds(aoi: ee.Geometry) -> Bounds:
+    """Return the bounds of an ee geometry"""
+
+    coordinates: Sequence = aoi.bounds(1).coordinates().getInfo()[0]
+    xs, ys = [c[0] for c in coordinates], [c[1] for c in coordinates]
+
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def get_rectangle(cell: Bounds) -> ee.Geometry:
+    """Return the planar ee rectangle of a cell"""
+
+    return ee.Geometry.Rectangle(list(cell), None, False)
+
+
+def get_tile(aoi: ee.Geometry, cell: Bounds) -> ee.FeatureCollection:
+    """Return the part of the AOI within a cell, as reduce_regions expects it"""
+
+    return ee.FeatureCollection([ee.Feature(aoi.intersection(get_rectangle(cell), 1))])
+
+
+def get_cell_filter(aoi: ee.Geometry) -> Callable[[List[Bounds]], List[Bounds]]:
+    """Return a function keeping the cells that intersect the AOI, they are checked
+    with a single request"""
+
+    def keep_cells(cells: List[Bounds]) -> List[Bounds]:
+        intersects = ee.List(
+            [aoi.intersects(get_rectangle(cell), 1) for cell in cells]
+        ).getInfo()
+        return [cell for cell, keep in zip(cells, intersects) if keep]
+
+    return keep_cells
+
+
+def split_aoi(aoi: ee.Geometry, parts: int) -> List[ee.Geometry]:
+    """Split an AOI into the tiles of a grid of at least parts cells over its
+    bounds, see get_grid. The cells outside the AOI are dropped."""
+
+    cells = get_cell_filter(aoi)(get_grid(get_bounds(aoi), parts))
+
+    return [aoi.intersection(get_rectangle(cell), 1) for cell in cells]
+
+
+def reduce_tiled(
+    compute_tile: Callable[[Bounds], ResultsDict],
+    bounds: Bounds,
+    parts: int = 4,
+    max_depth: int = 2,
+    max_workers: int = 4,
+    keep_cells: Optional[Callable[[List[Bounds]], List[Bounds]]] = None,
+    log: Optional[Callable[[str], None]] = None,
+) -> ResultsDict:
+    """Reduce an AOI tile by tile and add up the results.
+
+    The tiles start as the cells of a grid of at least parts cells and are computed
+    concurrently. A tile failing with one of the TIMEOUT_ERRORS is split into its
+    four quadrants, up to max_depth times. The results are added up in the tiles
+    order, so the output doesn't depend on which tile finishes first.
+
+    Raises:
+        ValueError: if none of the cells of the grid intersects the AOI
+
+    Args:
+        compute_tile: returns the results of the part of the AOI within a cell
+        bounds: bounds of the AOI
+        parts: minimum number of cells of the initial grid
+        max_depth: number of times a tile can be split
+        max_workers: maximum number of tiles computed at the same time
+        keep_cells: filters the cells intersecting the AOI, see get_cell_filter
+        log: function receiving a message when a tile is split
+    """
+
+    keep_cells = keep_cells or (lambda cells: cells)
+    log = log or (lambda msg: None)
+
+    cells = keep_cells(get_grid(bounds, parts))
+    if not cells:
+        raise ValueError(f"None of the {parts} tiles of {bounds} intersects the AOI.")
+
+    results: Dict[Tuple[int, ...], ResultsDict] = {}
+    futures: Dict[Future, Tuple[Tuple[int, ...], Bounds]] = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def submit(path, cell):
+        futures[executor.submit(compute_tile, cell)] = (path, cell)
+
+    try:
+        for i, cell in enumerate(cells):
+            submit((i,), cell)
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                path, cell = futures.pop(future)
+                error = future.exception()
+
+                if error is None:
+                    results[path] = future.result()
+                    continue
+
+                if not is_timeout_error(error) or len(path) > max_depth:
+                    raise error
+
+                log(f"Tile {'.'.join(map(str, path))} failed, splitting it in 4...")
+                for j, child in enumerate(keep_cells(split_bounds(cell))):
+                    submit(path + (j,), child)
+
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return add_results(*[results[path] for path in sorted(results)])
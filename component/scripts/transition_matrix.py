@@ -0,0 +1,220 @@
+"""Compiled transition matrix used to compute the sub_b impacts.
+
+The transition matrix files are small csv files with a from_code, to_code and an
+impact_code column. They are read once and stored as a dense from_code × to_code
+array, so the impact of any number of transitions can be retrieved with a single
+indexing operation.
+"""
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from component.types import Pathlike
+
+__all__ = ["TransitionMatrix"]
+
+REQUIRED_COLS = ["from_code", "to_code", "impact_code"]
+"list: columns that every transition matrix file must contain"
+
+IMPACT_CODES = [2, 1, 3]
+"list: allowed impact codes (1: degradation, 2: stable, 3: improvement)"
+
+
+class TransitionMatrix:
+    """Dense representation of a transition matrix.
+
+    Args:
+        table (pd.DataFrame): transition table with from_code, to_code and
+            impact_code columns.
+        path (str, optional): file the table was read from.
+    """
+
+    def __init__(self, table: pd.DataFrame, path: Optional[str] = None):
+        self.validate_table(table)
+
+        table = table.copy()
+        table["transition"] = table.from_code * 100 + table.to_code
+
+        self.table = table
+        self.path = path
+
+        from_codes = table.from_code.to_numpy(dtype=np.int64)
+        to_codes = table.to_code.to_numpy(dtype=np.int64)
+
+        self.classes = np.union1d(from_codes, to_codes)
+
+        size = max(self.classes.max(initial=0), 0) + 1
+        self.impact = np.zeros((size, size), dtype=np.int64)
+        self.impact[from_codes, to_codes] = table.impact_code.to_numpy()
+
+        self.defined = np.zeros((size, size), dtype=bool)
+        self.defined[from_codes, to_codes] = True
+
+        # Transitions from or to the no data class have no impact
+        self.impact[0, :] = 0
+        self.impact[:, 0] = 0
+        self.impact.flags.writeable = False
+        self.defined.flags.writeable = False
+
+    @classmethod
+    def load(cls, path: Union[Pathlike, "TransitionMatrix"]) -> "TransitionMatrix":
+        """Read a transition matrix file.
+
+        The matrices are cached by path and modification time, so the file is only
+        read again when it changes on disk.
+        """
+
+        if isinstance(path, TransitionMatrix):
+            return path
+
+        path = Path(path).resolve()
+
+        return _load_transition_matrix(str(path), path.stat().st_mtime)
+
+    @staticmethod
+    def validate_table(table: pd.DataFrame) -> None:
+        """Check the columns and values of a transition table.
+
+        Raises:
+            ValueError: with a user readable message if the table is not valid.
+        """
+
+        if not set(REQUIRED_COLS).issubset(table.columns):
+            raise ValueError(
+                "The file must contain the following columns: "
+                f"{', '.join(REQUIRED_COLS)}"
+            )
+
+        for col in REQUIRED_COLS:
+            if not pd.api.types.is_integer_dtype(table[col]):
+                raise ValueError(f"The {col} column must contain only integer values.")
+
+        if not set(table.impact_code.unique()).issubset(IMPACT_CODES):
+            join_vals = ", ".join([str(val) for val in IMPACT_CODES])
+            raise ValueError(
+                "The impact_code column must contain only the following values: "
+                f"{join_vals}"
+            )
+
+        if len(table) != len(table.drop_duplicates(subset=["from_code", "to_code"])):
+            raise ValueError(
+                "The from_code and to_code columns must not have repeated values."
+            )
+
+    def missing_codes(self, codes: Iterable[int]) -> Tuple[List[int], List[int]]:
+        """Return the codes that are not defined as from_code and as to_code"""
+
+        codes = set(codes)
+        missing_from = codes.difference(self.table.from_code.unique())
+        missing_to = codes.difference(self.table.to_code.unique())
+
+        return sorted(missing_from), sorted(missing_to)
+
+    def _lookup(self, array: np.ndarray, from_codes, to_codes) -> np.ndarray:
+        """Return the values of a from_code × to_code array for each (from, to)
+        pair, False (0) for the codes outside of the array"""
+
+        from_codes, to_codes = np.broadcast_arrays(
+            np.asarray(from_codes, dtype=np.int64), np.asarray(to_codes, dtype=np.int64)
+        )
+
+        size = len(array)
+        known = (from_codes >= 0) & (from_codes < size)
+        known &= (to_codes >= 0) & (to_codes < size)
+
+        values = array[np.where(known, from_codes, 0), np.where(known, to_codes, 0)]
+
+        return np.where(known, values, 0).astype(array.dtype)
+
+    def undefined_transitions(self, from_codes, to_codes) -> List[Tuple[int, int]]:
+        """Return the (from, to) pairs that are not defined in the matrix.
+
+        The transitions from or to the no data class (0) don't need to be defined.
+        """
+
+        from_codes, to_codes = np.broadcast_arrays(
+            np.asarray(from_codes, dtype=np.int64), np.asarray(to_codes, dtype=np.int64)
+        )
+
+        defined = self._lookup(self.defined, from_codes, to_codes)
+        undefined = ~defined & (from_codes != 0) & (to_codes != 0)
+
+        return sorted(
+            set(zip(from_codes[undefined].tolist(), to_codes[undefined].tolist()))
+        )
+
+    def check_transitions(self, from_codes, to_codes) -> None:
+        """Check that all the (from, to) pairs are defined in the matrix.
+
+        Raises:
+            ValueError: with the undefined transitions and the land cover codes
+                missing from the matrix.
+        """
+
+        undefined = self.undefined_transitions(from_codes, to_codes)
+        if not undefined:
+            return
+
+        missing_from, missing_to = self.missing_codes(
+            [code for pair in undefined for code in pair]
+        )
+        raise ValueError(
+            "The following transitions are not defined in the transition matrix "
+            f"{self.path or ''}: {', '.join(f'{f}->{t}' for f, t in undefined)}. "
+            f"Missing from_code: {missing_from}, missing to_code: {missing_to}."
+        )
+
+    def impact_of(self, from_codes, to_codes) -> np.ndarray:
+        """Return the impact code of each (from, to) pair.
+
+        Transitions from or to the no data class (0) have no impact (0).
+
+        Args:
+            from_codes (array): initial land cover classes
+            to_codes (array): final land cover classes
+
+        Raises:
+            ValueError: if a transition is not defined in the matrix.
+        """
+
+        self.check_transitions(from_codes, to_codes)
+
+        return self._lookup(self.impact, from_codes, to_codes)
+
+    def impact_of_transition(self, transitions) -> np.ndarray:
+        """Return the impact code of each transition code (from_code * 100 + to_code)"""
+
+        transitions = np.asarray(transitions, dtype=np.int64)
+
+        return self.impact_of(transitions // 100, transitions % 100)
+
+    def impact_matrix(self, classes) -> np.ndarray:
+        """Return a len(classes) × len(classes) array with the impact of each
+        transition.
+
+        All the pairs of classes don't have to occur, so the undefined transitions
+        are 0 here: check the ones that occur with check_transitions.
+        """
+
+        classes = np.asarray(classes, dtype=np.int64)
+
+        return self._lookup(self.impact, classes[:, None], classes[None, :])
+
+    def remap_lists(self) -> Tuple[List[int], List[int]]:
+        """Return the transition codes and their impact, to be used in ee.Image.remap"""
+
+        return (
+            self.table["transition"].tolist(),
+            self.table["impact_code"].tolist(),
+        )
+
+
+@lru_cache(maxsize=16)
+def _load_transition_matrix(path: str, mtime: float) -> TransitionMatrix:
+    """Read and compile a transition matrix file, mtime is only used as cache key"""
+
+    return TransitionMatrix(pd.read_csv(path), path)
@@ -3,6 +3,7 @@ import pandas as pd
 from component.parameter.reclassify_parameters import NO_VALUE, MATRIX_NAMES
 from component.message import cm
 from .scripts import set_transition_code
+from .transition_matrix import TransitionMatrix
 import ipyvuetify as v
 
 
@@ -45,58 +46,19 @@ def validate_transition_matrix(
 
     df = read_file(file_, text_field_msg)
 
-    # Define column requirements for each type
-    column_requirements = {
-        "required_cols": ["from_code", "to_code", "impact_code"],
-        "int_cols": ["from_code", "to_code", "impact_code"],
-        "allowed_values": {"impact_code": [2, 1, 3]},
-    }
-
-    # Get column requirements for the given type
-    req_cols = column_requirements.get("required_cols", [])
-    allowed_values = column_requirements.get("allowed_values", {})
-
-    # Check that the file contains the required columns
-    if not set(req_cols).issubset(df.columns):
-        error_msg = (
-            f"The file must contain the following columns: {', '.join(req_cols)}"
-        )
-        text_field_msg.error_messages = error_msg
-        raise ValueError(error_msg)
-
-    # Check that all values are integers
-    for col in df.columns:
-        if col in req_cols:
-            if not pd.api.types.is_integer_dtype(df[col]):
-                error_msg = f"The {col} column must contain only integer values."
-                text_field_msg.error_messages = error_msg
-                raise ValueError(error_msg)
-
-    # Check that there are no values outside the allowed values in the column requirements
-    for col, allowed_vals in allowed_values.items():
-        if not set(df[col].unique()).issubset(allowed_vals):
-            join_vals = ", ".join([str(val) for val in allowed_vals])
-            error_msg = (
-                f"The {col} column must contain only the following values: {join_vals}"
-            )
-            text_field_msg.error_messages = error_msg
-            raise ValueError(error_msg)
-
-    if len(df) != len(df.drop_duplicates(subset=["from_code", "to_code"])):
-        error_msg = f"The from_code and to_code columns must not have repeated values."
-        text_field_msg.error_messages = error_msg
-        raise ValueError(error_msg)
+    # Check columns and values with the same object used to compute the impacts
+    try:
+        transition_matrix = TransitionMatrix(df, file_)
+    except ValueError as e:
+        text_field_msg.error_messages = str(e)
+        raise
 
     # Validate that the file contains all lulc_classes_sub_b codes
-    required_lulc_codes = set(lulc_classes_sub_b.keys())
-    from_codes = set(df["from_code"].unique())
-    to_codes = set(df["to_code"].unique())
-
-    if not required_lulc_codes.issubset(from_codes) or not required_lulc_codes.issubset(
-        to_codes
-    ):
-        missing_from_codes = required_lulc_codes.difference(from_codes)
-        missing_to_codes = required_lulc_codes.difference(to_codes)
+    missing_from_codes, missing_to_codes = transition_matrix.missing_codes(
+        lulc_classes_sub_b.keys()
+    )
+
+    if missing_from_codes or missing_to_codes:
         error_msg = (
             f"The file is missing the following LULC codes in 'from_code' or 'to_code': "
             f"From_code missing: {', '.join(map(str, missing_from_codes))} "
@@ -8,6 +8,9 @@ import sepal_ui.scripts.decorator as sd
 from traitlets import Bool, Int, directional_link, link
 import component.parameter.directory as DIR
 from component.scripts.deferred_calculation import perform_calculation, task_process
+from component.scripts.reduce_cache import ReduceCache
+from component.scripts.retry import COARSER_SCALE_FACTORS, RetryPolicy
+from component.scripts.thread_controller import TaskController
 import component.scripts as cs
 from component.scripts.validation import validate_calc_params
 import component.widget as cw
@@ -79,6 +82,20 @@ class CalculationView(sw.Card):
 
         self.w_scale = Slider()
 
+        self.w_coarser = v.Switch(
+            v_model=False,
+            label=cm.dashboard.label.coarser,
+            value=True,
+        )
+
+        self.w_timeout = v.TextField(
+            v_model=None,
+            label=cm.dashboard.label.timeout,
+            type="number",
+            suffix="s",
+            clearable=True,
+        )
+
         t_rsa = v.Flex(
             class_="d-flex",
             children=[
@@ -100,6 +117,30 @@ class CalculationView(sw.Card):
             ],
         )
 
+        t_coarser = v.Flex(
+            class_="d-flex",
+            children=[
+                sw.Tooltip(
+                    self.w_coarser,
+                    cm.dashboard.help.coarser,
+                    right=True,
+                    max_width=300,
+                )
+            ],
+        )
+
+        t_timeout = v.Flex(
+            class_="d-flex",
+            children=[
+                sw.Tooltip(
+                    self.w_timeout,
+                    cm.dashboard.help.timeout,
+                    right=True,
+                    max_width=300,
+                )
+            ],
+        )
+
         t_scale = v.Flex(
             class_="d-flex",
             children=[
@@ -127,6 +168,8 @@ class CalculationView(sw.Card):
                                 t_rsa,
                                 t_background,
                                 t_scale,
+                                t_coarser,
+                                t_timeout,
                             ]
                         ),
                     ]
@@ -139,15 +182,25 @@ class CalculationView(sw.Card):
         self.btn_export = sw.Btn(
             cm.dashboard.label.download, class_="ml-2", disabled=True
         )
+        self.btn_stop = sw.Btn(cm.dashboard.label.stop, class_="ml-2", color="error")
 
         self.alert = cw.Alert()
 
+        # Run the calculation in a thread, so it can be stopped with btn_stop
+        self.task_controller = TaskController(
+            function=self.run_statistics,
+            alert=self.alert,
+            start_button=self.btn,
+            stop_button=self.btn_stop,
+        )
+
         self.children = [
             title,
             # description,
             self.calculation,
             advanced_options,
             self.btn,
+            self.btn_stop,
             self.btn_export,
             self.alert,
         ]
@@ -159,7 +212,6 @@ class CalculationView(sw.Card):
         directional_link((self.w_use_rsa, "v_model"), (self.model, "rsa"))
 
         self.btn_export.on_event("click", self.export_results)
-        self.btn.on_event("click", self.run_statistics)
         self.model.observe(self.activate_download, "done")
 
         self.model.observe(lambda *_: self.alert.reset(), "sub_a_year")
@@ -199,7 +251,10 @@ class CalculationView(sw.Card):
             raise Exception(cm.error.no_aoi)
 
         output_report_path = cs.export_reports(
-            results=self.model.results, **self.model.get_data(), which=which
+            results=self.model.results,
+            **self.model.get_data(),
+            which=which,
+            cache=self.model.results_cache,
         )
         download_link = su.create_download_link(output_report_path)
         msg = sw.Markdown(
@@ -207,7 +262,6 @@ class CalculationView(sw.Card):
         )
         self.alert.add_msg(msg, type_="success")
 
-    @su.loading_button()
     def run_statistics(self, *args):
         """Start the calculation of the statistics. It will start the process on the fly
         or making a task in the background depending if the rsa is selected or if the
@@ -304,6 +358,13 @@ class CalculationView(sw.Card):
             )
             scale = self.w_scale.v_model
 
+        # Without a timeout the years wait for the server as long as it takes
+        timeout = float(self.w_timeout.v_model) if self.w_timeout.v_model else None
+
+        # The years computed on the fly are kept when the others are sent to the
+        # background
+        local_results = {}
+
         # Create a fucntion in order to be able to test it easily
         results = perform_calculation(
             aoi=self.model.aoi_model.feature_collection,
@@ -316,12 +377,23 @@ class CalculationView(sw.Card):
             logger=self.alert,
             background=self.w_background.v_model,
             scale=scale,
+            timeout=timeout,
+            stop_event=self.task_controller.stop_event,
+            local_results=local_results,
+            retry_policy=RetryPolicy(
+                scale_factors=COARSER_SCALE_FACTORS if self.w_coarser.v_model else ()
+            ),
+            cache=ReduceCache(),
         )
 
+        if results is None:
+            # The calculation was stopped, the controller already reported it
+            return
+
         if isinstance(results, ee.FeatureCollection):
 
             model_state = self.model.get_data()
-            task_process(results, task_filepath, model_state)
+            task_process(results, task_filepath, model_state, local_results)
 
             msg = sw.Markdown(
                 "The computation could not be completed on the fly. The task <i>'{}'</i> has been tasked in your <a href='https://code.earthengine.google.com/tasks'>GEE account</a>.".format(
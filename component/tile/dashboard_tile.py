@@ -11,6 +11,7 @@ from component.scripts.plots import (
     get_sankey_chart,
 )
 from component.scripts.report_scripts import get_belt_desc
+from component.scripts.sub_a import get_mgci_by_year
 from component.widget.map import MapView
 from component.widget.statistics_card import StatisticCard
 
@@ -120,18 +121,19 @@ class DashViewA(DashView):
 
         super().render_dashboard()
 
-        df = cs.parse_to_year_a(
-            self.model.results,
-            self.model.reporting_years_sub_a,
-            self.year_select.v_model,
+        df = self.model.results_cache.sub_a_year(
+            self.model.reporting_years_sub_a, int(self.year_select.v_model)
         )
 
+        # Calculate the MGCI of all the belts at once and share it with the cards
+        mgci_df = get_mgci_by_year(df)
+
         # Get overall MGCI widget
-        w_overall = StatisticCard(df, "Total", self.model)
+        w_overall = StatisticCard(df, "Total", self.model, mgci_df=mgci_df)
 
         # Get individual stats widgets per Kapos classes
         w_individual = [
-            StatisticCard(df, belt_class, self.model)
+            StatisticCard(df, belt_class, self.model, mgci_df=mgci_df)
             for belt_class in list(df["belt_class"].unique())
         ]
 
@@ -189,9 +191,12 @@ class DashViewB(DashView):
 
         look_up_year = change["new"]
 
-        df = cs.parse_sub_b_year(self.model.results, look_up_year)
+        df = self.model.results_cache.sub_b_year(look_up_year)
         look_up_years = list(look_up_year.values())[0]
-        self.nodes_and_links = get_nodes_and_links(df, param.LC_CLASSES, look_up_years)
+        self.nodes_and_links = self.model.results_cache.get(
+            ("sankey", str(look_up_year)),
+            lambda: get_nodes_and_links(df, param.LC_CLASSES, look_up_years),
+        )
 
         # Get all belts that are available for the selected year
 
@@ -8,6 +8,7 @@ import sepal_ui.sepalwidgets as sw
 import component.parameter.directory as DIR
 import component.scripts as cs
 from component.scripts.gdrive import GDrive
+from component.scripts.task_ingestion import TASK_STATUSES, ingest_tasks
 import component.widget as cw
 from component.message import cm
 
@@ -58,16 +59,67 @@ class DownloadTaskView(v.Card):
         self.alert = sw.Alert()
 
         self.btn = sw.Btn(cm.dashboard.label.calculate_from_task)
+        self.btn_bulk = sw.Btn(
+            cm.dashboard.label.calculate_all_tasks, class_="ml-2", outlined=True
+        )
+
+        # Summary of the bulk ingestion
+        self.summary = v.Flex(class_="mt-2")
 
         self.children = [
             title,
             description,
             self.alert,
             self.w_file_input,
-            self.btn,
+            v.Flex(children=[self.btn, self.btn_bulk]),
+            self.summary,
         ]
 
+        # Created on the first download, its task and file indexes are reused
+        self.gdrive = None
+
         self.btn.on_event("click", self.run_statistics)
+        self.btn_bulk.on_event("click", self.run_all_statistics)
+
+    @su.loading_button()
+    def run_all_statistics(self, *_):
+        """Download the results and export the reports of every task file of the
+        tasks folder, and display the outcome of each one"""
+
+        self.summary.children = []
+        self.gdrive = self.gdrive or GDrive()
+
+        summary = ingest_tasks(
+            DIR.TASKS_DIR, self.gdrive, log=lambda msg: self.alert.append_msg(msg)
+        )
+
+        header = v.Html(
+            tag="tr",
+            children=[v.Html(tag="th", children=[col]) for col in summary.columns],
+        )
+        rows = [
+            v.Html(
+                tag="tr",
+                children=[v.Html(tag="td", children=[str(val)]) for val in row],
+            )
+            for row in summary.fillna("").itertuples(index=False)
+        ]
+        self.summary.children = [
+            sw.SimpleTable(
+                children=[
+                    v.Html(tag="thead", children=[header]),
+                    v.Html(tag="tbody", children=rows),
+                ]
+            )
+        ]
+
+        counts = summary.status.value_counts()
+        self.alert.append_msg(
+            cm.dashboard.tasks.summary.format(
+                *[counts.get(status, 0) for status in TASK_STATUSES]
+            ),
+            type_="success" if not counts.get("failed", 0) else "warning",
+        )
 
     @su.loading_button()
     def run_statistics(self, *_):
@@ -107,6 +159,9 @@ class DownloadTaskView(v.Card):
             report_folder = Path(data["model_state"]["report_folder"])
             session_id = data["model_state"]["session_id"]
 
+            # Years that were already computed on the fly
+            local_results = data.get("local_results", {})
+
         # reporting_years_sub_a always have to be inteners
         reporting_years_sub_a = {
             int(key): value for key, value in reporting_years_sub_a.items()
@@ -119,13 +174,20 @@ class DownloadTaskView(v.Card):
         msg = cw.TaskMsg(f"Processing {task_filename}..", session_id)
         self.alert.append_msg(msg)
 
-        result_file = GDrive().download_from_task_file(
+        self.gdrive = self.gdrive or GDrive()
+        result_file = self.gdrive.download_from_task_file(
             task_id, tasks_file, task_filename
         )
 
         results = cs.read_from_csv(result_file)
         msg.set_state("success")
 
+        if local_results:
+            self.alert.append_msg(
+                f"Merging the years computed on the fly: {', '.join(local_results)}"
+            )
+            results = {**local_results, **results}
+
         # Write the results on a comma separated values file, or an excel file
 
         self.alert.append_msg("Exporting tables...")
@@ -1,6 +1,8 @@
 from pathlib import Path
 from typing import Dict, List, NewType, Tuple, TypedDict, Union
 
+import numpy as np
+
 Pathlike = Union[str, Path]
 """A type hint for a path-like object, either a string or a Path object."""
 
@@ -34,3 +36,13 @@ YearKey = NewType("YearKey", str)
 
 ResultsDict = Dict[YearKey, Union[SubAYearDict, SubBYearDict]]
 """A dictionary containing the results of the calculation for subindicators A and/or B."""
+
+
+class ResultColumns(TypedDict):
+    """Flat (columnar) representation of the results, one item per leaf group."""
+
+    process_id: np.ndarray
+    category: np.ndarray
+    biobelt: np.ndarray
+    lc: np.ndarray
+    sum: np.ndarray
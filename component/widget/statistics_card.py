@@ -7,11 +7,11 @@ from component.model.model import MgciModel
 import component.parameter.module_parameter as param
 import component.scripts as cs
 from component.message import cm
-from component.scripts.sub_a import get_mgci
+from component.scripts.sub_a import get_mgci_by_year
 
 
 class StatisticCard(sw.Card):
-    def __init__(self, df, belt_class, model: MgciModel, *args, **kwargs):
+    def __init__(self, df, belt_class, model: MgciModel, *args, mgci_df=None, **kwargs):
         """
         Creates a full layout view with a circular MGC index followed by
         horizontal bars of land cover area per kapos classes.
@@ -19,11 +19,14 @@ class StatisticCard(sw.Card):
         Args:
             krange (int): kapos range number (1,2,3,4,5,6); empty for overall.
             area_per_class (dictionary): Dictionary of lu/lc areas
+            mgci_df (pd.DataFrame, optional): output of sub_a.get_mgci_by_year. It
+                can be shared between cards so the MGCI is only calculated once.
         """
 
         self.df = df
         self.belt_class = belt_class
         self.model = model
+        self.mgci_df = get_mgci_by_year(df) if mgci_df is None else mgci_df
 
         super().__init__(*args, **kwargs)
 
@@ -71,9 +74,7 @@ class StatisticCard(sw.Card):
         """from the model.results, parse the result and return the requested model"""
 
         return round(
-            get_mgci(self.df)
-            .loc[get_mgci(self.df).belt_class == belt_class, "mgci"]
-            .iloc[0],
+            self.mgci_df.loc[self.mgci_df.belt_class == belt_class, "mgci"].iloc[0],
             2,
         )
 
@@ -0,0 +1,174 @@
+"""Test scripts in scripts/batch.py against a local stand-in for ee.batch"""
+
+import itertools
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(".").resolve()))
+
+import pytest
+
+from component.scripts.batch import TASK_SELECTORS, BatchRunner, main
+
+
+class FakeTask:
+    """ee.batch.Task stand-in, it's running after the first poll and then it takes
+    the next outcome of its AOI"""
+
+    ids = itertools.count()
+
+    def __init__(self, batch, description, outcome):
+        self.batch = batch
+        self.id = f"TASK_{next(self.ids)}"
+        self.description = description
+        self.outcome = outcome
+        self.state = "UNSUBMITTED"
+
+    def start(self):
+        self.state = "READY"
+        self.batch.tasks.append(self)
+
+    def status(self):
+        return {"state": self.state, "error_message": f"{self.description} failed"}
+
+
+class FakeBatch:
+    """ee.batch stand-in, outcomes gives the final state of the consecutive tasks
+    of each AOI (COMPLETED by default)"""
+
+    def __init__(self, outcomes=None):
+        self.outcomes = {k: iter(v) for k, v in (outcomes or {}).items()}
+        self.tasks = []
+        self.exports = []
+        self.max_running = 0
+
+        self.Export = SimpleNamespace(table=SimpleNamespace(toDrive=self.to_drive))
+        self.Task = SimpleNamespace(list=self.list)
+
+    def to_drive(self, collection, description, **kwargs):
+        assert kwargs["selectors"] == TASK_SELECTORS
+        self.exports.append(description)
+        outcome = next(self.outcomes.get(description, iter([])), "COMPLETED")
+        return FakeTask(self, description, outcome)
+
+    def list(self):
+        running = [t for t in self.tasks if t.state in ["READY", "RUNNING"]]
+        self.max_running = max(self.max_running, len(running))
+
+        for task in running:
+            task.state = task.outcome if task.state == "RUNNING" else "RUNNING"
+
+        return self.tasks[::-1]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def get_runner(names, state_file, batch, clock, **kwargs):
+    return BatchRunner(
+        names,
+        lambda name: f"process of {name}",
+        state_file,
+        batch=batch,
+        sleep=clock.sleep,
+        clock=clock,
+        logger=lambda msg: None,
+        **kwargs,
+    )
+
+
+def test_run(tmp_path):
+
+    names = [f"AOI_{i}" for i in range(7)]
+    batch = FakeBatch({"AOI_1": ["FAILED", "COMPLETED"], "AOI_2": ["FAILED"] * 3})
+    clock = FakeClock()
+    state_file = tmp_path / "state.json"
+
+    runner = get_runner(
+        names,
+        state_file,
+        batch,
+        clock,
+        max_in_flight=3,
+        max_retries=2,
+        backoff=100,
+        poll_interval=10,
+    )
+    summary = runner.run()
+
+    assert summary["completed"] == [name for name in names if name != "AOI_2"]
+    assert summary["failed"] == ["AOI_2"]
+
+    # No more than max_in_flight tasks at once, and the failed AOIs were retried
+    assert batch.max_running <= 3
+    assert batch.exports.count("AOI_1") == 2
+    assert batch.exports.count("AOI_2") == 3
+
+    # Retries wait for the backoff: 100s then 200s
+    assert clock.now >= 300
+
+    state = json.loads(state_file.read_text())["aois"]
+    assert state["AOI_1"]["attempts"] == 2
+    assert state["AOI_2"]["error"] == "AOI_2 failed"
+
+
+def test_resume(tmp_path):
+
+    names = ["A", "B", "C", "D"]
+    state_file = tmp_path / "state.json"
+    clock = FakeClock()
+
+    # The run is interrupted after the first step
+    batch = FakeBatch()
+    runner = get_runner(names, state_file, batch, clock, max_in_flight=2)
+    runner.step()
+    assert batch.exports == ["A", "B"]
+
+    # The new run keeps tracking the running tasks and only submits the others
+    runner = get_runner(names, state_file, batch, clock, max_in_flight=2)
+    assert runner.run()["completed"] == names
+    assert batch.exports == names
+
+    # Nothing is submitted again once everything is completed
+    runner = get_runner(names, state_file, FakeBatch(), clock)
+    assert runner.run()["completed"] == names
+    assert runner.batch.exports == []
+
+
+@pytest.mark.parametrize("retry_failed", [False, True])
+def test_retry_failed(tmp_path, retry_failed):
+
+    state_file = tmp_path / "state.json"
+    clock = FakeClock()
+
+    batch = FakeBatch({"A": ["FAILED"]})
+    get_runner(["A"], state_file, batch, clock, max_retries=0).run()
+
+    batch = FakeBatch()
+    summary = get_runner(
+        ["A"], state_file, batch, clock, retry_failed=retry_failed
+    ).run()
+
+    assert summary["completed"] == (["A"] if retry_failed else [])
+    assert batch.exports == (["A"] if retry_failed else [])
+
+
+def test_main_flat_groups(capsys):
+
+    # The grouped exports can't be flat, the combination is rejected before any
+    # request
+    argv = ["--admin", "a", "--property", "p", "--years", "y", "--state", "s"]
+    with pytest.raises(SystemExit):
+        main([*argv, "--flat", "--group-size", "10"])
+
+    assert "--flat can't be used with --group-size" in capsys.readouterr().err
@@ -0,0 +1,60 @@
+"""Test scripts in scripts/calculation_plan.py"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+from component.scripts.calculation_plan import plan_processes
+
+
+def lc(year, collection="esa"):
+    return {"asset": f"{collection}/{year}", "year": year}
+
+
+def test_plan_processes():
+
+    sub_a_years = [[lc(2000)], [lc(2010)], [lc(2015)], [lc(2018)]]
+    sub_b_years = [[lc(2000), lc(2015), lc(2018)], [lc(2000), lc(2015), lc(2021)]]
+
+    scales = []
+
+    def get_scale(asset):
+        scales.append(asset)
+        return 300
+
+    processes = plan_processes(sub_a_years + sub_b_years, get_scale=get_scale)
+
+    # Every shared year is reduced once, within the first period containing it
+    assert processes == [
+        ([lc(2010)], []),
+        (sub_b_years[0], [lc(2000), lc(2015), lc(2018)]),
+        (sub_b_years[1], []),
+    ]
+
+    # The scales are only retrieved when the assets differ, and only once
+    assert sorted(scales) == ["esa/2000", "esa/2015", "esa/2018"]
+
+
+def test_plan_processes_scale():
+
+    sub_a_years = [[lc(2000)], [lc(2015)]]
+    sub_b_years = [[lc(2000), lc(2015), lc(2018)]]
+    years = sub_a_years + sub_b_years
+
+    scales = {"esa/2000": 300, "esa/2015": 100}
+
+    # The 2015 asset has its own scale, so it's reduced on its own
+    assert plan_processes(years, get_scale=scales.get) == [
+        ([lc(2015)], []),
+        (sub_b_years[0], [lc(2000)]),
+    ]
+
+    # Unless the calculation has a fixed scale
+    assert plan_processes(years, scale=100, get_scale=scales.get) == [
+        (sub_b_years[0], [lc(2000), lc(2015)]),
+    ]
+
+    # Only sub_a years, or only sub_b periods, are not changed
+    assert plan_processes(sub_a_years) == [(year, []) for year in sub_a_years]
+    assert plan_processes(sub_b_years) == [(year, []) for year in sub_b_years]
@@ -0,0 +1,89 @@
+"""Test scripts in scripts/colab_combining_files.py"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+import pandas as pd
+import pytest
+
+from component.scripts.colab_combining_files import append_excel_files
+from component.scripts.excel_export import write_excel_sheets
+from component.scripts.report_tables import (
+    REPORT_TABLES,
+    TABLE_SCHEMAS,
+    write_report_tables,
+)
+
+
+@pytest.fixture()
+def report_files(tmp_path) -> list:
+    """Three country workbooks with the same sheets and a corrupt one"""
+
+    file_paths = []
+    for i, country in enumerate(["Bolivia", "Chile", "Peru"]):
+        sheets = {
+            "Table1": pd.DataFrame(
+                {"GeoAreaName": [country] * 2, "OBS_VALUE": [i, "NA"]}
+            ),
+            "Table2": pd.DataFrame({"GeoAreaName": [country], "OBS_VALUE": [i * 0.5]}),
+            "Table3": pd.DataFrame({"GeoAreaName": [country], "OBS_VALUE": [i]}),
+            "Extra": pd.DataFrame({"GeoAreaName": [country]}),
+        }
+        file_paths.append(write_excel_sheets(tmp_path / f"{country}.xlsx", sheets))
+
+    corrupt_file = tmp_path / "Ecuador.xlsx"
+    corrupt_file.write_text("not a workbook")
+    file_paths.insert(1, str(corrupt_file))
+
+    return file_paths
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_append_excel_files(tmp_path, report_files, max_workers):
+
+    output_file = tmp_path / "combined.xlsx"
+    skipped_files = append_excel_files(
+        report_files, 3, output_file, max_workers=max_workers, verbose=False
+    )
+
+    # The corrupt file is reported and the other ones are combined in order
+    assert [file_path for file_path, _ in skipped_files] == [report_files[1]]
+
+    combined = pd.read_excel(output_file, sheet_name=None)
+    assert list(combined) == ["Table1", "Table2", "Table3"]
+    assert combined["Table1"].GeoAreaName.tolist() == [
+        "Bolivia",
+        "Bolivia",
+        "Chile",
+        "Chile",
+        "Peru",
+        "Peru",
+    ]
+    assert combined["Table2"].OBS_VALUE.tolist() == [0, 0.5, 1]
+
+
+def test_append_report_tables(tmp_path):
+
+    file_paths = []
+    for country in ["Bolivia", "Chile"]:
+        tables = {
+            table: pd.DataFrame(
+                {
+                    col: [country if dtype == "string" else 1]
+                    for col, dtype in schema.items()
+                }
+            )
+            for table, schema in TABLE_SCHEMAS.items()
+        }
+        file_paths += write_report_tables(tables, tmp_path, country, "csv")
+
+    output_file = tmp_path / "combined.xlsx"
+    assert append_excel_files(file_paths, 3, output_file, max_workers=1) == []
+
+    # All the tables of the columnar files are combined
+    combined = pd.read_excel(output_file, sheet_name=None)
+    assert list(combined) == REPORT_TABLES
+    for df in combined.values():
+        assert df.GeoAreaName.tolist() == ["Bolivia", "Chile"]
@@ -0,0 +1,106 @@
+"""Test scripts in scripts/concurrent_calls.py"""
+
+import sys
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+from component.scripts.concurrent_calls import run_concurrently
+
+
+def call(value, wait=0.0, release=None, error=None):
+    """Return a call returning value after wait seconds, or once release is set"""
+
+    def function():
+        if release is not None:
+            release.wait(5)
+        time.sleep(wait)
+        if error:
+            raise error
+        return value
+
+    return function
+
+
+def test_run_concurrently():
+
+    calls = {
+        "2000": call(1, wait=0.2),
+        "2015": call(2),
+        "2018": call(3, error=ValueError("failed")),
+    }
+
+    outcomes = list(run_concurrently(calls, max_workers=3, poll_interval=0.01))
+
+    # The outcomes are yielded as the calls finish
+    assert sorted((key, status) for key, status, _ in outcomes) == [
+        ("2000", "success"),
+        ("2015", "success"),
+        ("2018", "error"),
+    ]
+    assert outcomes[-1][:2] == ("2000", "success")
+    values = {key: value for key, _, value in outcomes}
+    assert values["2015"] == 2
+    assert str(values["2018"]) == "failed"
+
+
+def test_run_concurrently_max_workers():
+
+    running, max_running = [], []
+    lock = threading.Lock()
+
+    def function():
+        with lock:
+            running.append(1)
+            max_running.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+
+    calls = {str(i): function for i in range(6)}
+    outcomes = list(run_concurrently(calls, max_workers=2, poll_interval=0.01))
+
+    assert len(outcomes) == 6
+    assert max(max_running) <= 2
+
+
+def test_run_concurrently_timeout():
+
+    release = threading.Event()
+    calls = {"slow": call(1, release=release), "fast": call(2)}
+
+    outcomes = list(
+        run_concurrently(calls, max_workers=2, timeout=0.1, poll_interval=0.01)
+    )
+    release.set()
+
+    assert outcomes == [("fast", "success", 2), ("slow", "timeout", None)]
+
+
+def test_run_concurrently_stop():
+
+    release, stop_event = threading.Event(), threading.Event()
+    calls = {
+        "running": call(1, release=release),
+        "pending": call(2),
+        "other": call(3),
+    }
+
+    # The first call blocks the only worker, the other ones never start
+    outcomes = run_concurrently(
+        calls, max_workers=1, stop_event=stop_event, poll_interval=0.01
+    )
+
+    stop_event.set()
+    with closing(outcomes):
+        result = list(outcomes)
+    release.set()
+
+    assert result == [
+        ("running", "cancelled", None),
+        ("pending", "cancelled", None),
+        ("other", "cancelled", None),
+    ]
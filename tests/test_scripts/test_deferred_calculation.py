@@ -3,6 +3,7 @@ from pathlib import Path
 import ee
 import pytest
 from component.scripts.deferred_calculation import task_process, perform_calculation
+from component.scripts.reduce_cache import ReduceCache
 import component.scripts as cs
 from tests.utils import compare_nested_dicts
 from component.types import ResultsDict
@@ -120,6 +121,91 @@ def test_perform_calculation_timed_out(
         assert result is None
 
 
+def test_perform_calculation_partial_fallback(monkeypatch, test_antioquia_aoi) -> None:
+    """Only the years that failed on the fly are sent to the background"""
+
+    class TimedOut(ee.Dictionary):
+        def getInfo(self):
+            raise Exception("Computation timed out.")
+
+    sub_a = [{"biobelt": 1, "groups": [{"lc": 1, "sum": 1.0}]}]
+
+    def reduce_regions(aoi, matrix, rsa, dem, year, *args, **kwargs):
+        if year[0]["year"] == 2015:
+            return TimedOut({"sub_a": sub_a})
+        return ee.Dictionary({"sub_a": sub_a})
+
+    monkeypatch.setattr(
+        "component.scripts.deferred_calculation.reduce_regions", reduce_regions
+    )
+
+    years = [[{"asset": f"lc/{year}", "year": year}] for year in [2000, 2015, 2018]]
+    calculation_parms = {
+        "aoi": test_antioquia_aoi,
+        "rsa": False,
+        "dem": None,
+        "remap_matrix_a": {},
+        "remap_matrix_b": {},
+        "transition_matrix": None,
+        "years": years,
+        "share_years": False,
+    }
+
+    local_results = {}
+    result = perform_calculation(**calculation_parms, local_results=local_results)
+
+    assert local_results == {"2000": {"sub_a": sub_a}, "2018": {"sub_a": sub_a}}
+    assert isinstance(result, ee.FeatureCollection)
+    assert result.aggregate_array("process_id").getInfo() == ["2015"]
+
+    # Without local results all the years are sent to the background
+    result = perform_calculation(**calculation_parms)
+    assert result.size().getInfo() == 3
+
+
+def test_perform_calculation_cache(monkeypatch, tmp_path, test_antioquia_aoi) -> None:
+    """The processes already computed with the same inputs are read from the cache"""
+
+    computed = []
+
+    class Counted(ee.Dictionary):
+        def getInfo(self):
+            computed.append(1)
+            return super().getInfo()
+
+    sub_a = [{"biobelt": 1, "groups": [{"lc": 1, "sum": 1.0}]}]
+
+    def reduce_regions(aoi, matrix, rsa, dem, year, *args, **kwargs):
+        return Counted({"sub_a": sub_a})
+
+    monkeypatch.setattr(
+        "component.scripts.deferred_calculation.reduce_regions", reduce_regions
+    )
+
+    years = [[{"asset": f"lc/{year}", "year": year}] for year in [2000, 2015]]
+    calculation_parms = {
+        "aoi": test_antioquia_aoi,
+        "rsa": False,
+        "dem": None,
+        "remap_matrix_a": {},
+        "remap_matrix_b": {},
+        "transition_matrix": None,
+        "years": years,
+        "share_years": False,
+        "cache": ReduceCache(tmp_path / "cache.sqlite"),
+    }
+
+    result = perform_calculation(**calculation_parms)
+    assert len(computed) == 2
+
+    assert perform_calculation(**calculation_parms) == result
+    assert len(computed) == 2
+
+    # Different inputs are computed again
+    perform_calculation(**{**calculation_parms, "rsa": True})
+    assert len(computed) == 4
+
+
 if __name__ == "__main__":
     # Run pytest with the current file
     pytest.main([__file__, "-s", "-vv"])
@@ -0,0 +1,149 @@
+"""Test scripts in scripts/drive_download.py against a local stand-in of the Drive
+media http requests"""
+
+import hashlib
+import sys
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+import pytest
+
+from component.scripts.drive_download import (
+    DownloadJob,
+    download_many,
+    download_resumable,
+    get_part_path,
+)
+
+
+class Response(dict):
+    def __init__(self, status, headers=None):
+        super().__init__(headers or {})
+        self.status = status
+
+
+class FakeHttp:
+    """httplib2.Http stand-in serving the files with Range support, it fails after
+    fail_after requests to simulate an interrupted download, or always answers
+    with the error status if any"""
+
+    def __init__(self, files, fail_after=None, ranges=True, status=None):
+        self.files = files
+        self.fail_after = fail_after
+        self.ranges = ranges
+        self.status = status
+        self.requests = []
+
+    def request(self, uri, method="GET", headers=None):
+
+        if self.fail_after is not None and len(self.requests) >= self.fail_after:
+            raise ConnectionError("Connection lost")
+
+        self.requests.append(headers["Range"])
+        if self.status is not None:
+            return Response(self.status), b""
+
+        data = self.files[uri]
+
+        if not self.ranges:
+            return Response(200), data
+
+        start, end = map(int, headers["Range"][len("bytes=") :].split("-"))
+        if start >= len(data):
+            return Response(416), b""
+
+        content = data[start : end + 1]
+        content_range = f"bytes {start}-{start + len(content) - 1}/{len(data)}"
+        return Response(206, {"content-range": content_range}), content
+
+
+DATA = bytes(range(256)) * 40
+
+
+def get_job(tmp_path, name="result.csv", **kwargs):
+    return DownloadJob(uri=name, output_file=tmp_path / name, **kwargs)
+
+
+def test_download_resumable(tmp_path):
+
+    md5 = hashlib.md5(DATA).hexdigest()
+    job = get_job(tmp_path, size=len(DATA), md5=md5)
+
+    # The download is interrupted after 3 chunks, only the part file is written
+    http = FakeHttp({"result.csv": DATA}, fail_after=3)
+    with pytest.raises(ConnectionError):
+        download_resumable(http, job, chunk_size=1000)
+
+    assert not job.output_file.exists()
+    assert get_part_path(job.output_file).stat().st_size == 3000
+
+    # The next download starts from there
+    http = FakeHttp({"result.csv": DATA})
+    assert download_resumable(http, job, chunk_size=1000) == job.output_file
+    assert http.requests[0] == "bytes=3000-3999"
+    assert len(http.requests) == 8
+
+    assert job.output_file.read_bytes() == DATA
+    assert not get_part_path(job.output_file).exists()
+
+    # The size is taken from the Content-Range header when it's not known
+    job = get_job(tmp_path, "other.csv")
+    download_resumable(FakeHttp({"other.csv": DATA}), job, chunk_size=3000)
+    assert job.output_file.read_bytes() == DATA
+
+    # A server ignoring the ranges sends the whole file
+    job = get_job(tmp_path, "no_range.csv", size=len(DATA))
+    get_part_path(job.output_file).write_bytes(b"stale")
+    download_resumable(FakeHttp({"no_range.csv": DATA}, ranges=False), job)
+    assert job.output_file.read_bytes() == DATA
+
+
+def test_download_resumable_checks(tmp_path):
+
+    http = FakeHttp({"result.csv": DATA})
+
+    job = get_job(tmp_path, md5=hashlib.md5(b"other").hexdigest())
+    with pytest.raises(Exception, match="checksum"):
+        download_resumable(http, job)
+
+    job = get_job(tmp_path, size=len(DATA) + 1)
+    with pytest.raises(Exception, match="bytes instead of"):
+        download_resumable(http, job)
+
+    # The corrupted downloads are removed so the next one starts over
+    assert not job.output_file.exists()
+    assert not get_part_path(job.output_file).exists()
+
+    with pytest.raises(Exception, match="status 404"):
+        download_resumable(FakeHttp(files={}, status=404), job)
+
+
+def test_download_many(tmp_path):
+
+    files = {f"task_{i}.csv": DATA[: 1000 + i] for i in range(10)}
+    files["corrupted.csv"] = DATA
+
+    lock = threading.Lock()
+    https = []
+
+    def get_http():
+        with lock:
+            https.append(FakeHttp(files))
+            return https[-1]
+
+    jobs = {
+        name: get_job(tmp_path, name, size=len(data)) for name, data in files.items()
+    }
+    jobs["corrupted.csv"] = get_job(tmp_path, "corrupted.csv", size=1)
+
+    outcomes = download_many(get_http, jobs, max_workers=3, chunk_size=256)
+
+    assert list(outcomes) == list(jobs)
+    assert isinstance(outcomes.pop("corrupted.csv"), Exception)
+    for name, path in outcomes.items():
+        assert path.read_bytes() == files[name]
+
+    # Every download has its own http object
+    assert len(https) == len(jobs)
@@ -0,0 +1,85 @@
+"""Test scripts in scripts/excel_export.py"""
+
+import sys
+from copy import copy
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.styles import Alignment
+from openpyxl.utils import get_column_letter
+
+from component.scripts.excel_export import get_column_widths, write_excel_sheets
+
+
+def write_and_autofit(output_name, sheets):
+    """Write the sheets with pandas and auto-fit them cell by cell"""
+
+    with pd.ExcelWriter(output_name) as writer:
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+        for worksheet in writer.sheets.values():
+            for col in worksheet.columns:
+                max_length = max(len(str(cell.value)) for cell in col)
+                worksheet.column_dimensions[get_column_letter(col[0].column)].width = (
+                    max_length + 4
+                )
+
+                if "OBS" in str(col[0].value).upper():
+                    for cell in col:
+                        cell.alignment = Alignment(horizontal="right")
+
+
+def test_write_excel_sheets(tmp_path):
+
+    sheets = {
+        "Table1": pd.DataFrame(
+            {
+                "belt_class": [1, 2, 3],
+                "GeoAreaName": ["Antioquia", "NA", "A much longer area name"],
+                "OBS_VALUE": [12.5, np.nan, 1234567.125],
+                "obs_status": ["A", "M", "A"],
+            }
+        ),
+        "Table2": pd.DataFrame(
+            {
+                "TIME_PERIOD": [2000, 2015],
+                "OBS_VALUE": ["NA", 0.1],
+                "value": [np.inf, 1 / 3],
+            }
+        ),
+        "Empty": pd.DataFrame({"OBS_VALUE": []}),
+    }
+
+    assert get_column_widths(sheets["Table1"]) == [14, 27, 15, 14]
+
+    expected_file = tmp_path / "expected.xlsx"
+    write_and_autofit(expected_file, sheets)
+    output_file = write_excel_sheets(tmp_path / "output.xlsx", sheets)
+
+    expected = openpyxl.load_workbook(expected_file)
+    output = openpyxl.load_workbook(output_file)
+
+    assert output.sheetnames == expected.sheetnames
+
+    for sheet_name in expected.sheetnames:
+        expected_rows = list(expected[sheet_name].iter_rows())
+        output_rows = list(output[sheet_name].iter_rows())
+        assert len(output_rows) == len(expected_rows)
+
+        for expected_row, output_row in zip(expected_rows, output_rows):
+            for expected_cell, output_cell in zip(expected_row, output_row):
+                assert output_cell.value == expected_cell.value
+                for style in ["alignment", "font", "border"]:
+                    assert copy(getattr(output_cell, style)) == copy(
+                        getattr(expected_cell, style)
+                    )
+
+        for letter, dimension in expected[sheet_name].column_dimensions.items():
+            assert output[sheet_name].column_dimensions[letter].width == (
+                dimension.width
+            )
@@ -0,0 +1,87 @@
+"""Test scripts in scripts/interpolation.py"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+import numpy as np
+import pytest
+from scipy.interpolate import interp1d
+
+import component.scripts as cs
+from component.scripts.interpolation import SubAYearMatrix
+from component.types import ResultsDict
+
+
+@pytest.fixture()
+def results() -> ResultsDict:
+    """Antioquia results with a second year where the classes and belts are
+    shuffled and some of them are missing"""
+
+    results = json.loads(
+        Path("tests/test_output_result/result_antioquia.json").read_text()
+    )
+    results["2010"] = json.loads(json.dumps(results["2000"]))
+    for belt in results["2010"]["sub_a"]:
+        belt["groups"] = belt["groups"][::-1][1:]
+        for group in belt["groups"]:
+            group["sum"] *= 1 + group["lc"] / 7
+    results["2010"]["sub_a"] = results["2010"]["sub_a"][::-1]
+
+    return results
+
+
+def test_linear(results):
+
+    reporting_years = cs.get_sub_a_break_points({1: {"year": 2000}, 2: {"year": 2010}})
+    parsed_dfs = cs.parse_sub_a_years(results, reporting_years)
+
+    assert list(parsed_dfs) == [2000, 2005, 2010]
+
+    # Computed years are the same as parsing them directly
+    for year in [2000, 2010]:
+        expected = cs.parse_result(results[str(year)]["sub_a"], single=True)
+        assert parsed_dfs[year].equals(expected)
+
+    # Interpolated years are the same as using interp1d on the merged years
+    merged_df = parsed_dfs[2000].merge(parsed_dfs[2010], on=["belt_class", "lc_class"])
+    interp_func = interp1d(
+        [2000, 2010], np.vstack([merged_df["sum_x"], merged_df["sum_y"]]), axis=0
+    )
+
+    assert parsed_dfs[2005]["sum"].tolist() == interp_func(2005).tolist()
+    assert parsed_dfs[2005][["belt_class", "lc_class"]].equals(
+        merged_df[["belt_class", "lc_class"]]
+    )
+
+
+def test_methods(results):
+
+    year_matrix = SubAYearMatrix(results)
+    targets = {2003: (2000, 2010), 2008: (2000, 2010)}
+    keys = ["belt_class", "lc_class"]
+    first, last = year_matrix.get_year(2000), year_matrix.get_year(2010)
+
+    # Values are taken from the closest year
+    nearest = year_matrix.interpolate(targets, "nearest")
+    merged = nearest[2003].merge(first, on=keys)
+    assert (merged.sum_x == merged.sum_y).all()
+    merged = nearest[2008].merge(last, on=keys)
+    assert (merged.sum_x == merged.sum_y).all()
+
+    # Belt areas are interpolated and the land cover shares are kept, so all the
+    # classes of a belt grow with the same ratio
+    share = year_matrix.interpolate(targets, "constant_share")[2003]
+    merged = share.merge(first, on=keys)
+    ratio = (merged.sum_x / merged.sum_y).groupby(merged.belt_class)
+    assert np.allclose(ratio.max(), ratio.min())
+
+    first_area = first.groupby("belt_class")["sum"].sum()
+    last_area = last.groupby("belt_class")["sum"].sum()
+    expected = first_area + (last_area - first_area) * 0.3
+    assert np.allclose(ratio.max(), expected / first_area)
+
+    with pytest.raises(ValueError):
+        year_matrix.interpolate(targets, "cubic")
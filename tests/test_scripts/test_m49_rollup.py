@@ -0,0 +1,120 @@
+"""Test scripts in scripts/m49_rollup.py"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+import pandas as pd
+import pytest
+
+import component.scripts as cs
+from component.scripts.m49_rollup import (
+    WORLD,
+    get_roll_up_reports,
+    read_m49_regions,
+    roll_up_results,
+)
+from component.scripts.result_algebra import add_results
+
+UNSD_FILE = """\
+Global Code;Global Name;Region Code;Region Name;Sub-region Code;Sub-region Name;Intermediate Region Code;Intermediate Region Name;Country or Area;M49 Code;ISO-alpha3 Code
+001;World;019;Americas;419;Latin America and the Caribbean;005;South America;Colombia;170;COL
+001;World;019;Americas;419;Latin America and the Caribbean;005;South America;Peru;604;PER
+001;World;142;Asia;034;Southern Asia;;;Nepal;524;NPL
+"""
+
+
+@pytest.fixture()
+def results() -> dict:
+    return json.loads(
+        Path("tests/test_output_result/result_antioquia.json").read_text()
+    )
+
+
+@pytest.fixture()
+def regions(tmp_path) -> pd.DataFrame:
+    path = tmp_path / "unsd.csv"
+    path.write_text(UNSD_FILE)
+    return read_m49_regions(path)
+
+
+def test_read_m49_regions(regions):
+
+    colombia = regions[regions.m49 == "170"]
+    assert colombia.region.tolist() == ["001", "019", "419", "005"]
+    assert colombia.level.tolist() == [
+        "world",
+        "region",
+        "sub-region",
+        "intermediate region",
+    ]
+
+    # Nepal has no intermediate region
+    assert regions[regions.m49 == "524"].region.tolist() == ["001", "142", "034"]
+
+    # By default all the countries of the module are in the World
+    default = read_m49_regions()
+    assert set(default.region) == {WORLD}
+    assert "004" in set(default.m49)
+
+
+def test_roll_up_results(results, regions):
+
+    rolled_up = roll_up_results({170: results, "604": results}, regions)
+
+    # Asia has no results
+    assert list(rolled_up) == ["001", "019", "419", "005"]
+    assert rolled_up["005"] == add_results(results, results)
+
+
+def test_get_roll_up_reports(results, regions, default_transition_matrix):
+
+    reporting_years = cs.get_sub_a_break_points({1: {"year": 2000}})
+    sub_b_year = {
+        "baseline": {"base": {"year": 2000}, "report": {"year": 2015}},
+        2: {"year": 2018},
+    }
+
+    single = get_roll_up_reports(
+        {"170": results},
+        reporting_years,
+        sub_b_year,
+        default_transition_matrix,
+        "FAO",
+        regions,
+    )
+    double = get_roll_up_reports(
+        {"170": results, "604": results},
+        reporting_years,
+        sub_b_year,
+        default_transition_matrix,
+        "FAO",
+        regions,
+    )
+
+    mtn = double["Table1_ER_MTN_TOTL"]
+    assert mtn.GeoAreaName.unique().tolist() == [
+        "World",
+        "Americas",
+        "Latin America and the Caribbean",
+        "South America",
+    ]
+
+    # The areas are added up and the percentages are computed from them, so they
+    # don't change when the same country is counted twice (up to the rounding)
+    def values(tables, table, region):
+        df = tables[table]
+        return pd.to_numeric(df[df.REF_AREA == region].OBS_VALUE, errors="coerce")
+
+    for region in [1, 5]:
+        assert values(double, "Table1_ER_MTN_TOTL", region).values == pytest.approx(
+            2 * values(single, "Table1_ER_MTN_TOTL", region).values,
+            abs=1e-3,
+            nan_ok=True,
+        )
+        for table in ["Table3_ER_MTN_GRNCVI", "Table5_ER_MTN_DGRDP"]:
+            assert values(double, table, region).values == pytest.approx(
+                values(single, table, region).values, abs=1e-3, nan_ok=True
+            )
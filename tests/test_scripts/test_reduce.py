@@ -8,7 +8,12 @@ sys.path.append(str(Path(".").resolve()))
 
 import pytest
 from pathlib import Path
-from component.scripts.gee import no_remap, reduce_by_regions, reduce_by_region
+from component.scripts.gee import (
+    no_remap,
+    reduce_by_regions,
+    reduce_by_region,
+    reduce_fused_by_regions,
+)
 from component.scripts.gee_parse_reduce_regions import reduceGroups
 
 from tests.utils import compare_nested_dicts
@@ -112,6 +117,45 @@ def test_reduce_by_regions(test_land_cover, test_aoi, test_biobelt):
     assert compare_nested_dicts(result_regions, expected_result)
 
 
+def test_reduce_fused_by_regions(test_land_cover, test_aoi, test_biobelt):
+    """Test that the fused reduction returns the same results as reducing each band
+    separately"""
+
+    image_area = ee.Image.pixelArea()
+    biobelt = test_biobelt
+    aoi = test_aoi
+    scale = 1000
+
+    # Bands with different classes and masks
+    image = ee.Image.cat(
+        [
+            test_land_cover.first(),
+            no_remap(test_land_cover.first(), {0: 0, 12: 1, 15: 1}),
+        ]
+    )
+    names = ["raw", "remapped"]
+
+    result_fused = reduce_fused_by_regions(
+        image_area=image_area,
+        biobelt=biobelt,
+        image=image,
+        aoi=aoi,
+        scale=scale,
+        names=names,
+    ).getInfo()
+
+    for i, name in enumerate(names):
+        result_regions = reduce_by_regions(
+            image_area=image_area,
+            biobelt=biobelt,
+            image=image.select([i]),
+            aoi=aoi,
+            scale=scale,
+        ).getInfo()
+
+        assert compare_nested_dicts(result_fused[name], result_regions)
+
+
 def test_reduce_groups(test_multipolygon_aoi):
     """Test reduce groups parsing method.
 
@@ -0,0 +1,101 @@
+"""Test scripts in scripts/reduce_cache.py"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+import pytest
+
+from component.scripts.reduce_cache import ReduceCache, get_cache_key, main
+
+YEARS = [{"asset": "lc/2000", "year": 2000}]
+
+
+@pytest.fixture()
+def inputs(tmp_path) -> dict:
+    transition_matrix = tmp_path / "transition_matrix.csv"
+    transition_matrix.write_text("from_code,to_code,impact_code\n1,2,-1\n")
+
+    return dict(
+        aoi='{"type": "FeatureCollection"}',
+        years=YEARS,
+        matrix={1: 2, 3: 4},
+        transition_matrix=transition_matrix,
+        dem="USGS/SRTMGL1_003",
+        rsa=False,
+        scale=None,
+    )
+
+
+def test_get_cache_key(inputs):
+
+    key = get_cache_key(**inputs)
+    assert key == get_cache_key(**{**inputs, "matrix": {3: 4, 1: 2}})
+
+    for name, value in [
+        ("aoi", '{"type": "Feature"}'),
+        ("years", [{"asset": "lc/2000_v2", "year": 2000}]),
+        ("matrix", {1: 3, 3: 4}),
+        ("dem", "other/dem"),
+        ("rsa", True),
+        ("scale", 100),
+    ]:
+        assert get_cache_key(**{**inputs, name: value}) != key
+
+    assert get_cache_key(**inputs, shared_years=YEARS) != key
+
+    # The content of the transition matrix is hashed, not its path
+    inputs["transition_matrix"].write_text("from_code,to_code,impact_code\n1,2,1\n")
+    assert get_cache_key(**inputs) != key
+
+
+def test_reduce_cache(tmp_path):
+
+    now = [0]
+    path = tmp_path / "cache.sqlite"
+    cache = ReduceCache(path, max_size=100, clock=lambda: now[0])
+    result = {"sub_a": [{"biobelt": 1, "groups": [{"lc": 1, "sum": 1.5}]}]}
+
+    assert cache.get("result") is None
+
+    cache.set("result", result, "2000")
+    assert cache.get("result") == result
+
+    # The cache is persistent
+    assert ReduceCache(path, clock=lambda: now[0]).get("result") == result
+    cache.invalidate()
+
+    # The least recently used results are evicted when the cache is too large,
+    # each of them takes 33 bytes
+    for i, key in enumerate("abc"):
+        now[0] = i
+        cache.set(key, {"value": key * 20}, "2015")
+
+    now[0] = 3
+    cache.get("a")
+    now[0] = 4
+    cache.set("d", {"value": "d" * 20}, "2018")
+
+    assert [cache.get(key) is not None for key in "abcd"] == [True, False, True, True]
+    assert cache.stats() == {"results": 3, "size": 99}
+
+    assert cache.invalidate(process_id="2015") == 2
+    assert cache.invalidate(key="d") == 1
+    assert cache.stats() == {"results": 0, "size": 0}
+
+
+def test_main(tmp_path, capsys):
+
+    path = tmp_path / "cache.sqlite"
+    cache = ReduceCache(path)
+    for key in "abc":
+        cache.set(key, {}, "2000" if key == "a" else "2015")
+
+    assert main(["--cache", str(path), "--stats"])["results"] == 3
+    assert main(["--cache", str(path), "--process-id", "2015"]) == {"removed": 2}
+    assert main(["--cache", str(path), "--all"]) == {"removed": 1}
+    assert "1 results removed" in capsys.readouterr().out
+
+    with pytest.raises(SystemExit):
+        main(["--cache", str(path)])
@@ -0,0 +1,39 @@
+"""Test scripts in scripts/report_scripts.py"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+import numpy as np
+import pandas as pd
+
+from component.scripts import report_scripts as rs
+
+
+def test_annotate_report():
+    """The vectorized annotation gives the same output as the row-wise functions"""
+
+    report_df = pd.DataFrame(
+        {
+            "belt_class": [1, 2, 3, 4, "Total", 2, 3],
+            "lc_class": [1, 5, 10, "MGCI", "Green Cover", 99, 3],
+            "OBS_VALUE": [12.5, 0, np.nan, 3.1234, 100.0, 1.0, 0.0],
+            "OBS_VALUE_RSA": [12.5, 0, np.nan, 3.1234, 100.0, 1.0, 0.0],
+        }
+    )
+
+    expected = report_df.copy()
+    expected["BIOCLIMATIC_BELT"] = expected.apply(rs.get_belt_desc, axis=1)
+    expected["LAND_COVER"] = expected.apply(rs.get_lc_desc, axis=1)
+    expected = expected.astype(object)
+    expected.fillna("NA", inplace=True)
+    expected.replace(0, "NA", inplace=True)
+    expected["NATURE"] = expected.apply(rs.get_nature, axis=1)
+    expected["OBS_STATUS"] = expected.apply(rs.get_obs_status, axis=1)
+
+    result = rs.annotate_report(report_df.copy(), land_cover=True)
+
+    assert result[expected.columns].equals(expected)
+    assert result.NATURE.tolist() == ["C", "N", "N", "C", "C", "C", "N"]
+    assert result.OBS_STATUS.tolist() == ["A", "M", "M", "A", "A", "A", "M"]
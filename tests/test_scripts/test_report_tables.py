@@ -0,0 +1,116 @@
+"""Test scripts in scripts/report_tables.py"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import component.scripts as cs
+from component.scripts.excel_export import write_excel_sheets
+from component.scripts.report_tables import (
+    REPORT_TABLES,
+    TABLE_SCHEMAS,
+    from_schema,
+    read_report_tables,
+    tables_to_excel,
+    to_schema,
+    write_report_tables,
+)
+from component.scripts.scripts import get_sub_b_data_reports
+
+
+@pytest.fixture()
+def report_tables(default_transition_matrix) -> dict:
+    """The five report tables of the antioquia results"""
+
+    results = json.loads(
+        Path("tests/test_output_result/result_antioquia.json").read_text()
+    )
+    reporting_years = cs.get_sub_a_break_points({1: {"year": 2000}})
+    sub_b_year = {
+        "baseline": {"base": {"year": 2000}, "report": {"year": 2015}},
+        2: {"year": 2018},
+    }
+    details = dict(geo_area_name="Antioquia", ref_area="170", source_detail="FAO")
+
+    mtn_df, grnvi_df, grncov_df = cs.get_sub_a_batch_reports(
+        results, reporting_years, **details
+    )
+    sub_b_reports = get_sub_b_data_reports(
+        results, sub_b_year, default_transition_matrix, **details
+    )
+
+    return dict(
+        zip(
+            REPORT_TABLES,
+            [
+                mtn_df,
+                grncov_df,
+                grnvi_df,
+                pd.concat([report[1] for report in sub_b_reports]),
+                pd.concat([report[0] for report in sub_b_reports]),
+            ],
+        )
+    )
+
+
+def test_schema(report_tables):
+
+    for table, df in report_tables.items():
+        typed_df = to_schema(df, table)
+        assert typed_df.dtypes.astype(str).to_dict() == TABLE_SCHEMAS[table]
+
+        # The report table is recovered from the typed table
+        assert from_schema(typed_df, table).equals(df.reset_index(drop=True))
+
+    with pytest.raises(ValueError, match="missing the columns"):
+        to_schema(
+            report_tables["Table1_ER_MTN_TOTL"].drop(columns="OBS_VALUE"),
+            "Table1_ER_MTN_TOTL",
+        )
+
+    # The values that are not numbers are not silently stored as nulls
+    df = report_tables["Table5_ER_MTN_DGRDP"].reset_index(drop=True)
+    df.loc[0, "OBS_VALUE"] = "12,5"
+    with pytest.raises(ValueError, match=r"OBS_VALUE column .* \['12,5'\]"):
+        to_schema(df, "Table5_ER_MTN_DGRDP")
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet", "feather"])
+def test_tables_to_excel(tmp_path, report_tables, file_format):
+
+    if file_format != "csv":
+        pytest.importorskip("pyarrow")
+
+    paths = write_report_tables(report_tables, tmp_path, "report", file_format)
+    assert [Path(path).name for path in paths] == [
+        f"report_{table}.{file_format}" for table in REPORT_TABLES
+    ]
+
+    tables = read_report_tables(paths[::-1])
+    assert list(tables) == REPORT_TABLES
+    for table, df in tables.items():
+        assert df.equals(to_schema(report_tables[table], table))
+
+    # The workbook rendered from the files is the same as the one written directly
+    expected = openpyxl.load_workbook(
+        write_excel_sheets(tmp_path / "expected.xlsx", report_tables)
+    )
+    output = openpyxl.load_workbook(tables_to_excel(paths, tmp_path / "output.xlsx"))
+
+    assert output.sheetnames == expected.sheetnames
+    for sheet_name in expected.sheetnames:
+        expected_values = list(expected[sheet_name].values)
+        output_values = list(output[sheet_name].values)
+        assert output_values == expected_values
+        assert [type(v) for row in output_values for v in row] == [
+            type(v) for row in expected_values for v in row
+        ]
+
+    with pytest.raises(ValueError, match="Unknown table format"):
+        write_report_tables(report_tables, tmp_path, "report", "xls")
@@ -0,0 +1,88 @@
+"""Test scripts in scripts/result_algebra.py"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+from component.scripts.result_algebra import (
+    add_results,
+    merge_results,
+    subtract_results,
+)
+
+
+def test_add_results():
+
+    first = {
+        "2000": {
+            "sub_a": [
+                {"biobelt": 2, "groups": [{"lc": 1, "sum": 1.5}, {"lc": 3, "sum": 2.0}]}
+            ]
+        },
+        "2000_2015_2018": {"baseline_degradation": [], "report_transition": []},
+    }
+    second = {
+        "2000": {
+            "sub_a": [
+                {"biobelt": 2, "groups": [{"lc": 3, "sum": 1.0}]},
+                {"biobelt": 4, "groups": [{"lc": 1, "sum": 0.5}]},
+            ]
+        },
+        "2000_2015_2018": {
+            "baseline_degradation": [{"biobelt": 2, "groups": [{"lc": 1, "sum": 3.0}]}],
+            "report_transition": [],
+        },
+    }
+
+    assert add_results(first, second) == {
+        "2000": {
+            "sub_a": [
+                {
+                    "biobelt": 2,
+                    "groups": [{"lc": 1, "sum": 1.5}, {"lc": 3, "sum": 3.0}],
+                },
+                {"biobelt": 4, "groups": [{"lc": 1, "sum": 0.5}]},
+            ]
+        },
+        "2000_2015_2018": {
+            "baseline_degradation": [{"biobelt": 2, "groups": [{"lc": 1, "sum": 3.0}]}],
+            "report_transition": [],
+        },
+    }
+
+    # A single result is not changed
+    assert add_results(second) == second
+
+
+def test_subtract_results():
+
+    whole = {
+        "2000": {
+            "sub_a": [
+                {"biobelt": 2, "groups": [{"lc": 1, "sum": 4.0}, {"lc": 3, "sum": 2.0}]}
+            ]
+        }
+    }
+    part = {"2000": {"sub_a": [{"biobelt": 2, "groups": [{"lc": 1, "sum": 1.5}]}]}}
+
+    assert subtract_results(whole, part) == {
+        "2000": {
+            "sub_a": [
+                {"biobelt": 2, "groups": [{"lc": 1, "sum": 2.5}, {"lc": 3, "sum": 2.0}]}
+            ]
+        }
+    }
+
+    # The subtraction reverts the addition
+    assert subtract_results(add_results(whole, part), part) == whole
+
+
+def test_merge_results():
+
+    first = {"2000": {"sub_a": []}, "2015": {"sub_a": []}}
+    second = {"2015": {"sub_a": [{"biobelt": 2, "groups": [{"lc": 1, "sum": 1.0}]}]}}
+
+    merged = merge_results(first, second)
+    assert list(merged) == ["2000", "2015"]
+    assert merged["2015"] == second["2015"]
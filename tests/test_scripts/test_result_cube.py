@@ -0,0 +1,73 @@
+"""Test scripts in scripts/result_cube.py"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+import numpy as np
+import pytest
+
+import component.scripts as cs
+from component.scripts import mountain_area as mntn
+from component.scripts import sub_a
+from component.scripts.result_cube import SubACube, SubBCube
+from component.types import ResultsDict
+
+antioquia_default_result: ResultsDict = json.loads(
+    Path("tests/test_output_result/result_antioquia.json").read_text()
+)
+
+
+def test_sub_a_cube_from_results():
+
+    cube = SubACube.from_results(antioquia_default_result)
+
+    # All the default belts and classes are in the cube axes
+    assert cube.years.tolist() == [2000]
+    assert cube.belts.tolist() == [1, 2, 3, 4]
+    assert cube.values.shape == (1, 4, 10)
+
+    parsed_df = cs.parse_result(antioquia_default_result["2000"]["sub_a"], single=True)
+    assert cube.values.sum() == pytest.approx(parsed_df["sum"].sum())
+
+    cube_df = cube.to_dataframe(2000)
+    assert len(cube_df) == len(parsed_df)
+    assert cube_df["sum"].sum() == pytest.approx(parsed_df["sum"].sum())
+
+
+def test_sub_a_cube_tables():
+    """Tables are the same when computed from a cube or from a parsed dataframe"""
+
+    reporting_years_sub_a = cs.get_sub_a_break_points({1: {"year": 2000}})
+    parsed_df = cs.parse_to_year_a(
+        antioquia_default_result, reporting_years_sub_a, 2000
+    )
+    cube = SubACube.from_dataframe(parsed_df, 2000)
+
+    assert np.allclose(
+        mntn.get_mountain_area(cube)["sum"].astype(float),
+        mntn.get_mountain_area(parsed_df)["sum"].astype(float),
+    )
+    assert sub_a.get_mgci(cube).equals(sub_a.get_mgci(parsed_df))
+
+
+def test_sub_b_cube_from_results():
+
+    cube = SubBCube.from_results(antioquia_default_result)
+
+    assert cube.years == ["2000_2015_2018", "2000_2015_2021"]
+    assert cube.categories[:2] == ["baseline_degradation", "final_degradation"]
+
+    parsed_df = cs.parse_sub_b_year(
+        antioquia_default_result, {"baseline": [2000, 2015]}
+    )
+    cube_df = cube.to_dataframe("baseline_transition", "2000_2015_2018")
+
+    assert len(cube_df) == len(parsed_df)
+    assert sorted(cube_df.transition) == sorted(parsed_df.transition)
+    assert cube_df["sum"].sum() == pytest.approx(parsed_df["sum"].sum())
+
+    # From and to land cover classes are decoded from the transition code
+    assert (cube_df.from_lc * 100 + cube_df.to_lc).equals(cube_df.transition)
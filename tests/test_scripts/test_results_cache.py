@@ -0,0 +1,120 @@
+"""Test scripts in scripts/results_cache.py"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+import pytest
+
+import component.scripts as cs
+from component.scripts import results_cache
+from component.scripts.results_cache import ResultsCache
+from component.types import ResultsDict
+
+
+@pytest.fixture()
+def results() -> ResultsDict:
+    """Antioquia results with a second computed year"""
+
+    results = json.loads(
+        Path("tests/test_output_result/result_antioquia.json").read_text()
+    )
+    results["2010"] = json.loads(json.dumps(results["2000"]))
+    for belt in results["2010"]["sub_a"]:
+        for group in belt["groups"]:
+            group["sum"] *= 1.5
+
+    return results
+
+
+def test_sub_a_years(results):
+
+    reporting_years = cs.get_sub_a_break_points({1: {"year": 2000}, 2: {"year": 2010}})
+    cache = ResultsCache(results)
+
+    parsed_dfs = cache.sub_a_years(reporting_years)
+    expected_dfs = cs.parse_sub_a_years(results, reporting_years)
+
+    assert list(parsed_dfs) == list(expected_dfs)
+    for year, expected in expected_dfs.items():
+        assert parsed_dfs[year].equals(expected)
+
+    # The dashboard gets the same dataframe as the direct parsing
+    assert cache.sub_a_year(reporting_years, 2005).equals(
+        cs.parse_to_year_a(results, reporting_years, 2005)
+    )
+
+    # Already parsed years are not parsed again
+    assert cache.sub_a_year(reporting_years, 2005) is parsed_dfs[2005]
+    assert cache.sub_a_years(reporting_years)[2010] is parsed_dfs[2010]
+
+    # Other methods are cached separately
+    nearest = cache.sub_a_year(reporting_years, 2005, "nearest")
+    assert nearest is not parsed_dfs[2005]
+    assert not nearest.equals(parsed_dfs[2005])
+
+
+def test_sub_b_year(results, monkeypatch):
+
+    calls = []
+
+    def parse_result(*args, **kwargs):
+        calls.append(args)
+        return cs.parse_result(*args, **kwargs)
+
+    monkeypatch.setattr(results_cache, "parse_result", parse_result)
+    cache = ResultsCache(results)
+
+    for target_year in [
+        {"baseline": [2000, 2015]},
+        {"report": [2015, 2018]},
+        {"report": [2015, 2021]},
+    ]:
+        expected = cs.parse_sub_b_year(results, target_year)
+        assert cache.sub_b_year(target_year).equals(expected)
+        assert cache.sub_b_year(target_year) is cache.sub_b_year(target_year)
+
+    # The baseline and the first report share the same results key
+    assert len(calls) == 2
+
+    assert cache.sub_b_year({"report": [2015, 2030]}) is None
+
+
+def test_reset(results):
+
+    reporting_years = cs.get_sub_a_break_points({1: {"year": 2000}})
+    cache = ResultsCache(results)
+    parsed_df = cache.sub_a_year(reporting_years, 2000)
+
+    # Cached elements are dropped when new results are set
+    new_results = {"2000": results["2010"]}
+    cache.reset(new_results)
+
+    assert cache.results is new_results
+    assert cache.sub_a_year(reporting_years, 2000).equals(
+        cs.parse_result(new_results["2000"]["sub_a"], single=True)
+    )
+    assert not cache.sub_a_year(reporting_years, 2000).equals(parsed_df)
+
+
+def test_in_place_update(results):
+
+    reporting_years = cs.get_sub_a_break_points({1: {"year": 2000}})
+    cache = ResultsCache(results)
+    parsed_df = cache.sub_a_year(reporting_years, 2000)
+    sub_b_df = cache.sub_b_year({"baseline": [2000, 2015]})
+
+    # The cache is still valid while the results don't change
+    assert cache.sub_a_year(reporting_years, 2000) is parsed_df
+
+    # The parsed elements are dropped when the results are updated in place
+    results["2000"] = results["2010"]
+    results.pop("2000_2015_2018")
+
+    assert cache.sub_a_year(reporting_years, 2000).equals(
+        cs.parse_result(results["2010"]["sub_a"], single=True)
+    )
+    assert not cache.sub_a_year(reporting_years, 2000).equals(parsed_df)
+    assert not cache.sub_b_year({"baseline": [2000, 2015]}).equals(sub_b_df)
@@ -0,0 +1,67 @@
+"""Test scripts in scripts/retry.py"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+import pytest
+
+from component.scripts.retry import RetryPolicy, run_with_retries
+
+
+def test_retry_policy():
+
+    attempts = RetryPolicy(
+        tile_scales=[16], partitions=[4, 16], scale_factors=[2]
+    ).attempts()
+
+    assert attempts == [
+        {"tile_scale": 8, "partitions": 1, "scale_factor": 1},
+        {"tile_scale": 16, "partitions": 1, "scale_factor": 1},
+        {"tile_scale": 16, "partitions": 4, "scale_factor": 1},
+        {"tile_scale": 16, "partitions": 16, "scale_factor": 1},
+        {"tile_scale": 16, "partitions": 16, "scale_factor": 2},
+    ]
+
+    # The coarser scale is not tried by default
+    assert all(a["scale_factor"] == 1 for a in RetryPolicy().attempts())
+    assert len(RetryPolicy((), (), ()).attempts()) == 1
+
+
+def test_run_with_retries():
+
+    attempts = RetryPolicy(tile_scales=[16], partitions=[4]).attempts()
+    errors = [
+        Exception("Computation timed out."),
+        Exception("User memory limit exceeded."),
+    ]
+    calls, logs = [], []
+
+    def compute(attempt):
+        calls.append(attempt)
+        if errors:
+            raise errors.pop(0)
+        return "result"
+
+    assert run_with_retries(compute, attempts, logs.append) == "result"
+    assert calls == attempts
+    assert len(logs) == 3
+    assert "retrying" in logs[0] and "partitions=4" in logs[2]
+
+    # The other errors are not retried
+    def fail(attempt):
+        calls.append(attempt)
+        raise ValueError("Invalid asset")
+
+    calls.clear()
+    with pytest.raises(ValueError):
+        run_with_retries(fail, attempts)
+    assert len(calls) == 1
+
+    # The error of the last attempt is raised
+    def time_out(attempt):
+        raise Exception("Computation timed out.")
+
+    with pytest.raises(Exception, match="timed out"):
+        run_with_retries(time_out, attempts)
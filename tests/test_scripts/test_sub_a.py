@@ -0,0 +1,107 @@
+"""Test scripts in scripts/sub_a.py"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+import numpy as np
+import pandas as pd
+
+import component.scripts as cs
+from component.scripts import sub_a
+from component.scripts.scripts import get_sub_a_data_reports
+from component.types import ResultsDict
+
+antioquia_default_result: ResultsDict = json.loads(
+    Path("tests/test_output_result/result_antioquia.json").read_text()
+)
+
+
+def test_get_green_mask(tmp_path):
+
+    # Default definition comes from the lc_map_matrix
+    classes = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 99])
+    expected = (
+        sub_a.LC_MAP_MATRIX.drop_duplicates("to_code")
+        .set_index("to_code")["green"]
+        .reindex(classes, fill_value=0)
+        .to_numpy()
+        == 1
+    )
+    assert sub_a.get_green_mask(classes).tolist() == expected.tolist()
+
+    # Custom definition, classes missing from the file are non green
+    green_file = tmp_path / "green_non_green.csv"
+    pd.DataFrame({"lc_class": [1, 2, 3], "green": [0, 1, 1]}).to_csv(green_file)
+
+    mask = sub_a.get_green_mask(np.array([1, 2, 3, 4]), green_file)
+    assert mask.tolist() == [False, True, True, False]
+
+
+def test_get_mgci_by_year():
+
+    reporting_years_sub_a = cs.get_sub_a_break_points({1: {"year": 2000}})
+    parsed_df = cs.parse_to_year_a(
+        antioquia_default_result, reporting_years_sub_a, 2000
+    )
+
+    # Build a second year where the first land cover class doubles its area
+    parsed_dfs = {
+        2000: parsed_df,
+        2001: parsed_df.assign(
+            sum=np.where(
+                parsed_df.lc_class == 1, parsed_df["sum"] * 2, parsed_df["sum"]
+            )
+        ),
+    }
+    stacked_df = pd.concat([df.assign(year=year) for year, df in parsed_dfs.items()])
+
+    mgci_df = sub_a.get_mgci_by_year(stacked_df)
+
+    # All the belts and the total are computed for every year
+    assert mgci_df.year.tolist() == [2000] * 5 + [2001] * 5
+
+    # And they are the same as the ones computed year by year
+    for year, df in parsed_dfs.items():
+        expected = sub_a.get_mgci(df)
+        expected = expected[expected.lc_class == "MGCI"]["mgci"]
+        result = mgci_df[mgci_df.year == year]["mgci"].round(4)
+        assert np.array_equal(result, expected, equal_nan=True)
+
+
+def test_get_sub_a_batch_reports():
+
+    # Create a second year with different areas to have an interpolated year
+    results = json.loads(json.dumps(antioquia_default_result))
+    results["2010"] = json.loads(json.dumps(results["2000"]))
+    for belt in results["2010"]["sub_a"]:
+        for group in belt["groups"]:
+            group["sum"] *= 1 + group["lc"] / 10
+
+    reporting_years_sub_a = cs.get_sub_a_break_points(
+        {1: {"year": 2000}, 2: {"year": 2010}}
+    )
+    details = {"geo_area_name": "", "ref_area": "", "source_detail": ""}
+
+    mtn_report, mgci_report, land_type_report = cs.get_sub_a_batch_reports(
+        results, reporting_years_sub_a, **details
+    )
+    sub_a_reports, mtn_reports = get_sub_a_data_reports(
+        results, reporting_years_sub_a, **details
+    )
+
+    # The batch reports are the same as the ones computed year by year
+    n_years = len(reporting_years_sub_a)
+    assert n_years > 2
+    assert len(land_type_report) == 55 * n_years
+
+    expected = pd.concat(mtn_reports, ignore_index=True)
+    assert mtn_report.equals(expected)
+
+    expected = pd.concat([report[0] for report in sub_a_reports], ignore_index=True)
+    assert mgci_report.equals(expected)
+
+    expected = pd.concat([report[1] for report in sub_a_reports], ignore_index=True)
+    assert land_type_report.equals(expected)
@@ -206,6 +206,39 @@ def test_get_degraded_area(default_transition_matrix):
     assert degraded.equals(pd.DataFrame(expected_result))
 
 
+def test_get_degraded_area_belt_order(default_transition_matrix):
+
+    # The rows are sorted by belt code, not in the order of the results
+    reversed_result = json.loads(json.dumps(antioquia_default_result))
+    for process in reversed_result.values():
+        for belts in process.values():
+            belts.reverse()
+
+    degraded = sub_b.get_degraded_area(
+        cs.parse_sub_b_year(reversed_result, baseline_years),
+        transition_matrix=default_transition_matrix,
+    )
+    expected = sub_b.get_degraded_area(
+        cs.parse_sub_b_year(antioquia_default_result, baseline_years),
+        transition_matrix=default_transition_matrix,
+    )
+
+    assert degraded.belt_class.tolist() == [1, 2, 3, 4]
+    pd.testing.assert_frame_equal(degraded, expected)
+
+
+def test_get_degraded_area_undefined(tmp_path, default_transition_matrix):
+
+    # The transitions that occur must be defined in the matrix
+    table = pd.read_csv(default_transition_matrix)
+    file_ = tmp_path / "transition_matrix.csv"
+    table[table.from_code != 1].to_csv(file_, index=False)
+
+    parsed_df = cs.parse_sub_b_year(antioquia_default_result, baseline_years)
+    with pytest.raises(ValueError, match="Missing from_code: \\[1\\]"):
+        sub_b.get_degraded_area(parsed_df, transition_matrix=file_)
+
+
 def get_pdma_area(default_transition_matrix):
 
     years = report_years
@@ -0,0 +1,202 @@
+"""Test scripts in scripts/task_csv.py"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+import pytest
+
+from component.scripts.scripts import read_from_csv
+from component.scripts.task_csv import (
+    features_to_results,
+    flat_to_columns,
+    flat_to_results,
+    iter_groups,
+    read_task_results_by_id,
+)
+
+task_csv = """system:index,process_id,sub_a,baseline_degradation,final_degradation,baseline_transition,report_transition,.geo
+0,2000,"[{biobelt=2, groups=[{lc=3, sum=0.75}, {lc=4, sum=1.4158790898437498E1}]}, {biobelt=3, groups=[{lc=1, sum=5.1E-2}]}]",,,,,
+1,2000_2015_2018,,"[{biobelt=4, groups=[{lc=1, sum=3.0}, {lc=2, sum=69.2}]}]","[{biobelt=4, groups=[{lc=2, sum=72.2}]}]","[{biobelt=4, groups=[{lc=101, sum=1.5}, {lc=405, sum=2.5}]}]",[],
+"""
+
+
+regions_csv = """system:index,ISO3,process_id,sub_a
+0_0,COL,2000,"[{biobelt=2, groups=[{lc=3, sum=0.75}]}]"
+0_1,ECU,2000,"[{biobelt=2, groups=[{lc=3, sum=2.0}, {lc=4, sum=1.0}]}]"
+0_2,COL,2000,"[{biobelt=2, groups=[{lc=3, sum=0.25}]}, {biobelt=3, groups=[{lc=1, sum=5.0}]}]"
+1_0,COL,2015,[]
+"""
+
+
+@pytest.fixture()
+def task_file(tmp_path) -> Path:
+    file_ = tmp_path / "Task_test.csv"
+    file_.write_text(task_csv)
+    return file_
+
+
+def test_iter_groups():
+
+    text = "[{groups=[{sum=1.5E2, lc=10}], biobelt=1}, {biobelt=2, groups=[]}]"
+    assert list(iter_groups(text)) == [(1, 10, 150.0)]
+    assert list(iter_groups(text, empty_belts=True))[1] == (2, None, None)
+
+    with pytest.raises(ValueError):
+        list(iter_groups("[{biobelt=1, groups=[{lc=2, sum=3}]"))
+
+
+def test_read_from_csv(task_file):
+
+    results = read_from_csv(task_file)
+
+    assert results["2000"] == {
+        "sub_a": [
+            {
+                "biobelt": 2,
+                "groups": [
+                    {"lc": 3, "sum": 0.75},
+                    {"lc": 4, "sum": 14.158790898437498},
+                ],
+            },
+            {"biobelt": 3, "groups": [{"lc": 1, "sum": 0.051}]},
+        ]
+    }
+    assert results["2000_2015_2018"]["baseline_transition"] == [
+        {"biobelt": 4, "groups": [{"lc": 101, "sum": 1.5}, {"lc": 405, "sum": 2.5}]}
+    ]
+    assert results["2000_2015_2018"]["report_transition"] == []
+
+
+def test_read_from_csv_empty_belts(tmp_path):
+
+    file_ = tmp_path / "Task_empty.csv"
+    file_.write_text(
+        "process_id,sub_a\n"
+        '2000,"[{biobelt=2, groups=[]}, {biobelt=3, groups=[{lc=1, sum=5.0}]}]"\n'
+    )
+
+    # The biobelts without groups are kept, as with the previous parser
+    assert read_from_csv(file_)["2000"]["sub_a"] == [
+        {"biobelt": 2, "groups": []},
+        {"biobelt": 3, "groups": [{"lc": 1, "sum": 5.0}]},
+    ]
+    assert read_from_csv(file_, columnar=True)["biobelt"].tolist() == [3]
+
+
+def test_read_from_csv_columnar(task_file):
+
+    columns = read_from_csv(task_file, columnar=True)
+
+    assert columns["process_id"].tolist() == ["2000"] * 3 + ["2000_2015_2018"] * 5
+    assert columns["category"].tolist()[3:] == [
+        "baseline_degradation",
+        "baseline_degradation",
+        "final_degradation",
+        "baseline_transition",
+        "baseline_transition",
+    ]
+    assert columns["biobelt"].tolist() == [2, 2, 3, 4, 4, 4, 4, 4]
+    assert columns["lc"].tolist() == [3, 4, 1, 1, 2, 2, 101, 405]
+    assert columns["sum"].sum() == pytest.approx(0.75 + 14.1587909 + 0.051 + 148.4)
+
+
+def test_read_task_results_by_id(tmp_path):
+
+    file_ = tmp_path / "Task_regions.csv"
+    file_.write_text(regions_csv)
+
+    results = read_task_results_by_id(file_, "ISO3")
+
+    assert list(results) == ["COL", "ECU"]
+
+    # The features of the same AOI are added up
+    assert results["COL"] == {
+        "2000": {
+            "sub_a": [
+                {"biobelt": 2, "groups": [{"lc": 3, "sum": 1.0}]},
+                {"biobelt": 3, "groups": [{"lc": 1, "sum": 5.0}]},
+            ]
+        },
+        "2015": {"sub_a": []},
+    }
+    assert results["ECU"]["2000"]["sub_a"] == [
+        {"biobelt": 2, "groups": [{"lc": 3, "sum": 2.0}, {"lc": 4, "sum": 1.0}]}
+    ]
+
+
+def test_features_to_results():
+
+    collection = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "properties": {
+                    "ISO3": "COL",
+                    "sub_a": [{"biobelt": 2, "groups": [{"lc": 3, "sum": 0.75}]}],
+                }
+            },
+            {
+                "properties": {
+                    "ISO3": "COL",
+                    "sub_a": [{"biobelt": 2, "groups": [{"lc": 3, "sum": 0.25}]}],
+                }
+            },
+            {"properties": {"ISO3": "ECU", "sub_a": []}},
+            {
+                "properties": {
+                    "ISO3": "PER",
+                    "sub_a": [{"biobelt": 2, "groups": []}],
+                }
+            },
+        ],
+    }
+
+    assert features_to_results(collection, "ISO3", "2000") == {
+        "COL": {"2000": {"sub_a": [{"biobelt": 2, "groups": [{"lc": 3, "sum": 1.0}]}]}},
+        "ECU": {"2000": {"sub_a": []}},
+        "PER": {"2000": {"sub_a": [{"biobelt": 2, "groups": []}]}},
+    }
+
+
+def test_flat_results(task_file, tmp_path):
+
+    flat_results = {
+        "2000": {
+            "sub_a": [
+                {"__path__": "2_3", "sum": 0.75},
+                {"__path__": "2_4", "sum": 14.158790898437498},
+                {"__path__": "3_1", "sum": 0.051},
+            ]
+        },
+        "2000_2015_2018": {
+            "baseline_degradation": [
+                {"__path__": "4_1", "sum": 3.0},
+                {"__path__": "4_2", "sum": 69.2},
+            ],
+            "final_degradation": [{"__path__": "4_2", "sum": 72.2}],
+            "baseline_transition": [
+                {"__path__": "4_101", "sum": 1.5},
+                {"__path__": "4_405", "sum": 2.5},
+            ],
+            "report_transition": [],
+        },
+    }
+
+    # Same output as the nested results
+    assert flat_to_results(flat_results) == read_from_csv(task_file)
+
+    columns = flat_to_columns(flat_results)
+    expected = read_from_csv(task_file, columnar=True)
+    for key, values in expected.items():
+        assert columns[key].tolist() == values.tolist()
+
+    # The flat cells of a task file are read as the nested ones
+    flat_file = tmp_path / "Task_flat.csv"
+    flat_file.write_text(
+        "process_id,sub_a\n"
+        '2000,"[{__path__=2_3, sum=0.75}, {sum=1.4158790898437498E1, __path__=2_4}, '
+        '{__path__=3_1, sum=5.1E-2}]"\n'
+    )
+    assert read_from_csv(flat_file) == {"2000": flat_to_results(flat_results)["2000"]}
@@ -0,0 +1,151 @@
+"""Test scripts in scripts/task_ingestion.py against a local stand-in of GDrive"""
+
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(".").resolve()))
+
+import pytest
+
+from component.scripts.task_ingestion import ingest_tasks, read_task_file
+
+
+class FakeDrive:
+    """GDrive stand-in, the results of the completed tasks are in the files dict"""
+
+    def __init__(self, states, files):
+        self.states = states
+        self.files = files
+        self.resolved = []
+        self.downloaded = []
+
+    def get_tasks(self, task_ids):
+        self.resolved.append(list(task_ids))
+        return {
+            id_: SimpleNamespace(id=id_, state=self.states[id_])
+            if id_ in self.states
+            else None
+            for id_ in task_ids
+        }
+
+    def download_files(self, files, max_workers=4):
+        outcomes = {}
+        for name, output_file in files.items():
+            self.downloaded.append(name)
+            if name in self.files:
+                Path(output_file).write_text(self.files[name])
+                outcomes[name] = Path(output_file)
+            else:
+                outcomes[name] = Exception(f"{name} not found")
+        return outcomes
+
+
+def fake_export(task_file, result_file):
+    """Write the report of a task, it fails for the empty ones"""
+
+    content = Path(result_file).read_text()
+    if not content:
+        raise ValueError("empty result")
+
+    report = task_file.report_file
+    report.parent.mkdir(exist_ok=True)
+    report.write_text(f"{task_file.model_state['geo_area_name']}: {content}")
+    return str(report)
+
+
+def write_task_file(folder, name, task_id):
+    data = {
+        "task": {"id": task_id, "name": name},
+        "model_state": {
+            "geo_area_name": name,
+            "report_folder": str(folder / name),
+            "session_id": "_S1",
+        },
+        "local_years": [],
+        "local_results": {},
+    }
+    path = folder / f"{name}.json"
+    path.write_text(json.dumps(data))
+    return path
+
+
+@pytest.mark.parametrize("max_processes", [1, 2])
+def test_ingest_tasks(tmp_path, max_processes):
+
+    states = {
+        "T_done": "COMPLETED",
+        "T_empty": "COMPLETED",
+        "T_lost": "COMPLETED",
+        "T_running": "RUNNING",
+        "T_failed": "FAILED",
+    }
+    for task_id in [*states, "T_unknown"]:
+        write_task_file(tmp_path, task_id[2:], f" {task_id}\n")
+    (tmp_path / "invalid.json").write_text("{}")
+
+    drive = FakeDrive(states, {"done.csv": "results", "empty.csv": ""})
+    messages = []
+    summary = ingest_tasks(
+        tmp_path,
+        drive,
+        max_processes=max_processes,
+        export=fake_export,
+        log=messages.append,
+    )
+
+    # All the states are resolved at once
+    assert len(drive.resolved) == 1
+    assert sorted(drive.downloaded) == ["done.csv", "empty.csv", "lost.csv"]
+
+    assert summary.task.tolist() == sorted(
+        ["done", "empty", "failed", "invalid", "lost", "running", "unknown"]
+    )
+    statuses = dict(zip(summary.task, summary.status))
+    assert statuses == {
+        "done": "done",
+        "empty": "failed",
+        "failed": "failed",
+        "invalid": "failed",
+        "lost": "failed",
+        "running": "pending",
+        "unknown": "failed",
+    }
+
+    details = dict(zip(summary.task, summary.detail))
+    report = Path(details["done"])
+    assert report.read_text() == "done: results"
+    assert report == tmp_path / "done" / "done_S1.xlsx"
+    assert "empty result" in details["empty"]
+    assert "not found" in details["lost"]
+    assert details["running"] == "The task state is RUNNING."
+
+    assert messages[-1] == "1 done, 1 pending, 5 failed"
+
+    # The results that are already downloaded are not downloaded again and the
+    # existing reports are not built again
+    report.write_text("previous")
+    drive.downloaded = []
+    summary = ingest_tasks(
+        tmp_path, drive, max_processes=max_processes, export=fake_export
+    )
+    assert drive.downloaded == ["lost.csv"]
+    assert report.read_text() == "previous"
+    assert dict(zip(summary.task, summary.detail))["done"] == str(report)
+
+    # unless they are forced
+    ingest_tasks(
+        tmp_path, drive, max_processes=max_processes, export=fake_export, force=True
+    )
+    assert report.read_text() == "done: results"
+
+
+def test_read_task_file(tmp_path):
+
+    task_file = read_task_file(write_task_file(tmp_path, "Task_COL", " ID\n"))
+
+    assert task_file.task_id == "ID"
+    assert task_file.result_name == "Task_COL.csv"
+    assert task_file.result_file == tmp_path / "Task_COL" / "Task_COL.csv"
+    assert task_file.report_file == tmp_path / "Task_COL" / "Task_COL_S1.xlsx"
@@ -0,0 +1,144 @@
+"""Test scripts in scripts/task_registry.py against local stand-ins of the ee task
+and Drive apis"""
+
+import re
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(".").resolve()))
+
+import pytest
+
+from component.scripts.task_registry import DriveIndex, TaskRegistry
+
+
+class FakeBatch:
+    """ee.batch stand-in counting the listings of the tasks"""
+
+    def __init__(self, states):
+        self.states = states
+        self.calls = 0
+        self.Task = SimpleNamespace(list=self.list)
+
+    def list(self):
+        self.calls += 1
+        return [SimpleNamespace(id=id_, state=s) for id_, s in self.states.items()]
+
+
+class FakeDrive:
+    """Drive v3 service stand-in, it supports the pagination and the modifiedTime
+    filter of the files listing"""
+
+    def __init__(self, files):
+        self.files_ = files
+        self.requests = []
+
+    def files(self):
+        return self
+
+    def list(self, q, pageSize, pageToken=None, fields=None):
+        self.requests.append(q)
+
+        match = re.search(r"modifiedTime >= '(.*)'", q)
+        files = [f for f in self.files_ if not match or f["modifiedTime"] >= match[1]]
+
+        start = int(pageToken or 0)
+        response = {"files": files[start : start + pageSize]}
+        if start + pageSize < len(files):
+            response["nextPageToken"] = str(start + pageSize)
+
+        return SimpleNamespace(execute=lambda: response)
+
+
+def get_file(i, name=None, time=None):
+    return {
+        "id": f"id_{i}",
+        "name": name or f"task_{i}.csv",
+        "modifiedTime": time or f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}Z",
+        "size": str(i * 100),
+        "md5Checksum": f"md5_{i}",
+    }
+
+
+def test_task_registry():
+
+    batch = FakeBatch({f"T{i}": "RUNNING" for i in range(300)})
+    now = [0]
+    registry = TaskRegistry(batch, max_age=10, clock=lambda: now[0])
+
+    # Many tasks are resolved with a single listing
+    tasks = registry.resolve([f"T{i}" for i in range(300)] + ["unknown "])
+    assert batch.calls == 1
+    assert tasks["T42"].state == "RUNNING"
+    assert tasks["unknown"] is None
+
+    registry.get("T1")
+    assert batch.calls == 1
+
+    # The states are listed again once they are stale
+    batch.states["T1"] = "COMPLETED"
+    now[0] = 11
+    assert registry.get("T1").state == "COMPLETED"
+    assert batch.calls == 2
+
+    # and when a task is not known yet
+    batch.states["T300"] = "READY"
+    assert registry.get("T300 ").state == "READY"
+    assert batch.calls == 3
+
+    with pytest.raises(Exception, match="doesn't exist"):
+        registry.get("T301")
+
+
+def test_drive_index():
+
+    drive = FakeDrive([get_file(i) for i in range(25)])
+    now = [0]
+    index = DriveIndex(drive, page_size=10, max_age=60, clock=lambda: now[0])
+
+    # The first refresh follows the pages
+    ids = index.get_ids(["task_3.csv", "task_24.csv", "missing.csv"])
+    assert ids == {"task_3.csv": "id_3", "task_24.csv": "id_24", "missing.csv": None}
+    assert len(drive.requests) == 3
+
+    # The known files don't need any request, they are listed with their size and
+    # checksum
+    assert index.get_id("task_10.csv") == "id_10"
+    assert index.get_files(["task_5.csv"]) == {"task_5.csv": get_file(5)}
+    assert len(drive.requests) == 3
+
+    # The next refreshes only list the files modified since the last one
+    drive.files_.append(get_file(25))
+    drive.files_.append(get_file(26, name="task_3.csv"))
+    assert index.get_id("task_25.csv") == "id_25"
+    assert len(drive.requests) == 4
+    assert "modifiedTime >= '2024-01-01T00:00:24Z'" in drive.requests[-1]
+
+    # The most recent file of a name is used
+    assert index.get_id("task_3.csv") == "id_26"
+
+    # A renamed file is moved in the index
+    drive.files_.append(get_file(24, name="renamed.csv", time="2024-01-02T00:00:00Z"))
+    assert index.get_id("renamed.csv") == "id_24"
+    assert "task_24.csv" not in index.files
+
+    # A deleted file is forgotten
+    index.forget("id_26")
+    assert index.files["task_3.csv"] == [get_file(3)]
+
+    # Once the index is stale, the whole index is listed again: the files deleted
+    # outside of the index and the new uploads of a known name are seen
+    drive.files_ = [f for f in drive.files_ if f["id"] != "id_10"]
+    drive.files_.append(get_file(27, name="task_11.csv", time="2024-01-03T00:00:00Z"))
+    assert index.get_ids(["task_10.csv", "task_11.csv"]) == {
+        "task_10.csv": "id_10",
+        "task_11.csv": "id_11",
+    }
+
+    now[0] = 61
+    assert index.get_ids(["task_10.csv", "task_11.csv"]) == {
+        "task_10.csv": None,
+        "task_11.csv": "id_27",
+    }
+    assert "modifiedTime" not in drive.requests[-3]
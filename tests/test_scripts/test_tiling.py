@@ -0,0 +1,128 @@
+"""Test scripts in scripts/tiling.py"""
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+import numpy as np
+import pytest
+
+from component.scripts.tiling import get_grid, reduce_tiled, split_bounds
+
+
+def test_get_grid():
+
+    bounds = (-75.0, 5.0, -73.0, 8.0)
+
+    assert get_grid(bounds, 1) == [bounds]
+
+    cells = get_grid(bounds, 3)
+    assert len(cells) == 4
+    assert cells[0] == (-75.0, 5.0, -74.0, 6.5)
+    assert cells[-1] == (-74.0, 6.5, -73.0, 8.0)
+
+    # The cells cover the bounds without overlapping
+    area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in cells)
+    assert area == pytest.approx(2.0 * 3.0)
+
+
+def test_split_bounds():
+
+    quadrants = split_bounds((0.0, 0.0, 2.0, 4.0))
+    assert quadrants == [
+        (0.0, 0.0, 1.0, 2.0),
+        (1.0, 0.0, 2.0, 2.0),
+        (0.0, 2.0, 1.0, 4.0),
+        (1.0, 2.0, 2.0, 4.0),
+    ]
+
+
+class FakeRaster:
+    """Stand-in for the EE reduction of a tile: sums the area of the pixels whose
+    center is in the cell, by biobelt and land cover class. It times out when the
+    cell has more than max_pixels pixels."""
+
+    def __init__(self, size=16, max_pixels=40, seed=0):
+        rng = np.random.default_rng(seed)
+        self.belts = rng.integers(1, 5, (size, size))
+        self.classes = rng.integers(1, 11, (size, size))
+        self.areas = rng.random((size, size))
+        self.centers = np.arange(size) + 0.5
+        self.max_pixels = max_pixels
+        self.calls = 0
+
+    def reduce(self, cell=None):
+
+        self.calls += 1
+        xmin, ymin, xmax, ymax = cell or (-np.inf, -np.inf, np.inf, np.inf)
+
+        # Half-open intervals, so a pixel belongs to a single cell
+        xs = (self.centers >= xmin) & (self.centers < xmax)
+        ys = (self.centers >= ymin) & (self.centers < ymax)
+        mask = ys[:, None] & xs[None, :]
+
+        if cell and mask.sum() > self.max_pixels:
+            raise Exception("Computation timed out.")
+
+        sub_a = []
+        for belt in np.unique(self.belts[mask]):
+            belt_mask = mask & (self.belts == belt)
+            groups = [
+                {
+                    "lc": int(lc),
+                    "sum": float(self.areas[belt_mask & (self.classes == lc)].sum()),
+                }
+                for lc in np.unique(self.classes[belt_mask])
+            ]
+            sub_a.append({"biobelt": int(belt), "groups": groups})
+
+        return {"2000": {"sub_a": sub_a}}
+
+
+def to_areas(results):
+    """Return {(belt, lc): sum} of the Sub-A results"""
+
+    return {
+        (item["biobelt"], group["lc"]): group["sum"]
+        for item in results["2000"]["sub_a"]
+        for group in item["groups"]
+    }
+
+
+def test_reduce_tiled():
+
+    raster = FakeRaster()
+    expected = to_areas(raster.reduce())
+
+    messages = []
+    results = reduce_tiled(
+        raster.reduce, (0.0, 0.0, 16.0, 16.0), parts=4, log=messages.append
+    )
+
+    # The 64 pixels tiles time out and are split into 16 pixels quadrants
+    assert len(messages) == 4
+    assert raster.calls == 1 + 4 + 16
+
+    areas = to_areas(results)
+    assert areas.keys() == expected.keys()
+    for key, value in expected.items():
+        assert areas[key] == pytest.approx(value)
+
+    # The cells outside the AOI are not computed
+    raster.calls = 0
+    reduce_tiled(
+        raster.reduce,
+        (0.0, 0.0, 16.0, 16.0),
+        parts=16,
+        keep_cells=lambda cells: [c for c in cells if c[0] < 8],
+    )
+    assert raster.calls == 8
+
+    # The tiles still timing out at max_depth are not split further
+    with pytest.raises(Exception, match="timed out"):
+        reduce_tiled(FakeRaster(max_pixels=2).reduce, (0.0, 0.0, 16.0, 16.0), 4, 1)
+
+    # An AOI without any tile is not reported as an empty result
+    with pytest.raises(ValueError, match="None of the 4 tiles"):
+        reduce_tiled(raster.reduce, (0.0, 0.0, 16.0, 16.0), keep_cells=lambda c: [])
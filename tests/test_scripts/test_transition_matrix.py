@@ -0,0 +1,84 @@
+"""Test scripts in scripts/transition_matrix.py"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(".").resolve()))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from component.scripts.transition_matrix import TransitionMatrix
+
+
+def test_impact_of(default_transition_matrix):
+
+    transition_matrix = TransitionMatrix.load(default_transition_matrix)
+    table = pd.read_csv(default_transition_matrix)
+
+    # Every transition of the file gets its impact code
+    impacts = transition_matrix.impact_of(table.from_code, table.to_code)
+    assert impacts.tolist() == table.impact_code.tolist()
+
+    impacts = transition_matrix.impact_of_transition(table.transition)
+    assert impacts.tolist() == table.impact_code.tolist()
+
+    # The no data class has no impact
+    assert transition_matrix.impact_of([0, 1, 0], [1, 0, 99]).tolist() == [0, 0, 0]
+
+    # The undefined transitions are not counted as no impact
+    assert transition_matrix.undefined_transitions([1, 99, 99], [99, 1, 1]) == [
+        (1, 99),
+        (99, 1),
+    ]
+    with pytest.raises(ValueError, match=r"1->99, 99->1\. Missing from_code: \[99\]"):
+        transition_matrix.impact_of([1, 99], [99, 1])
+
+    # Dense matrix for a set of classes
+    impact = transition_matrix.impact_matrix(np.array([0, 1, 2, 99]))
+    assert impact.tolist() == [[0, 0, 0, 0], [0, 2, 3, 0], [0, 1, 2, 0], [0, 0, 0, 0]]
+
+    transitions, impacts = transition_matrix.remap_lists()
+    assert transitions == table.transition.tolist()
+    assert impacts == table.impact_code.tolist()
+
+
+def test_load_cache(tmp_path, default_transition_matrix):
+
+    file_ = tmp_path / "transition_matrix.csv"
+    table = pd.read_csv(default_transition_matrix)
+    table.to_csv(file_, index=False)
+
+    # The same object is returned while the file is not modified
+    transition_matrix = TransitionMatrix.load(file_)
+    assert TransitionMatrix.load(file_) is transition_matrix
+    assert TransitionMatrix.load(transition_matrix) is transition_matrix
+
+    table.loc[(table.from_code == 1) & (table.to_code == 1), "impact_code"] = 1
+    table.to_csv(file_, index=False)
+    mtime = os.stat(file_).st_mtime
+    os.utime(file_, (mtime + 10, mtime + 10))
+
+    assert TransitionMatrix.load(file_).impact_of(1, 1) == 1
+
+
+def test_validate_table(default_transition_matrix):
+
+    table = pd.read_csv(default_transition_matrix)
+
+    with pytest.raises(ValueError, match="following columns"):
+        TransitionMatrix(table.drop(columns="impact_code"))
+
+    with pytest.raises(ValueError, match="only the following values"):
+        TransitionMatrix(table.assign(impact_code=table.impact_code + 10))
+
+    with pytest.raises(ValueError, match="repeated values"):
+        TransitionMatrix(pd.concat([table, table.head(1)]))
+
+    missing_from, missing_to = TransitionMatrix(
+        table[table.from_code != 2]
+    ).missing_codes(range(1, 11))
+    assert missing_from == [2]
+    assert missing_to == []